@@ -1,22 +1,22 @@
-from typing import List, Dict, Any
+import math
+from typing import List, Dict, Any, Optional, Union
 import uuid
 from datetime import datetime
+from app.models.place_batch import PlaceBatch
 from app.models.response_models import Plan, Stop
 from app.services.serpapi_service import SerpAPIService
 import logging
 from ..graph.workflow import GraphState
 
-# Configure logging for debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class FormatterAgent:
-    def __init__(self):
-        self.serpapi_service = SerpAPIService()
+    def __init__(self, serpapi_service: Optional[SerpAPIService] = None):
+        self.serpapi_service = serpapi_service or SerpAPIService()
     
-    async def format_plan(self, places: List[Dict[str, Any]], user_location: Dict[str, float]) -> Plan:
+    async def format_plan(self, places: Union[PlaceBatch, List[Dict[str, Any]]], user_location: Dict[str, float]) -> Plan:
         logger.info("📋 Starting route formatting")
-        logger.info(f"🛣️ Routes to format: {len(places) if places else 0}")
+        logger.info("🛣️ Routes to format: %s", len(places) if places else 0)
         
         stops = []
         for place in places:
@@ -41,11 +41,11 @@ class FormatterAgent:
             stops=stops,
             map_preview_url=map_url,
             total_distance=self._calculate_total_distance(stops),
-            total_time=self._calculate_total_time(len(stops)),
+            total_time=self._calculate_total_time(len(stops), self._drive_minutes(places)),
             created_at=datetime.now()
         )
         
-        logger.info(f"📊 Formatted response with {len(plan.stops) if hasattr(plan, 'stops') else 0} routes")
+        logger.info("📊 Formatted response with %s routes", len(plan.stops) if hasattr(plan, 'stops') else 0)
         logger.info(f"💡 Summary: {plan.total_time} for {plan.total_distance} km" if hasattr(plan, 'total_time') and hasattr(plan, 'total_distance') else "No summary")
         
         return plan
@@ -53,8 +53,21 @@ class FormatterAgent:
     def _calculate_total_distance(self, stops: List[Stop]) -> float:
         return sum([stop.distance or 0 for stop in stops])
     
-    def _calculate_total_time(self, num_stops: int) -> str:
-        travel_time = num_stops * 15  # 15 min travel per stop
+    def _drive_minutes(self, places: Union[PlaceBatch, List[Dict[str, Any]]]) -> Optional[float]:
+        """Summed leg durations from the router, or None when any leg is unknown."""
+        if isinstance(places, PlaceBatch):
+            durations = places.duration_minutes.tolist()
+        else:
+            durations = [place.get("duration_minutes") for place in places or []]
+        if not durations or any(d is None or math.isnan(d) for d in durations):
+            return None
+        return sum(durations)
+    
+    def _calculate_total_time(self, num_stops: int, drive_minutes: Optional[float] = None) -> str:
+        if drive_minutes is not None:
+            travel_time = round(drive_minutes)
+        else:
+            travel_time = num_stops * 15  # 15 min travel per stop
         stop_time = num_stops * 20 # 20 min at each stop
         total_minutes = travel_time + stop_time
         hours = total_minutes // 60
@@ -17,8 +17,6 @@ from ..models.request_models import RouteRequest
 from ..models.response_models import RouteResponse
 from ..graph.workflow import create_workflow
 
-# Configure logging for debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class OrchestratorAgent:
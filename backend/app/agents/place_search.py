@@ -1,61 +1,179 @@
 from app.services.foursquare import FoursquareService
 from app.services.serpapi_service import SerpAPIService
-from typing import List, Dict, Any
+from app.services.batch_memo import current_batch_memo
+from app.services.place_cache import PlaceSearchCache, search_key
+from app.services.place_store import PlaceStore
+from app.models.place_batch import PlaceBatch
+from typing import List, Dict, Any, Optional, Set
 import asyncio
 import logging
+from app.utils.config import settings
+from app.utils.logging_config import log_payload
+from app.utils.metrics import SEARCH_EARLY_RETURNS
 from ..graph.workflow import GraphState
 
-# Configure logging for debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+def search_query(task: Dict[str, Any]) -> str:
+    """What a task is searched for; also the key its places are cached and stored under."""
+    return task.get("search_query", task.get("task_type", ""))
+
+
 class PlaceSearchAgent:
-    def __init__(self):
-        self.foursquare = FoursquareService()
-        self.serpapi = SerpAPIService()
+    def __init__(self, foursquare: Optional[FoursquareService] = None, serpapi: Optional[SerpAPIService] = None,
+                 result_cache: Optional[PlaceSearchCache] = None, place_store: Optional[PlaceStore] = None):
+        self.foursquare = foursquare or FoursquareService()
+        self.serpapi = serpapi or SerpAPIService()
+        self.result_cache = result_cache
+        self.place_store = place_store
+        self._background: Set[asyncio.Task] = set()
     
     async def search_for_task(self, task: Dict[str, Any], lat: float, lng: float) -> List[Dict[str, Any]]:
-        query = task.get("search_query", task.get("task_type", ""))
+        query = search_query(task)
+        batch = current_batch_memo()
+        if batch is not None:
+            # Within a /plan/batch, each (query, geohash cell) is searched once for all items
+            places = await batch.run(search_key(query, lat, lng), lambda: self._search_cached(task, lat, lng))
+        else:
+            places = await self._search_cached(task, lat, lng)
+        # Cached or shared entries may come from a task with a different task_type but the same query
+        return [{**place, "task_type": task.get("task_type")} for place in places]
+    
+    async def _search_cached(self, task: Dict[str, Any], lat: float, lng: float) -> List[Dict[str, Any]]:
+        query = search_query(task)
+        if self.place_store is not None:
+            places = self.place_store.lookup(query, lat, lng)
+            if places is not None:
+                logger.info("🗺️ Answered '%s' from %d stored places", query, len(places))
+                return places
+        
+        if not self.result_cache:
+            return await self._search_providers(task, lat, lng)
+        
+        return await self.result_cache.get_or_fetch(
+            query, lat, lng, lambda: self._search_providers(task, lat, lng)
+        )
+    
+    async def _search_providers(self, task: Dict[str, Any], lat: float, lng: float) -> List[Dict[str, Any]]:
+        query = search_query(task)
         
-        logger.info(f"Searching for task: {task}, lat: {lat}, lng: {lng}")
+        logger.debug("Searching for task: %s, lat: %s, lng: %s", task, lat, lng)
         
         try:
-            foursquare_results, serpapi_results = await asyncio.gather(
-                self.foursquare.search_places(query, lat, lng, limit=3),
-                self.serpapi.search_local_places(query, lat, lng),
-                return_exceptions=True
-            )
-            
-            logger.info(f"Foursquare results: {foursquare_results}")
-            logger.info(f"SerpAPI results: {serpapi_results}")
+            calls = {
+                "foursquare": asyncio.ensure_future(self.foursquare.search_places(query, lat, lng, limit=3)),
+                "serpapi": asyncio.ensure_future(self.serpapi.search_local_places(query, lat, lng)),
+            }
+            if settings.search_hedging_enabled:
+                try:
+                    early_places = await self._wait_hedged(task, lat, lng, calls)
+                except asyncio.CancelledError:
+                    # asyncio.wait leaves its futures running; don't let them hold governor and breaker slots
+                    self._cancel_calls(calls)
+                    raise
+                if early_places is not None:
+                    self._remember(task, early_places)
+                    return early_places
             
-            processed_places = []
-            seen_ids = set()
-
-            if isinstance(foursquare_results, list):
-                for place in foursquare_results:
-                    processed = self._process_foursquare_place(place, task)
-                    if processed and processed.get("id") and processed.get("lat") is not None and processed.get("lng") is not None:
-                        if processed.get("id") not in seen_ids:
-                            processed_places.append(processed)
-                            seen_ids.add(processed.get("id"))
+            foursquare_results, serpapi_results = await asyncio.gather(*calls.values(), return_exceptions=True)
             
-            if isinstance(serpapi_results, list):
-                for place in serpapi_results:
-                    processed = self._process_serpapi_place(place, task)
-                    if processed and processed.get("id") and processed.get("lat") is not None and processed.get("lng") is not None:
-                        if processed.get("id") not in seen_ids:
-                            processed_places.append(processed)
-                            seen_ids.add(processed.get("id"))
+            log_payload(logger, "Foursquare results", foursquare_results, query=query)
+            log_payload(logger, "SerpAPI results", serpapi_results, query=query)
             
-            logger.info(f"Processed places: {processed_places}")
+            processed_places = self._merge_results(task, foursquare_results, serpapi_results)
+            log_payload(logger, "Processed places", processed_places, query=query)
+            self._remember(task, processed_places)
             
             return processed_places[:5] # Return top 5 combined results
             
         except Exception as e:
-            logger.error(f"Error searching for {query}: {e}")
+            logger.error("Error searching for %s: %s", query, e)
             return []
     
+    async def _wait_hedged(self, task: Dict[str, Any], lat: float, lng: float,
+                           calls: Dict[str, asyncio.Future]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return early once the providers that finished already give enough candidates
+        and the others have missed the soft deadline; None means "wait for all".
+
+        Late calls keep running in the background and refresh the place cache with
+        the complete result, so the next search for this query gets both providers.
+        """
+        done, pending = await asyncio.wait(calls.values(), timeout=settings.search_soft_deadline_seconds)
+        while pending:
+            finished = {
+                name: call.result() for name, call in calls.items()
+                if call.done() and not call.cancelled() and call.exception() is None
+            }
+            places = self._merge_results(task, finished.get("foursquare"), finished.get("serpapi"))
+            if len(places) >= settings.search_min_candidates:
+                slow = [name for name, call in calls.items() if not call.done()]
+                for name in slow:
+                    SEARCH_EARLY_RETURNS.labels(slow_provider=name).inc()
+                logger.info("⏱️ Returning %d places without %s (soft deadline %.1fs missed)",
+                            len(places), ", ".join(slow), settings.search_soft_deadline_seconds)
+                self._finish_in_background(task, lat, lng, calls)
+                return places[:5]
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        return None
+    
+    def _remember(self, task: Dict[str, Any], places: List[Dict[str, Any]]):
+        if self.place_store is not None and places:
+            self.place_store.upsert(places, tags=[search_query(task)])
+    
+    @staticmethod
+    def _cancel_calls(calls: Dict[str, asyncio.Future]):
+        """Cancel unfinished provider calls and retrieve the errors of finished ones."""
+        for call in calls.values():
+            if not call.done():
+                call.cancel()
+            elif not call.cancelled():
+                call.exception()
+    
+    def _finish_in_background(self, task: Dict[str, Any], lat: float, lng: float, calls: Dict[str, asyncio.Future]):
+        if not self.result_cache and self.place_store is None:
+            # Nothing would use the late result
+            self._cancel_calls(calls)
+            return
+        
+        query = search_query(task)
+        
+        async def finish():
+            foursquare_results, serpapi_results = await asyncio.gather(*calls.values(), return_exceptions=True)
+            places = self._merge_results(task, foursquare_results, serpapi_results)
+            self._remember(task, places)
+            if self.result_cache:
+                await self.result_cache.store(search_key(query, lat, lng), places[:5])
+            logger.debug("♻️ Late provider results cached for '%s' (%d places)", query, len(places))
+        
+        background = asyncio.create_task(finish())
+        self._background.add(background)
+        background.add_done_callback(self._background.discard)
+    
+    def _merge_results(self, task: Dict[str, Any], foursquare_results: Any, serpapi_results: Any) -> List[Dict[str, Any]]:
+        """Process both providers' raw results, dropping places without coordinates and duplicate ids."""
+        processed_places = []
+        seen_ids = set()
+        
+        if isinstance(foursquare_results, list):
+            for place in foursquare_results:
+                processed = self._process_foursquare_place(place, task)
+                if processed and processed.get("id") and processed.get("lat") is not None and processed.get("lng") is not None:
+                    if processed.get("id") not in seen_ids:
+                        processed_places.append(processed)
+                        seen_ids.add(processed.get("id"))
+        
+        if isinstance(serpapi_results, list):
+            for place in serpapi_results:
+                processed = self._process_serpapi_place(place, task)
+                if processed and processed.get("id") and processed.get("lat") is not None and processed.get("lng") is not None:
+                    if processed.get("id") not in seen_ids:
+                        processed_places.append(processed)
+                        seen_ids.add(processed.get("id"))
+        
+        return processed_places
+    
     def _process_foursquare_place(self, place: Dict[str, Any], task: Dict[str, Any]) -> Dict[str, Any]:
         try:
             # Handle both old and new Foursquare API response formats
@@ -68,7 +186,7 @@ class PlaceSearchAgent:
             
             # Skip places without valid coordinates
             if lat is None or lng is None:
-                logger.warning(f"Skipping Foursquare place {place.get('name')} - missing coordinates")
+                logger.warning("Skipping Foursquare place %s - missing coordinates", place.get('name'))
                 return None
             
             return {
@@ -83,7 +201,7 @@ class PlaceSearchAgent:
                 "task_type": task.get("task_type"),
             }
         except Exception as e:
-            logger.error(f"Error processing Foursquare place: {e}")
+            logger.error("Error processing Foursquare place: %s", e)
             return None
     
     def _process_serpapi_place(self, place: Dict[str, Any], task: Dict[str, Any]) -> Dict[str, Any]:
@@ -96,7 +214,7 @@ class PlaceSearchAgent:
             
             # Skip places without valid coordinates
             if lat is None or lng is None:
-                logger.warning(f"Skipping SerpAPI place {place.get('title')} - missing coordinates")
+                logger.warning("Skipping SerpAPI place %s - missing coordinates", place.get('title'))
                 return None
                 
             return {
@@ -111,11 +229,11 @@ class PlaceSearchAgent:
                 "task_type": task.get("task_type"),
             }
         except Exception as e:
-            logger.error(f"Error processing SerpAPI place: {e}")
+            logger.error("Error processing SerpAPI place: %s", e)
             return None
 
-    async def search_all_tasks(self, tasks: List[Dict[str, Any]], lat: float, lng: float) -> List[Dict[str, Any]]:
-        logger.info(f"Searching all tasks: {tasks}, lat: {lat}, lng: {lng}")
+    async def search_all_tasks(self, tasks: List[Dict[str, Any]], lat: float, lng: float) -> PlaceBatch:
+        logger.info("Searching %d tasks near %s, %s", len(tasks), lat, lng)
         search_coroutines = [self.search_for_task(task, lat, lng) for task in tasks]
         results = await asyncio.gather(*search_coroutines, return_exceptions=True)
         
@@ -124,13 +242,14 @@ class PlaceSearchAgent:
             if isinstance(result, list):
                 all_places.extend(result)
         
-        logger.info(f"All places found: {all_places}")
-        return all_places
+        logger.info("All places found: %d", len(all_places))
+        log_payload(logger, "All places found", all_places)
+        return PlaceBatch.from_dicts(all_places)
 
 async def place_search_agent(state: GraphState) -> Dict[str, Any]:
     logger.info("🔍 Starting place search")
-    logger.info(f"📍 Start location: {state.start_location}")
-    logger.info(f"🎯 End location: {state.end_location}")
+    logger.info("📍 Start location: %s", state.start_location)
+    logger.info("🎯 End location: %s", state.end_location)
     
     try:
         agent = PlaceSearchAgent()
@@ -138,9 +257,9 @@ async def place_search_agent(state: GraphState) -> Dict[str, Any]:
         start_places = await agent.search_for_task({"task_type": "start"}, state.start_location.lat, state.start_location.lng)
         end_places = await agent.search_for_task({"task_type": "end"}, state.end_location.lat, state.end_location.lng)
         
-        logger.info(f"✅ Found {len(start_places)} start places and {len(end_places)} end places")
-        logger.info(f"📍 Start places: {[p.get('name', 'Unknown') for p in start_places]}")
-        logger.info(f"🎯 End places: {[p.get('name', 'Unknown') for p in end_places]}")
+        logger.info("✅ Found %s start places and %s end places", len(start_places), len(end_places))
+        logger.info("📍 Start places: %s", [p.get('name', 'Unknown') for p in start_places])
+        logger.info("🎯 End places: %s", [p.get('name', 'Unknown') for p in end_places])
         
         return {
             "start_places": start_places,
@@ -149,5 +268,5 @@ async def place_search_agent(state: GraphState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"❌ Error in place_search_agent: {str(e)}")
+        logger.error("❌ Error in place_search_agent: %s", e)
         raise
\ No newline at end of file
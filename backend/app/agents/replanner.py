@@ -0,0 +1,102 @@
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.agents.formatter import FormatterAgent
+from app.agents.place_search import PlaceSearchAgent
+from app.agents.routing import RoutingAgent
+from app.agents.task_decomposer import TaskDecomposerAgent
+from app.agents.validator import ValidationAgent
+from app.models.place_batch import PlaceBatch
+from app.models.request_models import PlanPatchRequest
+from app.services.matrix_provider import TravelMatrix
+from app.services.place_cache import normalize_query
+from app.services.plan_cache import PlanCache, build_context, context_travel
+
+logger = logging.getLogger(__name__)
+
+
+class ReplanAgent:
+    """
+    Applies an edit to a cached plan without rerunning the whole pipeline.
+
+    Only the added text is decomposed and only its new tasks are searched and
+    validated. Candidates of untouched tasks, the previous route and the stored
+    travel matrix are reused: a removal needs no provider call at all, and the
+    solver is warm-started from the previous route with the new stops inserted.
+    """
+
+    def __init__(self, plans: PlanCache, task_decomposer: TaskDecomposerAgent, place_search: PlaceSearchAgent,
+                 validator: ValidationAgent, routing_agent: RoutingAgent, formatter: FormatterAgent):
+        self.plans = plans
+        self.task_decomposer = task_decomposer
+        self.place_search = place_search
+        self.validator = validator
+        self.routing_agent = routing_agent
+        self.formatter = formatter
+
+    async def patch_plan(self, plan_id: str, edit: PlanPatchRequest) -> Optional[Dict[str, Any]]:
+        """The edited plan (same plan_id), or None when the plan is unknown or expired."""
+        plan, context = await self.plans.load(plan_id)
+        if plan is None or context is None:
+            return None
+        lat, lng = context["lat"], context["lng"]
+        candidates = PlaceBatch.from_dicts(context["candidates"])
+        previous_route = context["route"]
+
+        # Stop ids are per plan; the context maps them back to their candidate and so their task
+        stop_tasks = {stop_id: candidates.task_type[index] for stop_id, index in context.get("stops", {}).items()}
+        removed = {normalize_query(task_type) for task_type in edit.remove_tasks}
+        removed |= {normalize_query(stop_tasks[stop_id]) for stop_id in edit.remove_stop_ids if stop_id in stop_tasks}
+        tasks = [task for task in context["tasks"] if normalize_query(task.get("task_type")) not in removed]
+
+        new_tasks = []
+        if edit.add_text:
+            existing = {normalize_query(task.get("task_type")) for task in tasks}
+            new_tasks = [
+                task for task in await self.task_decomposer.decompose_task(edit.add_text, (lat, lng))
+                if normalize_query(task.get("task_type")) not in existing
+            ]
+            # Same MVP cap as a new plan; don't search for tasks that would be dropped
+            new_tasks = new_tasks[:max(self.validator.max_tasks - len(tasks), 0)]
+        logger.info("✏️ Editing plan %s: %d task(s) removed, %d added", plan_id, len(removed), len(new_tasks))
+
+        kept = np.flatnonzero([normalize_query(task_type) not in removed for task_type in candidates.task_type])
+        new_places = PlaceBatch.empty()
+        if new_tasks:
+            found = await self.place_search.search_all_tasks(new_tasks, lat, lng)
+            new_places = await self.validator.validate_places(found, lat, lng)
+        # Dedupe and cap the kept and new candidates together, as if validated in one pass
+        combined = PlaceBatch.concat([candidates.take(kept), new_places])
+        selected = self.validator.select_candidates(combined)
+        places = combined.take(selected)
+        # Candidate index in the stored context for each selected row, -1 for new places
+        origin = np.full(len(selected), -1)
+        from_context = selected < len(kept)
+        origin[from_context] = kept[selected[from_context]]
+
+        # Rows of the stored matrix cover the start and every kept candidate; only new places need a fetch
+        travel: Optional[TravelMatrix] = context_travel(context)
+        if travel is not None and len(travel.distances_m) == len(candidates) + 1:
+            reused = np.flatnonzero(origin >= 0)
+            stored = np.r_[0, origin[reused] + 1]
+            travel = TravelMatrix(travel.distances_m[np.ix_(stored, stored)], travel.durations_s[np.ix_(stored, stored)])
+            if len(reused) < len(places):
+                travel = await self.routing_agent.routing_service.extend_travel_matrix(
+                    np.vstack([[lat, lng], places.coords]), np.r_[0, reused + 1].tolist(), travel
+                )
+        else:
+            travel = None
+        new_index = {int(old): new for new, old in enumerate(origin) if old >= 0}
+        warm_start = [new_index[index] for index in previous_route if index in new_index]
+
+        route, travel = await self.routing_agent.plan_route(
+            places, lat, lng, travel=travel, previous_route=warm_start
+        )
+        edited = await self.formatter.format_plan(route, {"lat": lat, "lng": lng})
+        edited.plan_id = plan_id
+        await self.plans.save(edited, build_context(
+            context["user_text"], lat, lng, tasks + new_tasks, places, route, travel
+        ))
+        return edited.dict()
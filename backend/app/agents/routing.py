@@ -1,58 +1,136 @@
+import asyncio
 import logging
 import uuid
-from typing import List, Dict, Any
-from geopy.distance import geodesic
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+
+from app.models.place_batch import PlaceBatch
+from app.services.matrix_provider import TravelMatrix
 from app.services.routing_service import RoutingService
+from app.services.solver_executor import SolverExecutor
+from app.utils.config import settings
 
 logger = logging.getLogger(__name__)
 
 class RoutingAgent:
-    def __init__(self):
-        self.routing_service = RoutingService()
+    def __init__(self, routing_service: Optional[RoutingService] = None, solver: Optional[SolverExecutor] = None):
+        self.routing_service = routing_service or RoutingService()
+        self.solver = solver
         logger.info("🚗 RoutingAgent initialized.")
     
-    async def optimize_route(self, places: List[Dict[str, Any]], start_lat: float, start_lng: float) -> List[Dict[str, Any]]:
-        if not places:
-            return []
+    async def optimize_route(self, places: Union[PlaceBatch, List[Dict[str, Any]]], start_lat: float, start_lng: float) -> PlaceBatch:
+        route, _ = await self.plan_route(places, start_lat, start_lng)
+        return route
+    
+    async def plan_route(self, places: Union[PlaceBatch, List[Dict[str, Any]]], start_lat: float, start_lng: float,
+                         travel: Optional[TravelMatrix] = None,
+                         previous_route: Optional[List[int]] = None) -> Tuple[PlaceBatch, Optional[TravelMatrix]]:
+        """
+        Pick and order the stops; also returns the travel matrix over [start] + `places`.
+
+        `travel` skips the matrix fetch when the caller already has it. `previous_route`
+        (indices into `places`, in visiting order) warm-starts the solver: the missing
+        tasks are inserted cheaply into it and OR-Tools only improves that tour.
+        """
+        if not isinstance(places, PlaceBatch):
+            places = PlaceBatch.from_dicts(places or [])
+        if not len(places):
+            return places, travel
+        
+        if travel is None:
+            locations = np.vstack([[start_lat, start_lng], places.coords])
+            travel = await self.routing_service.travel_matrix(locations)
+        groups = self._task_groups(places) if settings.gtsp_enabled else np.arange(len(places))
+        num_groups = int(groups.max()) + 1
+        penalty = self._rating_penalty(places, groups, num_groups)
         
         if len(places) <= 1:
             logger.info("🛤️ Only one stop, no optimization needed. Adding route info.")
-            return self._add_route_info(places, start_lat, start_lng)
-        
-        locations = [(start_lat, start_lng)]
-        locations.extend([(p["lat"], p["lng"]) for p in places])
+            return self._add_route_info(places, travel, np.arange(len(places))), travel
         
         try:
-            logger.info(f"🛤️ Optimizing route for {len(places)} stops.")
-            optimal_order_indices = self.routing_service.solve_tsp(locations, start_index=0)
+            cost = travel.durations_s if settings.routing_metric == "duration" else travel.distances_m
+            # Entering a node costs its rating penalty as well; the start has none
+            cost_matrix = np.rint(cost + np.r_[0.0, penalty][None, :]).astype(int)
+            initial_route = None
+            if previous_route is not None:
+                initial_route = self._warm_start(cost_matrix, groups, previous_route)
+            if num_groups < len(places):
+                logger.info("🛤️ Choosing and ordering %s stops among %s candidates.", num_groups, len(places))
+                optimal_order_indices = await self._solve(
+                    "solve_gtsp_matrix", cost_matrix, np.r_[-1, groups], 0, initial_route
+                )
+            else:
+                logger.info("🛤️ Optimizing route for %s stops.", len(places))
+                optimal_order_indices = await self._solve("solve_tsp_matrix", cost_matrix, 0, initial_route)
             
-            # Reorder places list. Skip index 0 (start location) and adjust index by -1
-            ordered_places = [places[i - 1] for i in optimal_order_indices[1:]]
+            # Skip index 0 (start location) and adjust index by -1
+            order = np.asarray(optimal_order_indices[1:]) - 1
             logger.info("✅ Route optimized successfully.")
             
-            return self._add_route_info(ordered_places, start_lat, start_lng)
-            
         except Exception as e:
-            logger.error(f"❌ Routing optimization failed: {e}. Returning original order.")
-            return self._add_route_info(places, start_lat, start_lng)
-    
-    def _add_route_info(self, places: List[Dict[str, Any]], start_lat: float, start_lng: float) -> List[Dict[str, Any]]:
-        enhanced_places = []
-        prev_lat, prev_lng = start_lat, start_lng
+            logger.error("❌ Routing optimization failed: %s. Returning original order.", e)
+            order = self._best_of_each_group(groups, penalty)
         
-        for i, place in enumerate(places):
-            place_copy = place.copy()
-            
-            place_copy.update({
-                "id": str(uuid.uuid4()),
-                "order": i + 1,
-                "google_maps_url": f"https://maps.google.com/?daddr={place['lat']},{place['lng']}",
-                "distance": round(geodesic((prev_lat, prev_lng), (place['lat'], place['lng'])).kilometers, 2),
-                "eta": f"~{(i + 1) * 15} min drive"
-            })
-            
-            enhanced_places.append(place_copy)
-            prev_lat, prev_lng = place["lat"], place["lng"]
+        return self._add_route_info(places.take(order), travel, order), travel
+    
+    def _warm_start(self, cost_matrix: np.ndarray, groups: np.ndarray, previous_route: List[int]) -> List[int]:
+        """Matrix path (start first) that keeps the previous visiting order and inserts every uncovered task."""
+        route = [0]
+        covered = set()
+        for index in previous_route:
+            if groups[index] not in covered:
+                covered.add(groups[index])
+                route.append(int(index) + 1)
+        missing = [np.flatnonzero(groups == group) + 1 for group in range(int(groups.max()) + 1) if group not in covered]
+        return self.routing_service.cheapest_insertion(cost_matrix, route, missing)
+    
+    async def _solve(self, method: str, *args) -> List[int]:
+        # Solving is CPU-bound, so it never runs on the event loop
+        if self.solver:
+            return await getattr(self.solver, method)(*args)
+        return await asyncio.to_thread(getattr(self.routing_service, method), *args)
+    
+    @staticmethod
+    def _task_groups(places: PlaceBatch) -> np.ndarray:
+        """Group id per place: candidates for the same task share one; places without a task stand alone."""
+        keys = [task_type or f"#{i}" for i, task_type in enumerate(places.task_type)]
+        return np.unique(np.asarray(keys, dtype=str), return_inverse=True)[1].astype(np.intp)
+    
+    @staticmethod
+    def _rating_penalty(places: PlaceBatch, groups: np.ndarray, num_groups: int) -> np.ndarray:
+        """
+        Route cost each candidate adds for being rated below the best of its task
+        (GTSP_RATING_PENALTY per star). Unrated candidates count as the worst rated
+        one of their task; tasks without any rating cost nothing.
+        """
+        best = np.full(num_groups, np.nan)
+        worst = np.full(num_groups, np.nan)
+        np.fmax.at(best, groups, places.rating)
+        np.fmin.at(worst, groups, places.rating)
+        rating = np.where(np.isnan(places.rating), worst[groups], places.rating)
+        return np.nan_to_num((best[groups] - rating) * settings.gtsp_rating_penalty)
+    
+    @staticmethod
+    def _best_of_each_group(groups: np.ndarray, penalty: np.ndarray) -> np.ndarray:
+        """The least penalized (best-rated) candidate of each group, in input order."""
+        ranked = np.lexsort((np.arange(len(groups)), penalty, groups))
+        firsts = ranked[np.r_[True, groups[ranked][1:] != groups[ranked][:-1]]]
+        return np.sort(firsts)
+    
+    def _add_route_info(self, ordered_places: PlaceBatch, travel: TravelMatrix, order: np.ndarray) -> PlaceBatch:
+        """Leg distance, leg duration and cumulative drive-time ETA for each stop, read off the travel matrix."""
+        # Matrix node of each stop in visiting order; node 0 is the start location
+        nodes = np.concatenate([[0], np.asarray(order, dtype=np.intp) + 1])
+        legs_km = travel.distances_m[nodes[:-1], nodes[1:]] / 1000
+        legs_min = travel.durations_s[nodes[:-1], nodes[1:]] / 60
+        routed = ordered_places.with_route(
+            distance_km=np.round(legs_km, 2),
+            duration_minutes=np.round(legs_min, 1),
+            eta=[f"~{round(minutes)} min drive" for minutes in np.cumsum(legs_min).tolist()],
+            ids=[str(uuid.uuid4()) for _ in range(len(ordered_places))],
+        )
         
-        logger.info(f"📝 Added route info to {len(enhanced_places)} stops.")
-        return enhanced_places
\ No newline at end of file
+        logger.info("📝 Added route info to %s stops.", len(routed))
+        return routed
\ No newline at end of file
@@ -2,29 +2,25 @@
 from groq import Groq
 from langchain_groq import ChatGroq
 from langchain.schema import HumanMessage, SystemMessage
-from typing import List, Dict, Any, Annotated
+from typing import List, Dict, Any, Annotated, Optional
 from app.models.graph_state import GraphState
+from app.services.batch_memo import current_batch_memo
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, breakers
+from app.services.decomposition_cache import DecompositionMemo, canonicalize_request, prompt_version
+from app.services.outbound_governor import (
+    THROTTLE_STATUSES, GovernorTimeoutError, ProviderGovernor, governors, retry_after_seconds
+)
 import json
+import time
 from app.utils.config import settings
+from app.utils.logging_config import log_payload
+from app.utils.metrics import PROVIDER_ERRORS, PROVIDER_REQUEST_DURATION, error_reason
+from app.utils.singleflight import SingleFlight
 import logging
 
-# Configure logging for debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class TaskDecomposerAgent:
-    def __init__(self):
-        self.llm = ChatGroq(
-            model="llama-3.3-70b-versatile",
-            api_key=settings.groq_api_key,
-            temperature=0.1
-        )
-    
-    async def decompose_task(self, user_text: str, user_location: tuple) -> List[Dict[str, Any]]:
-        logger.info("🔄 Starting task decomposition")
-        logger.info(f"📝 User input: {user_text}")
-        
-        system_prompt = """
+SYSTEM_PROMPT = """
         You are an expert errand planning assistant. Your goal is to break down a user's natural language request into a structured list of individual tasks.
 
         For each distinct errand, you must identify:
@@ -54,22 +50,97 @@ class TaskDecomposerAgent:
             }
         ]
         """
+
+class TaskDecomposerAgent:
+    def __init__(self, memo: Optional[DecompositionMemo] = None, governor: Optional[ProviderGovernor] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.llm = ChatGroq(
+            model=settings.groq_model,
+            api_key=settings.groq_api_key,
+            temperature=0.1,
+            timeout=settings.groq_timeout_seconds
+        )
+        self.memo = memo
+        self.governor = governor or governors.get("groq")
+        self.breaker = breaker or breakers.get("groq")
+        self.prompt_version = prompt_version(settings.groq_model, SYSTEM_PROMPT)
+        self._inflight = SingleFlight("groq") if settings.singleflight_enabled else None
+    
+    async def decompose_task(self, user_text: str, user_location: tuple) -> List[Dict[str, Any]]:
+        batch = current_batch_memo()
+        if batch is None:
+            return await self._decompose_once(user_text, user_location)
+        tasks = await batch.run(
+            f"decomp:{canonicalize_request(user_text)}", lambda: self._decompose_once(user_text, user_location)
+        )
+        return [dict(task) for task in tasks]
+    
+    async def _decompose_once(self, user_text: str, user_location: tuple) -> List[Dict[str, Any]]:
+        """Concurrent requests with the same canonical text share one decomposition."""
+        if self._inflight is None:
+            return await self._decompose(user_text, user_location)
+        tasks = await self._inflight.do(
+            canonicalize_request(user_text), lambda: self._decompose(user_text, user_location)
+        )
+        return [dict(task) for task in tasks]
+
+    async def _decompose(self, user_text: str, user_location: tuple) -> List[Dict[str, Any]]:
+        logger.info("🔄 Starting task decomposition")
+        logger.debug("📝 User input: %s", user_text)
+        
+        if self.memo:
+            cached_tasks = await self.memo.get(user_text, self.prompt_version)
+            if cached_tasks is not None:
+                logger.info("🏁 Reusing %s memoized tasks", len(cached_tasks))
+                return cached_tasks
         
         human_prompt = f"User request: \"{user_text}\"\nUser location (lat, lng): {user_location}\n\nGenerate the JSON output."
         
         messages = [
-            SystemMessage(content=system_prompt),
+            SystemMessage(content=SYSTEM_PROMPT),
             HumanMessage(content=human_prompt)
         ]
         
-        response = await self.llm.ainvoke(messages)
+        started = time.perf_counter()
+        try:
+            async with self.breaker.guard():
+                async with self.governor.slot():
+                    try:
+                        response = await self.llm.ainvoke(messages)
+                    except Exception as e:
+                        error_response = getattr(e, "response", None)
+                        if getattr(error_response, "status_code", None) in THROTTLE_STATUSES:
+                            # The Groq client already retried; make the other queued decompositions back off
+                            # too. Pause before the slot is released, or releasing it dispatches the next call.
+                            self.governor.defer(
+                                retry_after_seconds(error_response) or settings.outbound_retry_backoff_seconds
+                            )
+                        raise
+        except CircuitOpenError as e:
+            logger.warning("⚡ %s. Using fallback decomposition.", e)
+            return self._fallback_decomposition(user_text)
+        except GovernorTimeoutError as e:
+            PROVIDER_ERRORS.labels(provider="groq", reason="queue_timeout").inc()
+            logger.warning("⏳ %s. Using fallback decomposition.", e)
+            return self._fallback_decomposition(user_text)
+        except Exception as e:
+            PROVIDER_ERRORS.labels(provider="groq", reason=error_reason(e)).inc()
+            logger.error("❌ Groq call failed: %s. Using fallback decomposition.", e)
+            return self._fallback_decomposition(user_text)
+        finally:
+            PROVIDER_REQUEST_DURATION.labels(provider="groq").observe(time.perf_counter() - started)
         
         try:
             tasks = json.loads(response.content)
-            logger.info(f"📋 Decomposed tasks: {tasks}")
-            logger.info(f"🏁 Number of tasks created: {len(tasks)}")
-            return tasks if isinstance(tasks, list) else []
+            log_payload(logger, "📋 Decomposed tasks", tasks)
+            logger.info("🏁 Number of tasks created: %d", len(tasks) if isinstance(tasks, list) else 0)
+            if not isinstance(tasks, list):
+                return []
+            if tasks and self.memo:
+                await self.memo.set(user_text, self.prompt_version, tasks)
+            return tasks
         except json.JSONDecodeError:
+            PROVIDER_ERRORS.labels(provider="groq", reason="invalid_json").inc()
             logger.error("❌ Error: LLM did not return valid JSON. Using fallback.")
             return self._fallback_decomposition(user_text)
 
@@ -1,79 +1,94 @@
 import logging
-from typing import List, Dict, Any
-from geopy.distance import geodesic
+from typing import List, Dict, Any, Union
+
+import numpy as np
+
+from app.models.place_batch import PlaceBatch
+from app.utils import geo
+from app.utils.config import settings
+from app.utils.dedupe import fuzzy_unique
 from ..graph.workflow import GraphState
 
-# Configure logging for debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class ValidationAgent:
     def __init__(self):
         self.max_distance_km = 50
         self.min_rating = 3.0
+        self.dedupe_radius_m = settings.dedupe_radius_m
+        self.dedupe_name_similarity = settings.dedupe_name_similarity
+        self.max_tasks = 6  # MVP scope
+        # With GTSP the router picks among several candidates per task
+        self.candidates_per_task = max(settings.gtsp_candidates_per_task, 1) if settings.gtsp_enabled else 1
     
-    async def validate_places(self, places: List[Dict[str, Any]], user_lat: float, user_lng: float) -> List[Dict[str, Any]]:
+    async def validate_places(self, places: Union[PlaceBatch, List[Dict[str, Any]]], user_lat: float, user_lng: float) -> PlaceBatch:
         logger.info("✅ Starting place validation")
-        logger.info(f"📍 Places to validate: {len(places) if places else 0}")
+        logger.info("📍 Places to validate: %s", len(places) if places is not None else 0)
         
-        if not places:
-            return []
-            
-        unique_places = {}
-        for place in places:
-            # Skip places without valid coordinates
-            lat = place.get("lat")
-            lng = place.get("lng")
-            if lat is None or lng is None:
-                continue
-                
-            # Use a tuple of name and lat/lng to identify unique places, preventing duplicates
-            # from different sources (Foursquare, SerpAPI) for the same physical location.
-            try:
-                key = (place.get("name"), round(float(lat), 4), round(float(lng), 4))
-                if key not in unique_places:
-                    unique_places[key] = place
-            except (ValueError, TypeError):
-                # Skip places with invalid coordinates
-                continue
+        if not isinstance(places, PlaceBatch):
+            places = PlaceBatch.from_dicts(places or [])
+        if not len(places):
+            return places
         
-        validated_places = []
-        for place in unique_places.values():
-            if self._is_valid_place(place, user_lat, user_lng):
-                validated_places.append(place)
+        # Skip places without valid coordinates, then duplicates from different sources
+        # (Foursquare, SerpAPI) for the same physical store: close by with similar names, same task.
+        candidates = self._unique(places, np.isfinite(places.coords).all(axis=1))
         
-        # Select the best candidate for each task type
-        best_places_by_task = {}
-        for place in validated_places:
-            task_type = place.get("task_type")
-            if task_type:
-                # Prioritize places with higher ratings
-                if task_type not in best_places_by_task or \
-                   (place.get("rating") or 0) > (best_places_by_task[task_type].get("rating") or 0):
-                    best_places_by_task[task_type] = place
-
-        logger.info(f"✅ Validation completed. Validated places: {len(validated_places)}")
+        # One vectorized pass for every candidate's distance from the user
+        distances_km = np.full(len(places), np.inf)
+        distances_km[candidates] = geo.distances_from((user_lat, user_lng), places.coords[candidates]) / 1000
+        
+        valid = np.zeros(len(places), dtype=bool)
+        valid[candidates] = True
+        valid &= np.not_equal(places.name, None) & np.not_equal(places.address, None)
+        valid &= distances_km <= self.max_distance_km
+        valid &= ~(places.rating < self.min_rating)  # Unrated places (NaN) pass
+        logger.info("✅ Validation completed. Validated places: %s", int(valid.sum()))
+        
+        return places.take(self._top_per_task(places, valid, self.candidates_per_task, self.max_tasks))
+    
+    def select_candidates(self, places: PlaceBatch) -> np.ndarray:
+        """
+        Indices of an already validated batch that survive dedupe and the per-task and
+        task caps, e.g. a plan's kept candidates plus the places found for an edit.
+        """
+        mask = np.zeros(len(places), dtype=bool)
+        mask[self._unique(places, np.isfinite(places.coords).all(axis=1))] = True
+        return self._top_per_task(places, mask, self.candidates_per_task, self.max_tasks)
     
-        return list(best_places_by_task.values())[:6]  # Limit to 6 stops as per MVP scope
+    def _unique(self, places: PlaceBatch, mask: np.ndarray) -> np.ndarray:
+        """
+        Indices among `mask` left after merging near-duplicates into their first
+        occurrence. Only places of the same task are merged, so a store found for two
+        tasks stays a candidate for both.
+        """
+        indices = np.flatnonzero(mask)
+        kept = indices[fuzzy_unique(
+            places.coords[indices], places.name[indices], self.dedupe_radius_m, self.dedupe_name_similarity,
+            groups=places.task_type[indices],
+        )]
+        if len(kept) < len(indices):
+            logger.debug("🧹 Merged %d duplicate places", len(indices) - len(kept))
+        return kept
     
-    def _is_valid_place(self, place: Dict[str, Any], user_lat: float, user_lng: float) -> bool:
-        try:
-            if not all(k in place for k in ["name", "lat", "lng", "address"]):
-                return False
-            
-            # Ensure coordinates are valid floats
-            lat, lng = float(place["lat"]), float(place["lng"])
-            place_location = (lat, lng)
-            
-            distance = geodesic((user_lat, user_lng), place_location).kilometers
-            if distance > self.max_distance_km:
-                return False
-            
-            rating = place.get("rating")
-            if rating is not None and float(rating) < self.min_rating:
-                return False
-            
-            return True
-            
-        except (ValueError, TypeError):
-            return False
\ No newline at end of file
+    def _top_per_task(self, places: PlaceBatch, mask: np.ndarray, per_task: int, max_tasks: int) -> np.ndarray:
+        """
+        Indices of the `per_task` best-rated places for each task type among `mask`,
+        best first; ties keep the earlier place. Task types come out in the order they
+        first appear, at most `max_tasks` of them.
+        """
+        has_task = np.fromiter((bool(task_type) for task_type in places.task_type), dtype=bool, count=len(places))
+        indices = np.flatnonzero(mask & has_task)
+        if not len(indices):
+            return indices
+        _, first_seen, groups = np.unique(
+            places.task_type[indices].astype(str), return_index=True, return_inverse=True
+        )
+        score = np.nan_to_num(places.rating[indices], nan=0.0)
+        ranked = np.lexsort((np.arange(len(indices)), -score, groups))
+        group_starts = np.flatnonzero(np.r_[True, groups[ranked][1:] != groups[ranked][:-1]])
+        rank = np.arange(len(ranked)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(ranked)]))
+        top = ranked[rank < per_task]
+        task_rank = np.argsort(np.argsort(first_seen))
+        top = top[np.argsort(task_rank[groups[top]], kind="stable")]
+        return indices[top[task_rank[groups[top]] < max_tasks]]
\ No newline at end of file
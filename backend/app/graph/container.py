@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.agents.formatter import FormatterAgent
+from app.agents.place_search import PlaceSearchAgent
+from app.agents.replanner import ReplanAgent
+from app.agents.routing import RoutingAgent
+from app.agents.task_decomposer import TaskDecomposerAgent
+from app.agents.validator import ValidationAgent
+from app.services.cache import CacheService
+from app.services.decomposition_cache import DecompositionMemo
+from app.services.foursquare import FoursquareService
+from app.services.http_client import HTTPClientRegistry, http_clients
+from app.services.matrix_provider import MatrixService, create_matrix_provider
+from app.services.place_cache import PlaceSearchCache
+from app.services.place_store import PlaceStore
+from app.services.plan_cache import PlanCache
+from app.services.routing_service import RoutingService
+from app.services.serpapi_service import SerpAPIService
+from app.services.solver_executor import SolverExecutor
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    App-lifetime services and agents shared by every request.
+
+    Built once at startup and bound into the compiled workflow, so the request
+    path never constructs LLM clients, HTTP clients or agents. Every agent held
+    here must stay stateless between calls.
+    """
+
+    def __init__(self, http_registry: Optional[HTTPClientRegistry] = None):
+        # Shared infrastructure
+        self.cache = CacheService()
+        self.http_clients = http_registry or http_clients
+        self.place_cache: Optional[PlaceSearchCache] = (
+            PlaceSearchCache(self.cache) if settings.place_cache_enabled else None
+        )
+        self.decomposition_memo: Optional[DecompositionMemo] = (
+            DecompositionMemo(self.cache) if settings.decomposition_memo_enabled else None
+        )
+        self.place_store: Optional[PlaceStore] = (
+            PlaceStore(settings.place_store_dir, settings.place_store_cell_degrees)
+            if settings.place_store_enabled else None
+        )
+
+        # Provider services
+        self.foursquare = FoursquareService(http_registry=self.http_clients)
+        self.serpapi = SerpAPIService(http_registry=self.http_clients)
+        self.routing_service = RoutingService(
+            matrix_service=MatrixService(create_matrix_provider(http_registry=self.http_clients))
+        )
+        self.solver = SolverExecutor()
+
+        # Agents
+        self.task_decomposer = TaskDecomposerAgent(memo=self.decomposition_memo)
+        self.place_search = PlaceSearchAgent(
+            foursquare=self.foursquare,
+            serpapi=self.serpapi,
+            result_cache=self.place_cache,
+            place_store=self.place_store,
+        )
+        self.validator = ValidationAgent()
+        self.routing_agent = RoutingAgent(routing_service=self.routing_service, solver=self.solver)
+        self.formatter = FormatterAgent(serpapi_service=self.serpapi)
+        self.plans = PlanCache(self.cache)
+        self.replanner = ReplanAgent(
+            plans=self.plans,
+            task_decomposer=self.task_decomposer,
+            place_search=self.place_search,
+            validator=self.validator,
+            routing_agent=self.routing_agent,
+            formatter=self.formatter,
+        )
+
+        logger.info("📦 ServiceContainer built")
+
+    async def startup(self):
+        await self.cache.connect()
+        await self.http_clients.startup()
+        await self.solver.startup()
+        if self.place_store is not None:
+            await asyncio.to_thread(self.place_store.open)
+        logger.info("✅ ServiceContainer started")
+
+    async def shutdown(self):
+        await self.http_clients.shutdown()
+        await self.cache.close()
+        await self.solver.shutdown()
+        if self.place_store is not None:
+            self.place_store.close()
+        logger.info("👋 ServiceContainer shut down")
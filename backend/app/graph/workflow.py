@@ -1,35 +1,38 @@
 import logging
-from typing import List, Dict, Any
+import time
+from functools import partial
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 
 from app.models.graph_state import GraphState
-from app.agents.task_decomposer import TaskDecomposerAgent
-from app.agents.place_search import PlaceSearchAgent
-from app.agents.routing import RoutingAgent
-from app.agents.formatter import FormatterAgent
-from app.agents.validator import ValidationAgent
+from app.models.place_batch import PlaceBatch
+from app.services.plan_cache import build_context
+from app.utils.metrics import NODE_DURATION, NODES_IN_PROGRESS
+
+if TYPE_CHECKING:
+    from app.graph.container import ServiceContainer
 
 logger = logging.getLogger(__name__)
 
 # --- Agent Node Functions ---
 
-async def decompose_tasks(state: GraphState) -> Dict[str, Any]:
+async def decompose_tasks(state: GraphState, container: "ServiceContainer") -> Dict[str, Any]:
     logger.info("--- 🔄 NODE: DECOMPOSING TASKS ---")
     
     try:
-        agent = TaskDecomposerAgent()
+        agent = container.task_decomposer
         # Handle different possible key names for user input to avoid KeyError
         user_input = state.get("user_input") or state.get("user_text") or state.get("text", "")
         lat = state.get("lat") or state.get("latitude", 0)
         lng = state.get("lng") or state.get("longitude", 0)
         
-        logger.info(f"📝 Processing user input: {user_input}")
-        logger.info(f"📍 Location: {lat}, {lng}")
+        logger.debug("📝 Processing user input: %s", user_input)
+        logger.info("📍 Location: %s, %s", lat, lng)
         
         tasks = await agent.decompose_task(user_input, (lat, lng))
         
-        logger.info(f"✅ Decomposed {len(tasks)} tasks")
+        logger.info("✅ Decomposed %s tasks", len(tasks))
         
         return {
             "tasks": tasks,
@@ -37,23 +40,23 @@ async def decompose_tasks(state: GraphState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"❌ Error in decompose_tasks: {str(e)}")
+        logger.error("❌ Error in decompose_tasks: %s", e)
         raise
 
-async def search_places(state: GraphState) -> Dict[str, Any]:
+async def search_places(state: GraphState, container: "ServiceContainer") -> Dict[str, Any]:
     logger.info("--- 🔍 NODE: SEARCHING PLACES ---")
     
     try:
-        agent = PlaceSearchAgent()
+        agent = container.place_search
         tasks = state.get("tasks", [])
         lat = state.get("lat") or state.get("latitude", 0)
         lng = state.get("lng") or state.get("longitude", 0)
         
-        logger.info(f"🎯 Searching for {len(tasks)} tasks at location: {lat}, {lng}")
+        logger.info("🎯 Searching for %s tasks at location: %s, %s", len(tasks), lat, lng)
         
         places = await agent.search_all_tasks(tasks, lat, lng)
         
-        logger.info(f"✅ Found {len(places)} places")
+        logger.info("✅ Found %s places", len(places))
         
         return {
             "places": places,
@@ -61,23 +64,23 @@ async def search_places(state: GraphState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"❌ Error in search_places: {str(e)}")
+        logger.error("❌ Error in search_places: %s", e)
         raise
 
-async def validate_places(state: GraphState) -> Dict[str, Any]:
+async def validate_places(state: GraphState, container: "ServiceContainer") -> Dict[str, Any]:
     logger.info("--- ✅ NODE: VALIDATING PLACES ---")
     
     try:
-        agent = ValidationAgent()
+        agent = container.validator
         places = state.get("places", [])
         lat = state.get("lat") or state.get("latitude", 0)
         lng = state.get("lng") or state.get("longitude", 0)
         
-        logger.info(f"🔍 Validating {len(places)} places")
+        logger.info("🔍 Validating %s places", len(places))
         
         validated_places = await agent.validate_places(places, lat, lng)
         
-        logger.info(f"✅ Validated {len(validated_places)} places")
+        logger.info("✅ Validated %s places", len(validated_places))
         
         return {
             "validated_places": validated_places,
@@ -85,53 +88,65 @@ async def validate_places(state: GraphState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"❌ Error in validate_places: {str(e)}")
+        logger.error("❌ Error in validate_places: %s", e)
         raise
 
-async def optimize_route(state: GraphState) -> Dict[str, Any]:
+async def optimize_route(state: GraphState, container: "ServiceContainer") -> Dict[str, Any]:
     logger.info("--- 🛤️ NODE: OPTIMIZING ROUTE ---")
     
     try:
-        agent = RoutingAgent()
+        agent = container.routing_agent
         validated_places = state.get("validated_places", [])
         lat = state.get("lat") or state.get("latitude", 0)
         lng = state.get("lng") or state.get("longitude", 0)
         
-        logger.info(f"🚗 Optimizing route for {len(validated_places)} places")
+        logger.info("🚗 Optimizing route for %s places", len(validated_places))
         
-        optimized_route = await agent.optimize_route(validated_places, lat, lng)
+        optimized_route, travel_matrix = await agent.plan_route(validated_places, lat, lng)
         
-        logger.info(f"✅ Route optimized with {len(optimized_route)} stops")
+        logger.info("✅ Route optimized with %s stops", len(optimized_route))
         
         return {
             "optimized_route": optimized_route,
+            "travel_matrix": travel_matrix,
             "current_step": "format"
         }
         
     except Exception as e:
-        logger.error(f"❌ Error in optimize_route: {str(e)}")
+        logger.error("❌ Error in optimize_route: %s", e)
         raise
 
-async def format_plan(state: GraphState) -> Dict[str, Any]:
+async def format_plan(state: GraphState, container: "ServiceContainer") -> Dict[str, Any]:
     logger.info("--- 📋 NODE: FORMATTING PLAN ---")
     
     try:
-        agent = FormatterAgent()
+        agent = container.formatter
         optimized_route = state.get("optimized_route", [])
         lat = state.get("lat") or state.get("latitude", 0)
         lng = state.get("lng") or state.get("longitude", 0)
         user_location = {"lat": lat, "lng": lng}
         
-        logger.info(f"📝 Formatting plan with {len(optimized_route)} stops")
+        logger.info("📝 Formatting plan with %s stops", len(optimized_route))
         
         final_plan = await agent.format_plan(optimized_route, user_location)
         
         logger.info("✅ Plan formatted successfully")
         
+        # Keep the plan for GET /plan/{plan_id}, and what produced it so PATCH can edit it incrementally
+        validated_places = state.get("validated_places")
+        context = None
+        if container.plans.enabled and isinstance(validated_places, PlaceBatch) and isinstance(optimized_route, PlaceBatch):
+            user_input = state.get("user_input") or state.get("user_text") or state.get("text", "")
+            context = build_context(
+                user_input, lat, lng, state.get("tasks") or [], validated_places, optimized_route,
+                state.get("travel_matrix"),
+            )
+        await container.plans.save(final_plan, context)
+        
         # Log the final state for debugging
-        logger.info(f"🔍 Final state keys: {list(state.keys())}")
+        logger.debug("🔍 Final state keys: %s", list(state.keys()))
         if "final_plan" in locals():
-            logger.info(f"📋 Plan formatted successfully")
+            logger.info("📋 Plan formatted successfully")
         
         return {
             "final_plan": final_plan.dict() if hasattr(final_plan, 'dict') else final_plan,
@@ -139,18 +154,65 @@ async def format_plan(state: GraphState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"❌ Error in format_plan: {str(e)}")
+        logger.error("❌ Error in format_plan: %s", e)
         raise
 
+# --- Streaming Metadata ---
+
+# Progress reported to streaming clients as each node completes: (step, message, progress)
+NODE_PROGRESS = {
+    "decompose": ("decomposing", "Understood your errands", 20),
+    "search": ("searching", "Found candidate places", 50),
+    "validate": ("validating", "Filtered and validated locations", 70),
+    "optimize": ("optimizing", "Optimized your route", 90),
+    "format": ("formatting", "Your plan is ready", 100),
+}
+
+# State key each node exposes to streaming clients as its partial result
+NODE_OUTPUTS = {
+    "decompose": "tasks",
+    "search": "places",
+    "validate": "validated_places",
+    "optimize": "optimized_route",
+}
+
 # --- Workflow Definition ---
 
-def create_workflow():
+def _instrumented(node: str, fn):
+    """Wrap a node so its latency and in-flight count are exported on /metrics."""
+    async def run(state: GraphState) -> Dict[str, Any]:
+        outcome = "error"
+        started = time.perf_counter()
+        with NODES_IN_PROGRESS.labels(node=node).track_inprogress():
+            try:
+                result = await fn(state)
+                outcome = "ok"
+                return result
+            finally:
+                NODE_DURATION.labels(node=node, outcome=outcome).observe(time.perf_counter() - started)
+    return run
+
+def create_workflow(container: Optional["ServiceContainer"] = None):
+    """
+    Compile the planning graph with every node bound to `container`.
+
+    Callers that manage the app lifecycle pass the container built at startup;
+    otherwise a fresh one is created here.
+    """
+    if container is None:
+        from app.graph.container import ServiceContainer
+        container = ServiceContainer()
+    
     workflow = StateGraph(GraphState)
-    workflow.add_node("decompose", decompose_tasks)
-    workflow.add_node("search", search_places)
-    workflow.add_node("validate", validate_places)
-    workflow.add_node("optimize", optimize_route)
-    workflow.add_node("format", format_plan)
+    nodes = {
+        "decompose": decompose_tasks,
+        "search": search_places,
+        "validate": validate_places,
+        "optimize": optimize_route,
+        "format": format_plan,
+    }
+    for name, fn in nodes.items():
+        workflow.add_node(name, _instrumented(name, partial(fn, container=container)))
 
     workflow.set_entry_point("decompose")
     workflow.add_edge("decompose", "search")
@@ -1,21 +1,25 @@
+import asyncio
 import logging
 import json
 import os
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from pydantic import ValidationError
 
-from app.models.request_models import PlanRequest, FeedbackRequest
-from app.services.cache import CacheService
+from app.models.place_batch import PlaceBatch
+from app.models.request_models import PlanRequest, BatchPlanRequest, FeedbackRequest, PlanPatchRequest
+from app.models.response_models import ProgressUpdate, NodeProgress, StreamEvent, BatchItemResult, BatchPlanResponse
 from app.utils.config import settings
-from app.graph.workflow import create_workflow
+from app.graph.container import ServiceContainer
+from app.graph.workflow import create_workflow, NODE_PROGRESS, NODE_OUTPUTS
+from app.services.batch_memo import BatchMemo
+from app.utils import metrics
+from app.utils.logging_config import setup_logging, log_payload
 
-# Configure logging for production
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# One queue-backed logging pipeline for the whole app, driven by LOG_LEVEL
+setup_logging(settings.log_level)
 logger = logging.getLogger(__name__)
 
 # Detect environment
@@ -52,9 +56,10 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -66,20 +71,29 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 # Initialize services with error handling
+container = None
 cache = None
 workflow = None
 
 @app.on_event("startup")
 async def startup_event():
-    global cache, workflow
+    global container, cache, workflow
     try:
-        cache = CacheService()
-        workflow = create_workflow()
+        container = ServiceContainer()
+        await container.startup()
+        cache = container.cache
+        workflow = create_workflow(container)
         logger.info("✅ Services initialized successfully")
     except Exception as e:
         logger.error(f"❌ Failed to initialize services: {e}")
         # Don't raise in production, let the app start and handle errors gracefully
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if container:
+        await container.shutdown()
+    logger.info("👋 Services shut down")
+
 @app.post("/plan-test")
 async def test_plan():
     # Test with hardcoded valid data
@@ -117,83 +131,257 @@ async def debug_plan(request: Request):
         logger.error(f"❌ DEBUG: Error: {e}")
         return {"status": "error", "message": str(e)}
 
+def _build_initial_state(request: PlanRequest) -> dict:
+    # Create initial state with consistent key naming
+    return {
+        "user_input": request.user_text,  # Use correct attribute name
+        "lat": request.lat,
+        "lng": request.lng, 
+        "preferences": getattr(request, 'preferences', {}),  # Safe access to preferences
+        "current_step": "decompose"
+    }
+
+def _sse(event_type: str, data: dict) -> str:
+    event = StreamEvent(type=event_type, data=jsonable_encoder(data, custom_encoder={PlaceBatch: PlaceBatch.to_dicts}))
+    return f"data: {json.dumps(event.dict())}\n\n"
+
+def _plan_response(result: dict) -> dict:
+    """Shape a finished workflow state into the /plan response body"""
+    # Extract the final plan from the result
+    final_plan = result.get("final_plan")
+    if final_plan:
+        log_payload(logger, "📋 Plan found in result", final_plan)
+        return final_plan
+
+    # If no final_plan, construct response from optimized_route
+    optimized_route = result.get("optimized_route", [])
+    if isinstance(optimized_route, PlaceBatch):
+        optimized_route = optimized_route.to_dicts()
+    if optimized_route:
+        logger.info("📋 Constructing plan from optimized_route with %d stops", len(optimized_route))
+
+        # Calculate total distance and time from the optimized route
+        total_distance = sum(stop.get("distance_km", 0) for stop in optimized_route)
+        total_time = sum(stop.get("duration_minutes", 0) for stop in optimized_route)
+
+        # Format time
+        if total_time >= 60:
+            time_formatted = f"~{total_time // 60}h {total_time % 60}m"
+        else:
+            time_formatted = f"~{total_time}m"
+
+        response = {
+            "stops": optimized_route,
+            "success": True,
+            "total_stops": len(optimized_route),
+            "total_time": time_formatted,
+            "total_distance_km": round(total_distance, 2),
+            "message": f"Found {len(optimized_route)} stops for your errands"
+        }
+
+        log_payload(logger, "📤 Sending response", response)
+        return response
+    else:
+        logger.warning("⚠️ No plan data found in workflow result")
+        return {
+            "stops": [],
+            "success": False,
+            "error": "No route data generated",
+            "message": "Unable to generate a route plan"
+        }
+
 @app.post("/plan")
 async def create_plan(request: PlanRequest):
     """Create a new errand plan"""
-    logger.info(f"🌐 Received /plan request")
-    logger.info(f"📝 Request user_text: {request.user_text}")
-    logger.info(f"📍 Request lat: {request.lat}")
-    logger.info(f"📍 Request lng: {request.lng}")
+    logger.info("🌐 Received /plan request", extra={"lat": request.lat, "lng": request.lng})
+    logger.debug("📝 Request user_text: %s", request.user_text)
     
     try:
         if not workflow:
             raise HTTPException(status_code=503, detail="Service not initialized")
             
-        # Create initial state with consistent key naming
-        initial_state = {
-            "user_input": request.user_text,  # Use correct attribute name
-            "lat": request.lat,
-            "lng": request.lng, 
-            "preferences": getattr(request, 'preferences', {}),  # Safe access to preferences
-            "current_step": "decompose"
-        }
+        initial_state = _build_initial_state(request)
         
-        logger.info(f"🔧 Initial state: {initial_state}")
+        logger.debug("🔧 Initial state: %s", initial_state)
 
         # Execute the workflow synchronously
         result = await workflow.ainvoke(initial_state)
         
-        logger.info(f"✅ Workflow completed")
-        logger.info(f"🔍 Final result keys: {list(result.keys())}")
+        logger.info("✅ Workflow completed")
+        logger.debug("🔍 Final result keys: %s", list(result.keys()))
         
-        # Extract the final plan from the result
-        final_plan = result.get("final_plan")
-        if final_plan:
-            logger.info(f"📋 Plan found in result")
-            return final_plan
-        
-        # If no final_plan, construct response from optimized_route
-        optimized_route = result.get("optimized_route", [])
-        if optimized_route:
-            logger.info(f"📋 Constructing plan from optimized_route with {len(optimized_route)} stops")
-            
-            # Calculate total distance and time from the optimized route
-            total_distance = sum(stop.get("distance_km", 0) for stop in optimized_route)
-            total_time = sum(stop.get("duration_minutes", 0) for stop in optimized_route)
-            
-            # Format time
-            if total_time >= 60:
-                time_formatted = f"~{total_time // 60}h {total_time % 60}m"
-            else:
-                time_formatted = f"~{total_time}m"
-            
-            response = {
-                "stops": optimized_route,
-                "success": True,
-                "total_stops": len(optimized_route),
-                "total_time": time_formatted,
-                "total_distance_km": round(total_distance, 2),
-                "message": f"Found {len(optimized_route)} stops for your errands"
-            }
-            
-            logger.info(f"📤 Sending response: {response}")
-            return response
-        else:
-            logger.warning("⚠️ No plan data found in workflow result")
-            return {
-                "stops": [],
-                "success": False,
-                "error": "No route data generated",
-                "message": "Unable to generate a route plan"
-            }
+        return _plan_response(result)
         
     except ValidationError as e:
         logger.error(f"Validation error: {e}")
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        logger.error(f"❌ Error in create_plan: {str(e)}", exc_info=True)
+        logger.error("❌ Error in create_plan: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to generate plan: {str(e)}")
 
+@app.post("/plan/stream")
+async def stream_plan(request: PlanRequest):
+    """Create a new errand plan, streaming a Server-Sent Event as each graph node completes"""
+    logger.info("🌐 Received /plan/stream request", extra={"lat": request.lat, "lng": request.lng})
+    
+    if not workflow:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    
+    initial_state = _build_initial_state(request)
+    
+    async def event_stream():
+        yield _sse("progress", ProgressUpdate(
+            step="starting", message="Understanding your errands...", progress=5, status="processing"
+        ).dict())
+        
+        final_plan = None
+        try:
+            async for update in workflow.astream(initial_state, stream_mode="updates"):
+                for node, output in update.items():
+                    output = output or {}
+                    step, message, progress = NODE_PROGRESS.get(node, (node, node, 0))
+                    output_key = NODE_OUTPUTS.get(node)
+                    yield _sse("progress", NodeProgress(
+                        node=node,
+                        step=step,
+                        message=message,
+                        progress=progress,
+                        status="processing",
+                        partial={output_key: output.get(output_key)} if output_key else None
+                    ).dict())
+                    if output.get("final_plan"):
+                        final_plan = output["final_plan"]
+            
+            if final_plan:
+                logger.info("✅ Streamed plan completed")
+                yield _sse("complete", final_plan)
+            else:
+                logger.warning("⚠️ No plan data found in streamed workflow result")
+                yield _sse("error", {"message": "Unable to generate a route plan"})
+        except Exception as e:
+            logger.error("❌ Error in stream_plan: %s", e, exc_info=True)
+            yield _sse("error", {"message": f"Failed to generate plan: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _start_batch(batch: BatchPlanRequest):
+    """Validate a batch and start one workflow task per item, sharing lookups through a BatchMemo"""
+    if not workflow:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    if len(batch.requests) > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.batch_max_items} requests")
+    
+    memo = BatchMemo()
+    semaphore = asyncio.Semaphore(settings.batch_max_concurrency)
+    
+    async def run_item(index: int, request: PlanRequest) -> BatchItemResult:
+        async with semaphore:
+            try:
+                result = await workflow.ainvoke(_build_initial_state(request))
+                return BatchItemResult(index=index, status="completed", plan=jsonable_encoder(_plan_response(result)))
+            except Exception as e:
+                logger.error("❌ Batch item %d failed: %s", index, e, exc_info=True)
+                return BatchItemResult(index=index, status="error", error=f"Failed to generate plan: {e}")
+    
+    tasks = [memo.spawn(run_item(i, request)) for i, request in enumerate(batch.requests)]
+    return memo, tasks
+
+def _batch_stats(memo: BatchMemo, results) -> dict:
+    return {
+        "items": len(results),
+        "completed": sum(1 for result in results if result.status == "completed"),
+        **memo.stats(),
+    }
+
+@app.post("/plan/batch", response_model=BatchPlanResponse)
+async def create_plan_batch(batch: BatchPlanRequest):
+    """Create plans for several requests at once; identical decompositions and place searches run once"""
+    logger.info("🌐 Received /plan/batch request", extra={"items": len(batch.requests)})
+    memo, tasks = _start_batch(batch)
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await memo.aclose()
+    
+    stats = _batch_stats(memo, results)
+    logger.info("✅ Batch completed", extra=stats)
+    return BatchPlanResponse(results=results, stats=stats)
+
+@app.post("/plan/batch/stream")
+async def stream_plan_batch(batch: BatchPlanRequest):
+    """Create plans for several requests at once, streaming a Server-Sent Event as each item finishes"""
+    logger.info("🌐 Received /plan/batch/stream request", extra={"items": len(batch.requests)})
+    memo, tasks = _start_batch(batch)
+    
+    async def event_stream():
+        results = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                results.append(result)
+                yield _sse("item", result.dict())
+            stats = _batch_stats(memo, results)
+            logger.info("✅ Streamed batch completed", extra=stats)
+            yield _sse("complete", {"stats": stats})
+        finally:
+            # Client disconnects close this generator; stop the remaining items with it
+            for task in tasks:
+                task.cancel()
+            await memo.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored and "*" matches anything."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+@app.get("/plan/{plan_id}")
+async def get_plan(plan_id: str, request: Request):
+    """Fetch a finished plan; send its ETag back in If-None-Match to get a 304 when it is unchanged"""
+    if not container:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    
+    rendered = await container.plans.get_rendered(plan_id)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Plan not found or expired")
+    headers = {"ETag": rendered.etag, "Cache-Control": settings.plan_cache_control}
+    if _etag_matches(request.headers.get("if-none-match", ""), rendered.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=rendered.body, media_type="application/json", headers=headers)
+
+@app.patch("/plan/{plan_id}")
+async def patch_plan(plan_id: str, edit: PlanPatchRequest):
+    """Add or remove errands on an existing plan, reusing its tasks, places, travel matrix and route"""
+    logger.info("🌐 Received PATCH /plan/%s", plan_id)
+    
+    if not container:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    if not container.plans.enabled:
+        raise HTTPException(status_code=503, detail="Plan storage unavailable")
+    
+    try:
+        plan = await container.replanner.patch_plan(plan_id, edit)
+    except Exception as e:
+        logger.error("❌ Error in patch_plan: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to update plan: {str(e)}")
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Plan not found or expired")
+    return plan
+
 @app.post("/feedback")
 async def submit_feedback(request: FeedbackRequest):
     """Submit feedback for a plan"""
@@ -215,6 +403,11 @@ def health_check():
         "environment": "production" if IS_PRODUCTION else "development"
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 @app.get("/test")
 def test_endpoint():
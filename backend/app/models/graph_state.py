@@ -1,6 +1,9 @@
 from typing import Dict, List, Any, Optional
 from typing_extensions import TypedDict
 
+from app.models.place_batch import PlaceBatch
+from app.services.matrix_provider import TravelMatrix
+
 
 class GraphState(TypedDict, total=False):
     # User input and location
@@ -18,9 +21,10 @@ class GraphState(TypedDict, total=False):
     
     # Results from different steps
     tasks: Optional[List[Dict[str, Any]]]
-    places: Optional[List[Dict[str, Any]]]
-    validated_places: Optional[List[Dict[str, Any]]]
-    optimized_route: Optional[List[Dict[str, Any]]]
+    places: Optional[PlaceBatch]
+    validated_places: Optional[PlaceBatch]
+    optimized_route: Optional[PlaceBatch]
+    travel_matrix: Optional[TravelMatrix]  # over [start] + validated_places; kept for plan edits
     final_plan: Optional[Dict[str, Any]]
     
     # Error handling
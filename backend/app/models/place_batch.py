@@ -0,0 +1,209 @@
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Low-cardinality string columns; equal values share one object, so comparisons are by identity
+_INTERNED = ("source", "category", "task_type")
+_STRINGS = ("id", "name", "address", "eta") + _INTERNED
+
+def _intern(value: Any) -> Optional[str]:
+    return sys.intern(str(value)) if value is not None else None
+
+
+def _object_array(values: Iterable[Any], size: int) -> np.ndarray:
+    array = np.empty(size, dtype=object)
+    array[:] = list(values)
+    return array
+
+
+class PlaceRow:
+    """
+    Read-only view of one place in a PlaceBatch.
+
+    Supports the dict access the agents used before (`row["lat"]`, `row.get("rating")`),
+    so code that only reads a place works with either. Nothing is copied until
+    `to_dict()`.
+    """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "PlaceBatch", index: int):
+        self._batch = batch
+        self._index = index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._batch._value(key, self._index)
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._batch._value(key, self._index)
+        if value is None and key not in self._batch.columns:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._batch.columns
+
+    def __getattr__(self, key: str) -> Any:
+        if key not in PlaceBatch.columns:
+            raise AttributeError(key)
+        return self._batch._value(key, self._index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._batch._row_dict(self._index)
+
+    def __repr__(self) -> str:
+        return f"PlaceRow({self.to_dict()!r})"
+
+
+class PlaceBatch:
+    """
+    Struct-of-arrays candidate places passed between the graph nodes.
+
+    Coordinates are one (n, 2) float64 array, so validation masks and the router's
+    distance matrix read them without re-extracting per place. Ratings, leg
+    distances (km) and leg durations (minutes) are float64 with NaN for "unknown",
+    routing order is int32 (0 while unrouted) and the string columns are object
+    arrays with interned categories, sources and task types.
+
+    Batches are treated as immutable: `take()` returns a new batch and
+    `with_route()` returns a routed copy.
+    """
+
+    __slots__ = ("coords", "rating", "distance", "duration_minutes", "order", "id", "name", "address", "eta",
+                 "source", "category", "task_type")
+
+    # Keys a row exposes, in the order `to_dicts()` emits them; route keys only once routed
+    place_columns = ("source", "id", "name", "category", "address", "lat", "lng", "rating", "task_type")
+    route_columns = ("order", "google_maps_url", "distance", "duration_minutes", "eta")
+    columns = place_columns + route_columns
+
+    def __init__(self, coords: np.ndarray, rating: np.ndarray, distance: np.ndarray, duration_minutes: np.ndarray,
+                 order: np.ndarray, **strings: np.ndarray):
+        self.coords = coords
+        self.rating = rating
+        self.distance = distance
+        self.duration_minutes = duration_minutes
+        self.order = order
+        for name in _STRINGS:
+            setattr(self, name, strings[name])
+
+    @classmethod
+    def empty(cls) -> "PlaceBatch":
+        return cls.from_dicts([])
+
+    @classmethod
+    def from_dicts(cls, places: Sequence[Dict[str, Any]]) -> "PlaceBatch":
+        """Build a batch from processed place dicts; missing or unparsable coordinates become NaN."""
+        size = len(places)
+        coords = np.full((size, 2), np.nan)
+        rating = np.full(size, np.nan)
+        for i, place in enumerate(places):
+            try:
+                coords[i] = (float(place.get("lat")), float(place.get("lng")))
+            except (TypeError, ValueError):
+                pass
+            try:
+                if place.get("rating") is not None:
+                    rating[i] = float(place["rating"])
+            except (TypeError, ValueError):
+                pass
+        distance, duration = (
+            np.array([np.nan if p.get(key) is None else float(p[key]) for p in places], dtype=np.float64)
+            for key in ("distance", "duration_minutes")
+        )
+        strings = {
+            name: _object_array(
+                ((_intern(p.get(name)) if name in _INTERNED else p.get(name)) for p in places), size
+            )
+            for name in _STRINGS
+        }
+        return cls(coords, rating, distance, duration, np.array([p.get("order") or 0 for p in places], dtype=np.int32),
+                   **strings)
+
+    @classmethod
+    def concat(cls, batches: Iterable["PlaceBatch"]) -> "PlaceBatch":
+        batches = list(batches)
+        if not batches:
+            return cls.empty()
+        return cls(
+            np.concatenate([b.coords for b in batches]).reshape(-1, 2),
+            np.concatenate([b.rating for b in batches]),
+            np.concatenate([b.distance for b in batches]),
+            np.concatenate([b.duration_minutes for b in batches]),
+            np.concatenate([b.order for b in batches]),
+            **{name: np.concatenate([getattr(b, name) for b in batches]) for name in _STRINGS},
+        )
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def __iter__(self) -> Iterator[PlaceRow]:
+        return (PlaceRow(self, i) for i in range(len(self)))
+
+    def __getitem__(self, index: int) -> PlaceRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return PlaceRow(self, index)
+
+    @property
+    def lat(self) -> np.ndarray:
+        return self.coords[:, 0]
+
+    @property
+    def lng(self) -> np.ndarray:
+        return self.coords[:, 1]
+
+    def take(self, selector: Union[np.ndarray, Sequence[int]]) -> "PlaceBatch":
+        """Rows picked by an index array or boolean mask, in that order."""
+        selector = np.asarray(selector)
+        if selector.dtype != bool:
+            selector = selector.astype(np.intp)
+        return PlaceBatch(
+            self.coords[selector], self.rating[selector], self.distance[selector],
+            self.duration_minutes[selector], self.order[selector],
+            **{name: getattr(self, name)[selector] for name in _STRINGS},
+        )
+
+    def with_route(self, distance_km: np.ndarray, duration_minutes: np.ndarray, eta: Sequence[str],
+                   ids: Sequence[str]) -> "PlaceBatch":
+        """A copy in visiting order with leg distances and durations, ETAs and stop ids filled in."""
+        routed = self.take(np.arange(len(self)))
+        routed.distance = np.asarray(distance_km, dtype=np.float64)
+        routed.duration_minutes = np.asarray(duration_minutes, dtype=np.float64)
+        routed.order = np.arange(1, len(self) + 1, dtype=np.int32)
+        routed.eta = _object_array(eta, len(self))
+        routed.id = _object_array(ids, len(self))
+        return routed
+
+    def _value(self, key: str, index: int) -> Any:
+        if key == "lat" or key == "lng":
+            value = self.coords[index, 0 if key == "lat" else 1]
+            return None if np.isnan(value) else float(value)
+        if key in ("rating", "distance", "duration_minutes"):
+            value = getattr(self, key)[index]
+            return None if np.isnan(value) else float(value)
+        if key == "order":
+            return int(self.order[index]) or None
+        if key == "google_maps_url":
+            if not self.order[index]:
+                return None
+            lat, lng = self.coords[index]
+            return f"https://maps.google.com/?daddr={lat},{lng}"
+        if key in _STRINGS:
+            return getattr(self, key)[index]
+        return None
+
+    def _row_dict(self, index: int) -> Dict[str, Any]:
+        keys = self.columns if self.order[index] else self.place_columns
+        return {key: self._value(key, index) for key in keys}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Plain dicts, e.g. for JSON responses and streamed partial results."""
+        return [self._row_dict(i) for i in range(len(self))]
+
+    def __repr__(self) -> str:
+        return f"PlaceBatch({len(self)} places)"
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
@@ -8,6 +8,14 @@ class PlanRequest(BaseModel):
     lng: float
     preferences: Optional[Dict[str, Any]] = None
 
+class BatchPlanRequest(BaseModel):
+    requests: List[PlanRequest] = Field(..., min_length=1)
+
+class PlanPatchRequest(BaseModel):
+    add_text: Optional[str] = None  # new errands in free text, e.g. "also pick up stamps"
+    remove_tasks: List[str] = Field(default_factory=list)  # task types to drop, e.g. ["pharmacy"]
+    remove_stop_ids: List[str] = Field(default_factory=list)
+
 class FeedbackStop(BaseModel):
     stop_id: str
     rating: int
@@ -29,6 +29,24 @@ class ProgressUpdate(BaseModel):
     progress: int
     status: str
 
+class NodeProgress(ProgressUpdate):
+    node: str
+    partial: Optional[Dict[str, Any]] = None
+
+class StreamEvent(BaseModel):
+    type: str  # "progress", "item", "complete" or "error"
+    data: Dict[str, Any]
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str  # "completed" or "error"
+    plan: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class BatchPlanResponse(BaseModel):
+    results: List[BatchItemResult]
+    stats: Dict[str, int]
+
 class RouteResponse(BaseModel):
     summary: str
     routes: List[Dict[str, Any]]
@@ -0,0 +1,64 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+
+from app.utils.metrics import BATCH_DEDUPLICATED
+
+logger = logging.getLogger(__name__)
+
+_current_batch: contextvars.ContextVar[Optional["BatchMemo"]] = contextvars.ContextVar("batch_memo", default=None)
+
+
+def current_batch_memo() -> Optional["BatchMemo"]:
+    """The memo of the batch the current task belongs to, or None outside /plan/batch."""
+    return _current_batch.get()
+
+
+class BatchMemo:
+    """
+    Runs each keyed lookup once per batch and shares its result with every item.
+
+    Items are started with `spawn()`, which binds this memo into the item's context.
+    The agents look it up with `current_batch_memo()`, so the workflow and its state
+    stay unchanged. Keys are "<kind>:<...>" (e.g. "decomp:...", "places:...").
+    Results live only as long as the batch, so unlike the shared caches there is no
+    staleness to manage.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        context = contextvars.copy_context()
+        context.run(_current_batch.set, self)
+        return asyncio.create_task(coro, context=context)
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(factory())
+            self._tasks[key] = task
+        else:
+            self.hits += 1
+            BATCH_DEDUPLICATED.labels(kind=key.split(":", 1)[0]).inc()
+            logger.debug("♻️ Batch reuse for '%s'", key)
+        # Shielded: one item being cancelled must not cancel the lookup other items share.
+        return await asyncio.shield(task)
+
+    async def aclose(self):
+        pending = [task for task in self._tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        # Failed lookups nobody awaited again would otherwise log "exception was never retrieved".
+        for task in self._tasks.values():
+            if not task.cancelled():
+                task.exception()
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"lookups": self.hits + self.misses, "deduplicated": self.hits}
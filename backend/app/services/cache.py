@@ -1,60 +1,214 @@
 import redis
-import json
+import redis.asyncio
 import logging
-from typing import Any, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.services.cache_codec import CacheCodec
 from app.utils.config import settings
+from app.utils.metrics import CACHE_REQUESTS, CACHE_VALUE_BYTES
 
 logger = logging.getLogger(__name__)
 
+def _keyspace(key: str) -> str:
+    # Keys are "<prefix>:..." with a handful of fixed prefixes, which keeps the label bounded
+    return key.split(":", 1)[0]
+
+class CachePipeline:
+    """
+    Batches cache operations so they cost a single Redis round trip.
+
+    Commands are queued with `get`/`set`/`delete` and sent together by `execute()`.
+    `results` holds one entry per queued command, in order, with GET values decoded;
+    `ok` is False when the round trip or any command in it failed (or there is no Redis).
+    """
+
+    def __init__(self, pipe, cache: "CacheService"):
+        self._pipe = pipe
+        self._cache = cache
+        self._ops: List[str] = []
+        self.results: List[Any] = []
+        self.ok = False
+
+    def get(self, key: str) -> "CachePipeline":
+        self._ops.append("get")
+        if self._pipe is not None:
+            self._pipe.get(key)
+        return self
+
+    def set(self, key: str, value: Any, expire: int = 3600) -> "CachePipeline":
+        self._ops.append("set")
+        if self._pipe is not None:
+            self._pipe.set(key, self._cache._encode(key, value), ex=expire)
+        return self
+
+    def delete(self, key: str) -> "CachePipeline":
+        self._ops.append("delete")
+        if self._pipe is not None:
+            self._pipe.delete(key)
+        return self
+
+    async def execute(self) -> List[Any]:
+        if not self._ops:
+            return []
+        self.ok = False
+        if self._pipe is None:
+            self.results = [None] * len(self._ops)
+        else:
+            try:
+                raw_results = await self._pipe.execute(raise_on_error=False)
+                self.results = [
+                    self._cache._decode(raw) if op == "get" and not isinstance(raw, Exception) else raw
+                    for op, raw in zip(self._ops, raw_results)
+                ]
+                self.ok = not any(isinstance(raw, Exception) for raw in raw_results)
+                logger.debug("📦 Cache pipeline executed %s commands in one round trip", len(self._ops))
+            except Exception as e:
+                logger.error("❌ Cache pipeline error: %s", e)
+                self.results = [None] * len(self._ops)
+        self._ops = []
+        return self.results
+
 class CacheService:
-    def __init__(self):
+    def __init__(self, codec: Optional[CacheCodec] = None):
+        # Values are bytes on the wire: a codec header plus an orjson/msgpack body, compressed when large
+        self.codec = codec or CacheCodec()
         try:
-            logger.info(f"🗄️ Initializing CacheService and connecting to Redis at {settings.redis_host}:{settings.redis_port}")
-            self.redis_client = redis.Redis(
+            logger.info("🗄️ Initializing CacheService for Redis at %s:%s", settings.redis_host, settings.redis_port)
+            # The pool connects lazily, so construction never blocks the event loop.
+            self.pool = redis.asyncio.ConnectionPool(
                 host=settings.redis_host,
                 port=settings.redis_port,
                 username=settings.redis_username,
                 password=settings.redis_password,
-                decode_responses=True
+                max_connections=settings.redis_max_connections,
+                socket_timeout=settings.redis_socket_timeout_seconds,
+                socket_connect_timeout=settings.redis_socket_timeout_seconds,
+                decode_responses=False
             )
-            self.redis_client.ping()
+            self.redis_client = redis.asyncio.Redis(connection_pool=self.pool)
+        except Exception as e:
+            logger.error("❌ An unexpected error occurred while creating the Redis pool: %s", e)
+            self.pool = None
+            self.redis_client = None
+
+    async def connect(self) -> bool:
+        """Verify the connection once at startup. Disables the cache if Redis is unreachable."""
+        if not self.redis_client:
+            return False
+        try:
+            await self.redis_client.ping()
             logger.info("✅ Successfully connected to Redis.")
+            return True
         except redis.exceptions.ConnectionError as e:
-            logger.error(f"❌ Could not connect to Redis: {e}. Cache will not be available.")
-            self.redis_client = None
+            logger.error("❌ Could not connect to Redis: %s. Cache will not be available.", e)
         except Exception as e:
-            logger.error(f"❌ An unexpected error occurred during Redis connection: {e}")
+            logger.error("❌ An unexpected error occurred during Redis connection: %s", e)
+        await self.close()
+        return False
+
+    async def close(self):
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.aclose()
+            await self.pool.disconnect()
+        except Exception as e:
+            logger.error("❌ Error closing Redis connection pool: %s", e)
+        finally:
             self.redis_client = None
+            self.pool = None
+
+    def _encode(self, key: str, value: Any) -> bytes:
+        data = self.codec.encode(value)
+        CACHE_VALUE_BYTES.labels(keyspace=_keyspace(key)).observe(len(data))
+        return data
+
+    def _decode(self, value: Optional[bytes]) -> Optional[Any]:
+        try:
+            return self.codec.decode(value)
+        except Exception as e:
+            # Unreadable (e.g. written with a codec this process lacks): treat as a miss
+            logger.warning("⚠️ Could not decode cached value: %s", e)
+            return None
 
     async def get(self, key: str) -> Optional[Any]:
         if not self.redis_client:
             return None
         try:
-            value = self.redis_client.get(key)
+            value = await self.redis_client.get(key)
             if value:
-                logger.info(f"✅ Cache HIT for key: {key}")
-                return json.loads(value)
+                CACHE_REQUESTS.labels(keyspace=_keyspace(key), result="hit").inc()
+                logger.debug("✅ Cache HIT for key: %s", key)
+                return self._decode(value)
             else:
-                logger.info(f"❌ Cache MISS for key: {key}")
+                CACHE_REQUESTS.labels(keyspace=_keyspace(key), result="miss").inc()
+                logger.debug("❌ Cache MISS for key: %s", key)
                 return None
         except Exception as e:
-            logger.error(f"❌ Cache GET error for key '{key}': {e}")
+            CACHE_REQUESTS.labels(keyspace=_keyspace(key), result="error").inc()
+            logger.error("❌ Cache GET error for key '%s': %s", key, e)
             return None
-    
+
     async def set(self, key: str, value: Any, expire: int = 3600):
         if not self.redis_client:
             return
         try:
-            self.redis_client.set(key, json.dumps(value), ex=expire)
-            logger.info(f"💾 Cache SET successful for key: {key} (TTL: {expire}s)")
+            await self.redis_client.set(key, self._encode(key, value), ex=expire)
+            logger.debug("💾 Cache SET successful for key: %s (TTL: %ss)", key, expire)
         except Exception as e:
-            logger.error(f"❌ Cache SET error for key '{key}': {e}")
+            logger.error("❌ Cache SET error for key '%s': %s", key, e)
 
     async def delete(self, key: str):
         if not self.redis_client:
             return
         try:
-            self.redis_client.delete(key)
-            logger.info(f"🗑️ Cache DELETE successful for key: {key}")
+            await self.redis_client.delete(key)
+            logger.debug("🗑️ Cache DELETE successful for key: %s", key)
         except Exception as e:
-            logger.error(f"❌ Cache DELETE error for key '{key}': {e}")
\ No newline at end of file
+            logger.error("❌ Cache DELETE error for key '%s': %s", key, e)
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Fetch several keys in one round trip. Missing keys come back as None."""
+        if not self.redis_client or not keys:
+            return [None] * len(keys)
+        try:
+            values = await self.redis_client.mget(keys)
+            for key, value in zip(keys, values):
+                CACHE_REQUESTS.labels(keyspace=_keyspace(key), result="hit" if value else "miss").inc()
+            hits = sum(1 for value in values if value)
+            logger.info("✅ Cache MGET: %s/%s hits", hits, len(keys))
+            return [self._decode(value) if value else None for value in values]
+        except Exception as e:
+            logger.error("❌ Cache MGET error for %s keys: %s", len(keys), e)
+            return [None] * len(keys)
+
+    async def mset(self, mapping: Dict[str, Any], expire: int = 3600):
+        """Store several keys with the same TTL in one round trip."""
+        if not self.redis_client or not mapping:
+            return
+        async with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, expire=expire)
+        if pipe.ok:
+            logger.info("💾 Cache MSET successful for %s keys (TTL: %ss)", len(mapping), expire)
+        else:
+            errors = [result for result in pipe.results if isinstance(result, Exception)]
+            logger.error("❌ Cache MSET error for %s keys%s", len(mapping), f": {errors[0]}" if errors else "")
+
+    @asynccontextmanager
+    async def pipeline(self) -> AsyncIterator[CachePipeline]:
+        """
+        Queue several cache operations and send them in one round trip on exit.
+
+            async with cache.pipeline() as pipe:
+                pipe.get("a").set("b", {...}, expire=60)
+            a_value, _ = pipe.results
+        """
+        pipe = self.redis_client.pipeline(transaction=False) if self.redis_client else None
+        batch = CachePipeline(pipe, self)
+        try:
+            yield batch
+            await batch.execute()
+        finally:
+            if pipe is not None:
+                await pipe.reset()
@@ -0,0 +1,230 @@
+import importlib
+import importlib.util
+import json
+import logging
+from typing import Any, Callable, Dict, Optional, Union
+
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Every value written by CacheCodec starts with MAGIC, then one byte each for the
+# format version, the serializer id and the compression id. Values written before
+# the codec existed are plain JSON text, which never starts with MAGIC.
+MAGIC = b"\xc1R"
+VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+
+def _optional_module(*names: str):
+    for name in names:
+        if importlib.util.find_spec(name) is not None:
+            return importlib.import_module(name)
+    return None
+
+
+class Serializer:
+    """Turns cache values into bytes and back."""
+
+    id = 0
+    name = "base"
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JSONSerializer(Serializer):
+    id = 0
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(Serializer):
+    """orjson: several times faster than json, with native datetime and NumPy scalar support."""
+
+    id = 1
+    name = "orjson"
+
+    def __init__(self, module):
+        self._orjson = module
+
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value, default=str, option=self._orjson.OPT_SERIALIZE_NUMPY)
+
+    def loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    """MessagePack via `msgpack` or `ormsgpack`: binary, and smaller than JSON for numeric payloads."""
+
+    id = 2
+    name = "msgpack"
+
+    def __init__(self, module):
+        self._module = module
+
+    def dumps(self, value: Any) -> bytes:
+        return self._module.packb(value, default=str)
+
+    def loads(self, data: bytes) -> Any:
+        if self._module.__name__ == "msgpack":
+            return self._module.unpackb(data, raw=False, strict_map_key=False)
+        return self._module.unpackb(data)
+
+
+class Compressor:
+    id = 0
+    name = "none"
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZstdCompressor(Compressor):
+    id = 1
+    name = "zstd"
+
+    def __init__(self, module, level: int):
+        self._compressor = module.ZstdCompressor(level=level)
+        self._decompressor = module.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class LZ4Compressor(Compressor):
+    id = 2
+    name = "lz4"
+
+    def __init__(self, module):
+        self._frame = module
+
+    def compress(self, data: bytes) -> bytes:
+        return self._frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._frame.decompress(data)
+
+
+def _orjson() -> Optional[Serializer]:
+    module = _optional_module("orjson")
+    return OrjsonSerializer(module) if module else None
+
+
+def _msgpack() -> Optional[Serializer]:
+    module = _optional_module("msgpack", "ormsgpack")
+    return MsgpackSerializer(module) if module else None
+
+
+def _zstd() -> Optional[Compressor]:
+    module = _optional_module("zstandard")
+    return ZstdCompressor(module, settings.cache_zstd_level) if module else None
+
+
+def _lz4() -> Optional[Compressor]:
+    return LZ4Compressor(importlib.import_module("lz4.frame")) if _optional_module("lz4") else None
+
+
+# Factories by name; each returns None when its optional package is missing
+_SERIALIZERS: Dict[str, Callable[[], Optional[Serializer]]] = {
+    "json": JSONSerializer, "orjson": _orjson, "msgpack": _msgpack,
+}
+_COMPRESSORS: Dict[str, Callable[[], Optional[Compressor]]] = {
+    "none": lambda: _NO_COMPRESSION, "zstd": _zstd, "lz4": _lz4,
+}
+_SERIALIZER_NAMES = {0: "json", 1: "orjson", 2: "msgpack"}
+_COMPRESSOR_NAMES = {0: "none", 1: "zstd", 2: "lz4"}
+_NO_COMPRESSION = Compressor()
+
+
+class CacheCodec:
+    """
+    Encodes cache values as a small header plus a serialized, optionally compressed body.
+
+    CACHE_CODEC picks the serializer ("json", "orjson" or "msgpack") and
+    CACHE_COMPRESSION the compressor ("none", "zstd" or "lz4"), used only for bodies
+    of at least CACHE_COMPRESS_MIN_BYTES. Codecs whose optional package is not
+    installed fall back to json and no compression with a warning.
+
+    The header names the serializer and compressor of each value, so values
+    written with another configuration (or by another version of the app) still
+    decode, and values from before the codec existed are read as JSON text.
+    """
+
+    def __init__(self, codec: Optional[str] = None, compression: Optional[str] = None,
+                 compress_min_bytes: Optional[int] = None):
+        self.serializer = self._load(_SERIALIZERS, codec or settings.cache_codec, "json", "CACHE_CODEC")
+        self.compressor = self._load(_COMPRESSORS, compression or settings.cache_compression, "none",
+                                     "CACHE_COMPRESSION")
+        self.compress_min_bytes = (
+            compress_min_bytes if compress_min_bytes is not None else settings.cache_compress_min_bytes
+        )
+        self._serializers: Dict[int, Serializer] = {self.serializer.id: self.serializer}
+        self._compressors: Dict[int, Compressor] = {
+            _NO_COMPRESSION.id: _NO_COMPRESSION, self.compressor.id: self.compressor,
+        }
+        logger.info("🗜️ Cache codec: %s, compression: %s (>= %s bytes)", self.serializer.name,
+                    self.compressor.name, self.compress_min_bytes)
+
+    @staticmethod
+    def _load(factories: Dict[str, Callable], name: str, default: str, setting: str):
+        factory = factories.get(name.lower())
+        instance = factory() if factory else None
+        if instance is None:
+            logger.warning("⚠️ %s=%s is unknown or its package is not installed. Using %s.", setting, name, default)
+            instance = factories[default]()
+        return instance
+
+    def _serializer(self, serializer_id: int) -> Serializer:
+        serializer = self._serializers.get(serializer_id)
+        if serializer is None:
+            serializer = _SERIALIZERS.get(_SERIALIZER_NAMES.get(serializer_id, ""), lambda: None)()
+            if serializer is None:
+                raise ValueError(f"cannot decode cache value: serializer {serializer_id} is not available")
+            self._serializers[serializer_id] = serializer
+        return serializer
+
+    def _compressor(self, compressor_id: int) -> Compressor:
+        compressor = self._compressors.get(compressor_id)
+        if compressor is None:
+            compressor = _COMPRESSORS.get(_COMPRESSOR_NAMES.get(compressor_id, ""), lambda: None)()
+            if compressor is None:
+                raise ValueError(f"cannot decode cache value: compression {compressor_id} is not available")
+            self._compressors[compressor_id] = compressor
+        return compressor
+
+    def encode(self, value: Any) -> bytes:
+        body = self.serializer.dumps(value)
+        compressor = _NO_COMPRESSION
+        if len(body) >= self.compress_min_bytes and self.compressor is not _NO_COMPRESSION:
+            compressed = self.compressor.compress(body)
+            if len(compressed) < len(body):
+                body, compressor = compressed, self.compressor
+        return MAGIC + bytes((VERSION, self.serializer.id, compressor.id)) + body
+
+    def decode(self, data: Optional[Union[bytes, str]]) -> Any:
+        if data is None:
+            return None
+        if isinstance(data, str) or not data.startswith(MAGIC):
+            return json.loads(data)  # Written before the codec existed
+        version, serializer_id, compressor_id = data[len(MAGIC):HEADER_SIZE]
+        if version != VERSION:
+            raise ValueError(f"cannot decode cache value: unknown format version {version}")
+        body = self._compressor(compressor_id).decompress(data[HEADER_SIZE:])
+        return self._serializer(serializer_id).loads(body)
+
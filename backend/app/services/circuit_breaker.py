@@ -0,0 +1,170 @@
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from app.services.outbound_governor import GovernorTimeoutError
+from app.utils.config import settings
+from app.utils.metrics import CIRCUIT_REJECTED, CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+def counts_as_failure(exc: BaseException) -> Optional[bool]:
+    """
+    Outages (timeouts, connection errors, 5xx) trip the breaker; client errors do
+    not. Our own queue timeouts and open circuits never reached the provider, so
+    like cancellation they are no outcome (None): neither a failure nor a success,
+    and never a passed half-open probe.
+    """
+    if isinstance(exc, (GovernorTimeoutError, CircuitOpenError)):
+        return None
+    status = getattr(getattr(exc, "response", None), "status_code", None) or getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500
+    return True
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one outbound provider.
+
+    While closed, call outcomes are kept for `window_seconds`; once at least
+    `min_calls` were made and the failure rate reaches `failure_rate_threshold`, the
+    circuit opens and every call fails fast with CircuitOpenError. After
+    `open_seconds` it lets `half_open_probes` calls through: if they all succeed the
+    circuit closes again, a single failure opens it for another `open_seconds`.
+
+    Cancelled calls and calls that never reached the provider (queue timeouts,
+    CircuitOpenError) count neither way. Not thread-safe; event loop only.
+    """
+
+    def __init__(self, name: str, failure_rate_threshold: float, window_seconds: float, min_calls: int,
+                 open_seconds: float, half_open_probes: int):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.window_seconds = window_seconds
+        self.min_calls = max(min_calls, 1)
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(half_open_probes, 1)
+        self._state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        CIRCUIT_STATE.labels(provider=name).set(_STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def _set_state(self, state: str):
+        self._state = state
+        self._outcomes.clear()
+        self._failures = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            logger.warning("⚡ %s circuit opened; failing fast for %.1fs", self.name, self.open_seconds)
+        elif state == HALF_OPEN:
+            logger.info("🔌 %s circuit half-open; probing", self.name)
+        else:
+            logger.info("✅ %s circuit closed", self.name)
+        CIRCUIT_STATE.labels(provider=self.name).set(_STATE_VALUES[state])
+
+    def _before_call(self) -> bool:
+        """Raise if the call must not go out; return True when it is a half-open probe."""
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+            self._probes_in_flight += 1
+            return True
+        CIRCUIT_REJECTED.labels(provider=self.name).inc()
+        if state == HALF_OPEN:
+            raise CircuitOpenError(f"{self.name} circuit is half-open and its probe is still running")
+        retry_in = max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+        raise CircuitOpenError(f"{self.name} circuit is open; next probe in {retry_in:.1f}s")
+
+    def _record(self, probe: bool, failed: Optional[bool]):
+        if probe:
+            self._probes_in_flight -= 1
+            if failed is None or self._state != HALF_OPEN:
+                return
+            if failed:
+                self._set_state(OPEN)
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._set_state(CLOSED)
+            return
+
+        # Calls that started before the circuit opened say nothing about the provider now
+        if failed is None or self._state != CLOSED:
+            return
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        while self._outcomes[0][0] < now - self.window_seconds:
+            _, old_failed = self._outcomes.popleft()
+            self._failures -= old_failed
+        calls = len(self._outcomes)
+        if failed and calls >= self.min_calls and self._failures / calls >= self.failure_rate_threshold:
+            logger.warning("⚡ %s failed %d of the last %d calls", self.name, self._failures, calls)
+            self._set_state(OPEN)
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Run the enclosed provider call through the breaker; raises CircuitOpenError when open."""
+        if not settings.circuit_breaker_enabled:
+            yield
+            return
+        probe = self._before_call()
+        try:
+            yield
+        except Exception as e:
+            self._record(probe, counts_as_failure(e))
+            raise
+        except BaseException:  # Cancelled: no outcome either
+            self._record(probe, None)
+            raise
+        else:
+            self._record(probe, False)
+
+
+class CircuitBreakerRegistry:
+    """App-lifetime breakers, one per provider, configured from the `circuit_*` settings."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                provider,
+                failure_rate_threshold=settings.circuit_failure_rate_threshold,
+                window_seconds=settings.circuit_window_seconds,
+                min_calls=settings.circuit_min_calls,
+                open_seconds=settings.circuit_open_seconds,
+                half_open_probes=settings.circuit_half_open_probes,
+            )
+            self._breakers[provider] = breaker
+        return breaker
+
+
+breakers = CircuitBreakerRegistry()
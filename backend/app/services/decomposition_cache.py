@@ -0,0 +1,90 @@
+import hashlib
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from app.services.cache import CacheService
+from app.utils.config import settings
+from app.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_ERRAND_CONNECTIVES = re.compile(r"\b(and|then|also|plus|after that)\b")
+_ERRAND_SEPARATORS = re.compile(r"[,;&\n]+")
+
+
+def canonicalize_request(user_text: str) -> str:
+    """
+    Reduce a request to a canonical errand list.
+
+    Case, whitespace, punctuation and the order of the errands are normalized, so
+    "Grocery and pharmacy." and "pharmacy, grocery" map to the same key.
+    """
+    text = _ERRAND_CONNECTIVES.sub(",", (user_text or "").lower())
+    errands = set()
+    for part in _ERRAND_SEPARATORS.split(text):
+        errand = " ".join(re.sub(r"[^\w\s]", " ", part).split())
+        if errand:
+            errands.add(errand)
+    return "|".join(sorted(errands))
+
+
+def prompt_version(model: str, system_prompt: str) -> str:
+    """Fingerprint of the model and prompt; changing either starts a fresh key space."""
+    return hashlib.sha1(f"{model}\n{system_prompt}".encode("utf-8")).hexdigest()[:12]
+
+
+class DecompositionMemo:
+    """
+    Two-tier memo of LLM task decompositions.
+
+    Tier 1 is an in-process LRU. Tier 2 is the shared CacheService, so the other
+    workers benefit too. Keys include the prompt version. Entries written for an
+    older model or prompt are never read again and expire with their TTL.
+    """
+
+    def __init__(self, cache: Optional[CacheService] = None):
+        self.cache = cache
+        self.local = LRUCache(settings.decomposition_memo_size, settings.decomposition_memo_ttl_seconds)
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(user_text: str, version: str) -> str:
+        digest = hashlib.sha1(canonicalize_request(user_text).encode("utf-8")).hexdigest()
+        return f"decomp:{version}:{digest}"
+
+    async def get(self, user_text: str, version: str) -> Optional[List[Dict[str, Any]]]:
+        key = self.key(user_text, version)
+
+        tasks = self.local.get(key)
+        if tasks is not None:
+            self.local_hits += 1
+            logger.info("⚡ Decomposition memo local hit (%s)", self.stats())
+            return [dict(task) for task in tasks]
+
+        if self.cache:
+            tasks = await self.cache.get(key)
+            if tasks is not None:
+                self.shared_hits += 1
+                self.local.set(key, tasks)
+                logger.info("⚡ Decomposition memo shared hit (%s)", self.stats())
+                return [dict(task) for task in tasks]
+
+        self.misses += 1
+        return None
+
+    async def set(self, user_text: str, version: str, tasks: List[Dict[str, Any]]):
+        key = self.key(user_text, version)
+        self.local.set(key, [dict(task) for task in tasks])
+        if self.cache:
+            await self.cache.set(key, tasks, expire=settings.decomposition_memo_ttl_seconds)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "local_size": len(self.local),
+        }
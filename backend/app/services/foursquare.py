@@ -1,20 +1,36 @@
-import httpx
 import logging
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from app.utils.config import settings
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, breakers
+from app.services.http_client import HTTPClientRegistry, http_clients
+from app.services.outbound_governor import ProviderGovernor, governors
+from app.services.place_cache import normalize_query
+from app.utils.singleflight import SingleFlight, coordinate_key
+from app.utils.metrics import PROVIDER_ERRORS, PROVIDER_REQUEST_DURATION, error_reason
 
-# Configure logging for debugging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class FoursquareService:
-    def __init__(self):
+    def __init__(self, http_registry: Optional[HTTPClientRegistry] = None, governor: Optional[ProviderGovernor] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.http_clients = http_registry or http_clients
+        self.governor = governor or governors.get("foursquare")
+        self.breaker = breaker or breakers.get("foursquare")
         self.api_key = settings.foursquare_api_key
         self.base_url = "https://places-api.foursquare.com"
+        self._inflight = SingleFlight("foursquare") if settings.singleflight_enabled else None
         logger.info("🏢 FoursquareService initialized")
         
     async def search_places(self, query: str, lat: float, lng: float, limit: int = 5) -> List[Dict[str, Any]]:
-        logger.info(f"🔍 Searching places: query='{query}', location='{lat},{lng}'")
+        if self._inflight is None:
+            return await self._search_places(query, lat, lng, limit)
+        key = (normalize_query(query), coordinate_key(lat, lng), limit)
+        places = await self._inflight.do(key, lambda: self._search_places(query, lat, lng, limit))
+        return list(places)
+    
+    async def _search_places(self, query: str, lat: float, lng: float, limit: int) -> List[Dict[str, Any]]:
+        logger.debug("🔍 Searching places: query='%s', location='%s,%s'", query, lat, lng)
         
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -30,22 +46,31 @@ class FoursquareService:
             "sort": "RELEVANCE"
         }
         
+        started = time.perf_counter()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
+            client = self.http_clients.get("foursquare")
+            async with self.breaker.guard():
+                response = await self.governor.request(lambda: client.get(
                     f"{self.base_url}/places/search",
                     headers=headers,
                     params=params
-                )
+                ))
                 response.raise_for_status()
-                places = response.json().get("results", [])
-                
-                logger.info(f"📍 Found {len(places)} places from Foursquare")
+            places = response.json().get("results", [])
+            PROVIDER_REQUEST_DURATION.labels(provider="foursquare").observe(time.perf_counter() - started)
+            
+            logger.info("📍 Found %s places from Foursquare", len(places))
+            if logger.isEnabledFor(logging.DEBUG):
                 for place in places[:3]:  # Log first 3 places
-                    logger.info(f"  📌 {place.get('name', 'Unknown')} - {place.get('location', {}).get('address', 'No address')}")
-                
-                return places
+                    logger.debug("  📌 %s - %s", place.get('name', 'Unknown'), place.get('location', {}).get('address', 'No address'))
+            
+            return places
             
+        except CircuitOpenError as e:
+            logger.debug("⚡ Skipping Foursquare search: %s", e)
+            return []
         except Exception as e:
-            logger.error(f"❌ Error in Foursquare search: {str(e)}")
+            PROVIDER_REQUEST_DURATION.labels(provider="foursquare").observe(time.perf_counter() - started)
+            PROVIDER_ERRORS.labels(provider="foursquare", reason=error_reason(e)).inc()
+            logger.error("❌ Error in Foursquare search: %s", e)
             return []
\ No newline at end of file
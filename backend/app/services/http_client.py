@@ -0,0 +1,86 @@
+import importlib.util
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientRegistry:
+    """
+    App-lifetime registry of pooled `httpx.AsyncClient`s, one per outbound provider.
+
+    Clients are created at FastAPI startup and closed at shutdown so that every
+    search reuses warm keep-alive connections instead of paying a fresh TCP+TLS
+    handshake per call.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transport: Optional[httpx.AsyncBaseTransport] = None
+
+    def _provider_settings(self, provider: str) -> Dict[str, float]:
+        return {
+            "max_connections": getattr(settings, f"{provider}_max_connections", settings.http_max_connections),
+            "timeout": getattr(settings, f"{provider}_timeout_seconds", settings.http_timeout_seconds),
+        }
+
+    def _http2_enabled(self) -> bool:
+        if not settings.http2_enabled:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("⚠️ HTTP2_ENABLED is set but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+            return False
+        return True
+
+    def _create_client(self, provider: str) -> httpx.AsyncClient:
+        config = self._provider_settings(provider)
+        limits = httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_connections"],
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        )
+        timeout = httpx.Timeout(config["timeout"], connect=settings.http_connect_timeout_seconds)
+        logger.info(
+            f"🔌 Creating pooled HTTP client for '{provider}' "
+            f"(max_connections={config['max_connections']}, timeout={config['timeout']}s)"
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=self._http2_enabled(),
+            transport=self._transport,
+        )
+
+    def use_transport(self, transport: Optional[httpx.AsyncBaseTransport]):
+        """Route every client created afterwards through `transport` (e.g. a mock for offline runs)."""
+        self._transport = transport
+
+    async def startup(self, providers=("foursquare", "serpapi")):
+        for provider in providers:
+            if provider not in self._clients:
+                self._clients[provider] = self._create_client(provider)
+        logger.info("✅ HTTP client registry started for: %s", ', '.join(self._clients))
+
+    def get(self, provider: str) -> httpx.AsyncClient:
+        """Return the shared client for `provider`, creating it lazily if startup has not run."""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._create_client(provider)
+            self._clients[provider] = client
+        return client
+
+    async def shutdown(self):
+        for provider, client in self._clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error("❌ Error closing HTTP client for '%s': %s", provider, e)
+        self._clients.clear()
+        logger.info("🔌 HTTP client registry closed.")
+
+
+http_clients = HTTPClientRegistry()
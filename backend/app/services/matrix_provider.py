@@ -0,0 +1,270 @@
+import logging
+import time
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, breakers
+from app.services.http_client import HTTPClientRegistry, http_clients
+from app.services.outbound_governor import ProviderGovernor, governors
+from app.utils import geo
+from app.utils.config import settings
+from app.utils.lru import LRUCache
+from app.utils.metrics import CACHE_REQUESTS, PROVIDER_ERRORS, PROVIDER_REQUEST_DURATION, error_reason
+
+logger = logging.getLogger(__name__)
+
+MATRIX_PROVIDERS = ("geodesic", "osrm", "ors")
+
+
+class TravelMatrix(NamedTuple):
+    """Pairwise travel between N locations: (N, N) meters and seconds, 0 on the diagonal."""
+
+    distances_m: np.ndarray
+    durations_s: np.ndarray
+
+
+def _as_locations(locations) -> np.ndarray:
+    return np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+
+
+class MatrixProvider:
+    """Computes one N x N travel matrix per call."""
+
+    name = "base"
+    # Computed in-process and cheaper than a cache lookup, so never cached
+    local = False
+
+    async def matrix(self, locations: np.ndarray) -> TravelMatrix:
+        raise NotImplementedError
+
+    async def table(self, locations: np.ndarray, sources: Sequence[int], destinations: Sequence[int]) -> TravelMatrix:
+        """Travel from `sources` to `destinations` (indices into `locations`), shape (S, D)."""
+        matrix = await self.matrix(locations)
+        rows, columns = np.ix_(sources, destinations)
+        return TravelMatrix(matrix.distances_m[rows, columns], matrix.durations_s[rows, columns])
+
+
+class GeodesicMatrixProvider(MatrixProvider):
+    """
+    Straight-line distances (geo.distance_matrix) with durations at
+    GEODESIC_SPEED_KMH. Computed locally, so it never fails.
+    """
+
+    name = "geodesic"
+    local = True
+
+    async def matrix(self, locations: np.ndarray) -> TravelMatrix:
+        distances = geo.distance_matrix(locations)
+        return TravelMatrix(distances, distances / (settings.geodesic_speed_kmh / 3.6))
+
+
+class HTTPMatrixProvider(MatrixProvider):
+    """
+    Shared plumbing for road-network matrix services: pooled client, governor and
+    circuit breaker, like the place providers.
+    """
+
+    def __init__(self, http_registry: Optional[HTTPClientRegistry] = None, governor: Optional[ProviderGovernor] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.http_clients = http_registry or http_clients
+        self.governor = governor or governors.get(self.name)
+        self.breaker = breaker or breakers.get(self.name)
+
+    async def _send(self, client, locations: np.ndarray, sources: Optional[Sequence[int]],
+                    destinations: Optional[Sequence[int]]):
+        raise NotImplementedError
+
+    async def matrix(self, locations: np.ndarray) -> TravelMatrix:
+        return await self._fetch(locations)
+
+    async def table(self, locations: np.ndarray, sources: Sequence[int], destinations: Sequence[int]) -> TravelMatrix:
+        return await self._fetch(locations, list(sources), list(destinations))
+
+    async def _fetch(self, locations: np.ndarray, sources: Optional[Sequence[int]] = None,
+                     destinations: Optional[Sequence[int]] = None) -> TravelMatrix:
+        started = time.perf_counter()
+        try:
+            client = self.http_clients.get(self.name)
+            async with self.breaker.guard():
+                response = await self.governor.request(lambda: self._send(client, locations, sources, destinations))
+                response.raise_for_status()
+            data = response.json()
+            matrix = TravelMatrix(
+                np.asarray(data["distances"], dtype=np.float64), np.asarray(data["durations"], dtype=np.float64)
+            )
+        except Exception as e:
+            PROVIDER_ERRORS.labels(provider=self.name, reason=error_reason(e)).inc()
+            raise
+        finally:
+            PROVIDER_REQUEST_DURATION.labels(provider=self.name).observe(time.perf_counter() - started)
+
+        shape = (len(locations) if sources is None else len(sources),
+                 len(locations) if destinations is None else len(destinations))
+        if matrix.distances_m.shape != shape or matrix.durations_s.shape != shape:
+            raise ValueError(f"{self.name} returned a {matrix.distances_m.shape} matrix, expected {shape}")
+        # Unroutable pairs come back as null
+        if np.isnan(matrix.distances_m).any() or np.isnan(matrix.durations_s).any():
+            raise ValueError(f"{self.name} could not route every pair")
+        return matrix
+
+
+class OSRMMatrixProvider(HTTPMatrixProvider):
+    """
+    OSRM `table` service: GET /table/v1/{profile}/{lng,lat;...}?annotations=distance,duration,
+    with `sources` / `destinations` (";"-separated indices) for a partial table.
+    """
+
+    name = "osrm"
+
+    async def _send(self, client, locations: np.ndarray, sources: Optional[Sequence[int]],
+                    destinations: Optional[Sequence[int]]):
+        coordinates = ";".join(f"{lng:.6f},{lat:.6f}" for lat, lng in locations)
+        params = {"annotations": "distance,duration"}
+        if sources is not None:
+            params["sources"] = ";".join(map(str, sources))
+        if destinations is not None:
+            params["destinations"] = ";".join(map(str, destinations))
+        return await client.get(
+            f"{settings.osrm_base_url.rstrip('/')}/table/v1/{settings.osrm_profile}/{coordinates}", params=params,
+        )
+
+
+class ORSMatrixProvider(HTTPMatrixProvider):
+    """openrouteservice matrix API: POST /v2/matrix/{profile} with [lng, lat] locations."""
+
+    name = "ors"
+
+    async def _send(self, client, locations: np.ndarray, sources: Optional[Sequence[int]],
+                    destinations: Optional[Sequence[int]]):
+        body = {"locations": [[lng, lat] for lat, lng in locations.tolist()], "metrics": ["distance", "duration"]}
+        if sources is not None:
+            body["sources"] = list(sources)
+        if destinations is not None:
+            body["destinations"] = list(destinations)
+        return await client.post(
+            f"{settings.ors_base_url.rstrip('/')}/v2/matrix/{settings.ors_profile}",
+            headers={"Authorization": settings.ors_api_key}, json=body,
+        )
+
+
+def create_matrix_provider(name: Optional[str] = None, http_registry: Optional[HTTPClientRegistry] = None) -> MatrixProvider:
+    name = (name or settings.routing_provider).lower()
+    if name == "osrm":
+        return OSRMMatrixProvider(http_registry=http_registry)
+    if name == "ors":
+        return ORSMatrixProvider(http_registry=http_registry)
+    if name not in MATRIX_PROVIDERS:
+        logger.warning("⚠️ Unknown routing provider '%s', falling back to geodesic.", name)
+    return GeodesicMatrixProvider()
+
+
+class MatrixCache:
+    """
+    Process-wide cache of whole matrices keyed by provider and quantized location set.
+
+    Coordinates are rounded to MATRIX_CACHE_PRECISION decimals (4 is roughly 11 m),
+    so repeated and re-planned requests from about the same start for the same
+    stores reuse the provider's answer. A lookup costs one rounding pass and one
+    hash of the coordinate bytes, not one LRU operation per leg.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float, precision: int):
+        self.precision = precision
+        self._matrices = LRUCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+
+    def _key(self, provider: str, locations: np.ndarray):
+        # + 0.0 turns -0.0 into 0.0 so equal coordinates have equal bytes
+        return provider, len(locations), (np.round(locations, self.precision) + 0.0).tobytes()
+
+    @property
+    def enabled(self) -> bool:
+        return self._matrices.maxsize > 0
+
+    def lookup(self, provider: str, locations: np.ndarray) -> Optional[TravelMatrix]:
+        return self._matrices.get(self._key(provider, locations))
+
+    def store(self, provider: str, locations: np.ndarray, matrix: TravelMatrix):
+        # Shared between requests, so callers must not modify it in place
+        for array in matrix:
+            array.setflags(write=False)
+        self._matrices.set(self._key(provider, locations), matrix)
+
+    def __len__(self) -> int:
+        return len(self._matrices)
+
+
+class MatrixService:
+    """
+    Travel matrices for the router: one batched N x N provider call per request.
+
+    Road-network providers go through the matrix cache first, so the same
+    locations are not fetched twice; local providers (geodesic) are recomputed,
+    which is cheaper than any lookup. A failing provider falls back to geodesic
+    estimates, so routing never fails for lack of a matrix.
+    """
+
+    def __init__(self, provider: Optional[MatrixProvider] = None, matrix_cache: Optional[MatrixCache] = None):
+        self.provider = provider or create_matrix_provider()
+        self.fallback = GeodesicMatrixProvider()
+        self.matrix_cache = matrix_cache if matrix_cache is not None else MatrixCache(
+            settings.matrix_cache_size, settings.matrix_cache_ttl_seconds, settings.matrix_cache_precision
+        )
+
+    async def matrix(self, locations) -> TravelMatrix:
+        locations = _as_locations(locations)
+        try:
+            return await self._cached(self.provider, locations)
+        except CircuitOpenError as e:
+            logger.debug("⚡ %s; using geodesic estimates", e)
+        except Exception as e:
+            logger.warning("⚠️ %s matrix failed (%s); using geodesic estimates", self.provider.name, e)
+        return await self._cached(self.fallback, locations)
+
+    async def extend(self, locations, known: Sequence[int], known_travel: TravelMatrix) -> TravelMatrix:
+        """
+        The full matrix over `locations` when `known_travel` already covers the
+        locations at indices `known` (in that order): only the rows and columns of the
+        other locations are fetched, as two partial tables (new -> all, all -> new).
+        """
+        locations = _as_locations(locations)
+        size = len(locations)
+        known = np.asarray(known, dtype=np.intp)
+        new = np.setdiff1d(np.arange(size), known)
+        if not len(new):
+            order = np.argsort(known)
+            return TravelMatrix(known_travel.distances_m[np.ix_(order, order)],
+                                known_travel.durations_s[np.ix_(order, order)])
+        provider = self.provider
+        if provider.local:
+            return await provider.matrix(locations)
+
+        everything = np.arange(size)
+        try:
+            outgoing = await provider.table(locations, new.tolist(), everything.tolist())
+            incoming = await provider.table(locations, everything.tolist(), new.tolist())
+        except CircuitOpenError as e:
+            logger.debug("⚡ %s; using geodesic estimates", e)
+            return await self.fallback.matrix(locations)
+        except Exception as e:
+            logger.warning("⚠️ %s partial matrix failed (%s); using geodesic estimates", provider.name, e)
+            return await self.fallback.matrix(locations)
+        logger.debug("🧩 Reused %d x %d travel matrix, fetched %d new location(s)", len(known), len(known), len(new))
+
+        distances, durations = np.zeros((size, size)), np.zeros((size, size))
+        distances[np.ix_(known, known)] = known_travel.distances_m
+        durations[np.ix_(known, known)] = known_travel.durations_s
+        distances[new], durations[new] = outgoing.distances_m, outgoing.durations_s
+        distances[:, new], durations[:, new] = incoming.distances_m, incoming.durations_s
+        return TravelMatrix(distances, durations)
+
+    async def _cached(self, provider: MatrixProvider, locations: np.ndarray) -> TravelMatrix:
+        if provider.local or not self.matrix_cache.enabled:
+            return await provider.matrix(locations)
+        cached = self.matrix_cache.lookup(provider.name, locations)
+        CACHE_REQUESTS.labels(keyspace="matrices", result="miss" if cached is None else "hit").inc()
+        if cached is not None:
+            return cached
+        matrix = await provider.matrix(locations)
+        self.matrix_cache.store(provider.name, locations, matrix)
+        return matrix
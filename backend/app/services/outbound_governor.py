@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+from app.utils.config import settings
+from app.utils.metrics import (
+    PROVIDER_IN_FLIGHT,
+    PROVIDER_QUEUE_DEPTH,
+    PROVIDER_QUEUE_WAIT,
+    PROVIDER_THROTTLED,
+)
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = (429, 503)
+
+
+class GovernorTimeoutError(RuntimeError):
+    """Raised when a call waited longer than `outbound_max_queue_wait_seconds` for a slot."""
+
+
+def retry_after_seconds(response: Optional[httpx.Response]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class ProviderGovernor:
+    """
+    Token bucket plus max-in-flight limit for one outbound provider.
+
+    Callers queue FIFO. A call starts only when a token is available, fewer than
+    `max_in_flight` calls are running and no Retry-After pause is active.
+    A provider's throttling response pauses the whole queue (`defer`), so one 429
+    slows every caller down instead of each of them hitting the limit on its own.
+    """
+
+    def __init__(self, name: str, rate_per_second: float, burst: int, max_in_flight: int,
+                 max_queue_wait_seconds: float):
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.burst = max(burst, 1)
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _refill(self, now: float):
+        if self.rate_per_second > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+        else:
+            self._tokens = float(self.burst)  # Rate limiting disabled
+        self._refilled_at = now
+
+    def _dispatch(self):
+        """Hand slots to queued callers in FIFO order while limits allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters and self._in_flight < self.max_in_flight:
+            waiter = self._waiters[0]
+            if waiter.done():  # Cancelled or timed out while queued
+                self._waiters.popleft()
+                continue
+            if now < self._paused_until:
+                self._schedule(self._paused_until - now)
+                break
+            if self._tokens < 1:
+                self._schedule((1 - self._tokens) / self.rate_per_second)
+                break
+            self._waiters.popleft()
+            self._tokens -= 1
+            self._in_flight += 1
+            waiter.set_result(None)
+        self._update_gauges()
+
+    def _schedule(self, delay: float):
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _update_gauges(self):
+        PROVIDER_IN_FLIGHT.labels(provider=self.name).set(self._in_flight)
+        PROVIDER_QUEUE_DEPTH.labels(provider=self.name).set(len(self._waiters))
+
+    async def acquire(self):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_queue_wait_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we gave up; hand it back.
+                self.release()
+            else:
+                waiter.cancel()
+                self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                raise GovernorTimeoutError(
+                    f"{self.name}: no outbound slot within {self.max_queue_wait_seconds}s"
+                ) from None
+            raise
+        finally:
+            PROVIDER_QUEUE_WAIT.labels(provider=self.name).observe(time.perf_counter() - started)
+
+    def release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def defer(self, seconds: float):
+        """Pause dispatching for `seconds`, e.g. after a 429 with Retry-After."""
+        PROVIDER_THROTTLED.labels(provider=self.name).inc()
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning("⏳ %s throttled us; pausing outbound calls for %.1fs", self.name, seconds)
+
+    async def request(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Send an HTTP request through the governor, retrying throttled responses.
+
+        On 429/503 the queue is paused for Retry-After (or an exponential backoff)
+        and the call is queued again, up to `outbound_max_retries` times. Waits
+        longer than `outbound_max_retry_after_seconds` are not worth holding a plan
+        for, so the throttled response is returned to the caller instead.
+        """
+        attempt = 0
+        while True:
+            async with self.slot():
+                response = await send()
+                throttled = response.status_code in THROTTLE_STATUSES
+                if throttled:
+                    delay = retry_after_seconds(response)
+                    if delay is None:
+                        delay = settings.outbound_retry_backoff_seconds * (2 ** attempt)
+                    # Pause while still holding the slot: releasing it dispatches the next queued call
+                    self.defer(delay)
+            if not throttled or attempt >= settings.outbound_max_retries \
+                    or delay > settings.outbound_max_retry_after_seconds:
+                return response
+            attempt += 1
+
+
+class GovernorRegistry:
+    """App-lifetime governors, one per provider, configured from `<provider>_*` settings."""
+
+    def __init__(self):
+        self._governors: Dict[str, ProviderGovernor] = {}
+
+    def get(self, provider: str) -> ProviderGovernor:
+        governor = self._governors.get(provider)
+        if governor is None:
+            governor = ProviderGovernor(
+                provider,
+                rate_per_second=getattr(settings, f"{provider}_rate_per_second", settings.outbound_rate_per_second),
+                burst=getattr(settings, f"{provider}_burst", settings.outbound_burst),
+                max_in_flight=getattr(settings, f"{provider}_max_in_flight", settings.outbound_max_in_flight),
+                max_queue_wait_seconds=settings.outbound_max_queue_wait_seconds,
+            )
+            self._governors[provider] = governor
+        return governor
+
+
+governors = GovernorRegistry()
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from app.services.cache import CacheService
+from app.utils import geo
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+PlaceFetcher = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace so equivalent queries share a key."""
+    query = re.sub(r"[^\w\s]", " ", (query or "").lower())
+    return " ".join(query.split())
+
+
+def search_key(query: str, lat: float, lng: float) -> str:
+    cell = geo.geohash(lat, lng, settings.place_cache_geohash_precision)
+    return f"places:{cell}:{normalize_query(query)}"
+
+
+class PlaceSearchCache:
+    """
+    Place-search results cached per (normalized query, geohash cell).
+
+    Entries are fresh for `place_cache_ttl_seconds`. For a further
+    `place_cache_stale_seconds` a hit is still served immediately while one
+    background task refreshes it from the providers (stale-while-revalidate).
+    """
+
+    def __init__(self, cache: CacheService):
+        self.cache = cache
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def get_or_fetch(self, query: str, lat: float, lng: float, fetch: PlaceFetcher) -> List[Dict[str, Any]]:
+        key = search_key(query, lat, lng)
+        entry = await self.cache.get(key)
+
+        if entry:
+            age = time.time() - entry.get("fetched_at", 0)
+            if age < settings.place_cache_ttl_seconds:
+                logger.info("⚡ Place cache fresh hit for '%s' (age %.0fs)", key, age)
+                return entry.get("places", [])
+            if age < settings.place_cache_ttl_seconds + settings.place_cache_stale_seconds:
+                logger.info("♻️ Place cache stale hit for '%s' (age %.0fs), refreshing in background", key, age)
+                self._schedule_refresh(key, fetch)
+                return entry.get("places", [])
+
+        places = await fetch()
+        await self.store(key, places)
+        return places
+
+    async def store(self, key: str, places: List[Dict[str, Any]]):
+        # Empty results usually mean a provider failure, so they are never cached.
+        if not places:
+            return
+        entry = {
+            "fetched_at": time.time(),
+            "places": places[:settings.place_cache_max_results],
+        }
+        expire = settings.place_cache_ttl_seconds + settings.place_cache_stale_seconds
+        await self.cache.set(key, entry, expire=expire)
+
+    def _schedule_refresh(self, key: str, fetch: PlaceFetcher):
+        if key in self._refreshing:
+            return
+        if len(self._refreshing) >= settings.place_cache_max_refreshes:
+            logger.warning("⚠️ Skipping background refresh for '%s': %s already running", key, len(self._refreshing))
+            return
+        task = asyncio.create_task(self._refresh(key, fetch))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: str, fetch: PlaceFetcher):
+        try:
+            await self.store(key, await fetch())
+            logger.info("✅ Background refresh complete for '%s'", key)
+        except Exception as e:
+            logger.error("❌ Background refresh failed for '%s': %s", key, e)
@@ -0,0 +1,327 @@
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.place_cache import normalize_query
+from app.utils import geo
+from app.utils.config import settings
+from app.utils.metrics import CACHE_REQUESTS
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single process assumed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = 3  # lat, lng, updated_at
+_INITIAL_CAPACITY = 1024
+_COMPACT_RATIO = 2  # compact once the log has this many lines per place (plus _INITIAL_CAPACITY)
+
+Cell = Tuple[int, int]
+# What the writer thread persists for one upserted row: (row, place, tags, updated_at)
+_Write = Tuple[int, Dict[str, Any], List[str], float]
+
+
+class PlaceStore:
+    """
+    Every place the providers ever returned, persisted locally and indexed on a lat/lng grid.
+
+    Files in `directory`:
+
+        coords.f64    memory-mapped float64 rows of (lat, lng, updated_at), one per place
+        places.jsonl  one {"row", "place", "tags"} line per upsert; the last line for a row wins
+
+    Places are keyed by (source, id) and tagged with every normalized task_type and
+    search query they were found for, so a search is a grid lookup plus one
+    vectorized distance filter over the candidate rows.
+
+    The index lives in memory and `upsert` only updates it; JSON encoding, file
+    writes and growing the mapped file happen on a writer thread fed by a queue,
+    so the event loop never waits on disk. The writer compacts the JSONL log
+    whenever it holds mostly superseded lines, on open and while running.
+
+    One process owns the files (an advisory lock on Unix). Other workers still
+    read what was on disk when they opened and index new places in memory only.
+    """
+
+    def __init__(self, directory: str, cell_degrees: float = 0.01):
+        self.directory = directory
+        self.cell_degrees = cell_degrees
+        self._coords: np.ndarray = np.zeros((0, _COLUMNS))
+        self._places: List[Dict[str, Any]] = []
+        self._tags: List[Set[str]] = []
+        self._rows: Dict[Tuple[str, str], int] = {}
+        self._cells: Dict[Cell, List[int]] = {}
+        self._lock_file = None
+        self._persistent = False
+        # Owned by the writer thread once it runs
+        self._mapped: Optional[np.memmap] = None
+        self._log = None
+        self._log_lines = 0
+        self._rows_written = 0
+        self._writes: "queue.SimpleQueue[Optional[List[_Write]]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    @property
+    def _coords_path(self) -> str:
+        return os.path.join(self.directory, "coords.f64")
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, "places.jsonl")
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._persistent = self._try_lock()
+        entries, lines = self._read_log()
+        for row, (place, tags, updated_at) in sorted(entries.items()):
+            if row != len(self._places):
+                logger.warning("⚠️ Place store log has a gap at row %s; ignoring the rest", row)
+                break
+            self._index_new(place, tags)
+        self._open_coords(entries)
+
+        if self._persistent:
+            self._log_lines = lines
+            self._rows_written = len(self._places)
+            self._log = open(self._log_path, "a", encoding="utf-8")
+            self._compact_if_needed()
+            self._writer = threading.Thread(target=self._write_loop, name="place-store-writer", daemon=True)
+            self._writer.start()
+        logger.info("🗺️ Place store opened with %d places (%s)", len(self._places),
+                    "persistent" if self._persistent else "read-only, another process owns it")
+
+    def close(self):
+        """Write out everything queued, then release the files."""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._mapped is not None:
+            self._mapped.flush()
+            self._mapped = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _try_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        self._lock_file = open(os.path.join(self.directory, ".lock"), "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+
+    def _read_log(self) -> Tuple[Dict[int, tuple], int]:
+        entries: Dict[int, tuple] = {}
+        lines = 0
+        if not os.path.exists(self._log_path):
+            return entries, lines
+        with open(self._log_path, encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    entries[int(entry["row"])] = (entry["place"], set(entry["tags"]), entry["updated_at"])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("⚠️ Skipping unreadable place store line %d", lines)
+        return entries, lines
+
+    def _open_coords(self, entries: Dict[int, tuple]):
+        count = len(self._places)
+        capacity = max(_INITIAL_CAPACITY, 1 << math.ceil(math.log2(count + 1)))
+        self._coords = np.zeros((capacity, _COLUMNS))
+        if not self._persistent:
+            for row in range(count):
+                place, _, updated_at = entries[row]
+                self._coords[row] = (place["lat"], place["lng"], updated_at)
+            return
+
+        existing_rows = os.path.getsize(self._coords_path) // (8 * _COLUMNS) if os.path.exists(self._coords_path) else 0
+        self._mapped = self._map(max(capacity, existing_rows))
+        # Trust the mapped rows unless they disagree with the log (e.g. a crash mid-write)
+        stale = [row for row in range(count) if self._mapped[row, 2] != entries[row][2]]
+        for row in stale:
+            place, _, updated_at = entries[row]
+            self._mapped[row] = (place["lat"], place["lng"], updated_at)
+        self._coords[:count] = self._mapped[:count]
+
+    def _map(self, rows: int) -> np.memmap:
+        size = rows * _COLUMNS * 8
+        with open(self._coords_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(self._coords_path, dtype=np.float64, mode="r+", shape=(rows, _COLUMNS))
+
+    def _grow(self):
+        self._coords = np.vstack([self._coords, np.zeros((max(len(self._coords), _INITIAL_CAPACITY), _COLUMNS))])
+
+    def _write_loop(self):
+        """Writer thread: persist queued upserts until close() sends None."""
+        while True:
+            batch = self._writes.get()
+            writes = batch or []
+            # Drain whatever else is queued so a burst costs one write and flush
+            while batch is not None:
+                try:
+                    batch = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                writes.extend(batch or [])
+            if writes:
+                try:
+                    self._write(writes)
+                except Exception as e:
+                    logger.error("❌ Place store write failed: %s", e, exc_info=True)
+            if batch is None:
+                return
+
+    def _write(self, writes: List[_Write]):
+        rows = max(row for row, *_ in writes) + 1
+        if rows > len(self._mapped):
+            self._mapped.flush()
+            self._mapped = self._map(max(2 * len(self._mapped), rows))
+        for row, place, _, updated_at in writes:
+            self._mapped[row] = (place["lat"], place["lng"], updated_at)
+        self._log.write("".join(self._log_line(*write) for write in writes))
+        self._log.flush()
+        self._log_lines += len(writes)
+        self._rows_written = max(self._rows_written, rows)
+        self._compact_if_needed()
+
+    def _compact_if_needed(self):
+        if self._log_lines > _COMPACT_RATIO * self._rows_written + _INITIAL_CAPACITY:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log with only the last line of each row."""
+        self._log.close()
+        latest: Dict[int, str] = {}
+        with open(self._log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = int(json.loads(line)["row"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if row < self._rows_written:
+                    latest[row] = line
+        tmp_path = f"{self._log_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(latest[row] for row in sorted(latest))
+        os.replace(tmp_path, self._log_path)
+        self._log = open(self._log_path, "a", encoding="utf-8")
+        logger.info("🧹 Compacted place store log from %d to %d lines", self._log_lines, len(latest))
+        self._log_lines = len(latest)
+
+    @staticmethod
+    def _log_line(row: int, place: Dict[str, Any], tags: List[str], updated_at: float) -> str:
+        return json.dumps({"row": row, "place": place, "tags": tags, "updated_at": updated_at},
+                          ensure_ascii=False) + "\n"
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def _index_new(self, place: Dict[str, Any], tags: Set[str]) -> int:
+        row = len(self._places)
+        self._places.append(place)
+        self._tags.append(tags)
+        self._rows[(place.get("source"), str(place.get("id")))] = row
+        self._cells.setdefault(self._cell(place["lat"], place["lng"]), []).append(row)
+        return row
+
+    def upsert(self, places: Iterable[Dict[str, Any]], tags: Iterable[str] = ()) -> int:
+        """
+        Insert or refresh processed places (as built by PlaceSearchAgent), tagging each
+        with its task_type and `tags`; returns how many were stored. Only the
+        in-memory index is updated here; the writer thread persists them.
+        """
+        now = time.time()
+        tags = {normalize_query(tag) for tag in tags} - {""}
+        written = []
+        for place in places:
+            if not place.get("id") or place.get("lat") is None or place.get("lng") is None:
+                continue
+            place_tags = tags | ({normalize_query(place["task_type"])} if place.get("task_type") else set())
+            place = {key: value for key, value in place.items() if key != "task_type"}
+            row = self._rows.get((place.get("source"), str(place.get("id"))))
+            if row is None:
+                row = self._index_new(place, set())
+                if row >= len(self._coords):
+                    self._grow()
+            else:
+                old_cell = self._cell(*self._coords[row, :2])
+                new_cell = self._cell(place["lat"], place["lng"])
+                if old_cell != new_cell:
+                    self._cells[old_cell].remove(row)
+                    self._cells.setdefault(new_cell, []).append(row)
+                self._places[row] = place
+            self._tags[row] |= place_tags
+            self._coords[row] = (place["lat"], place["lng"], now)
+            written.append((row, place, sorted(self._tags[row]), now))
+
+        if written and self._writer is not None:
+            self._writes.put(written)
+        return len(written)
+
+    def search(self, tag: str, lat: float, lng: float, radius_m: float, limit: int = 5,
+               max_age_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Places tagged `tag` (a task_type or search query) within `radius_m` of (lat, lng), nearest first."""
+        tag = normalize_query(tag)
+        lat_span = radius_m / 111_320.0
+        lng_span = lat_span / max(math.cos(math.radians(lat)), 1e-6)
+        lat_lo, lng_lo = self._cell(lat - lat_span, lng - lng_span)
+        lat_hi, lng_hi = self._cell(lat + lat_span, lng + lng_span)
+
+        rows = [
+            row
+            for lat_cell in range(lat_lo, lat_hi + 1)
+            for lng_cell in range(lng_lo, lng_hi + 1)
+            for row in self._cells.get((lat_cell, lng_cell), ())
+            if tag in self._tags[row]
+        ]
+        if not rows:
+            return []
+
+        rows = np.asarray(rows, dtype=np.intp)
+        coords = self._coords[rows]
+        distances = geo.distances_from((lat, lng), coords[:, :2])
+        keep = distances <= radius_m
+        if max_age_seconds is not None:
+            keep &= coords[:, 2] >= time.time() - max_age_seconds
+        rows, distances = rows[keep], distances[keep]
+        nearest = rows[np.argsort(distances, kind="stable")[:limit]]
+        return [dict(self._places[row]) for row in nearest]
+
+    def lookup(self, query: str, lat: float, lng: float) -> Optional[List[Dict[str, Any]]]:
+        """
+        Local answer for a task search, or None when coverage is too thin and the
+        providers should be asked (fewer than `place_store_min_results` fresh places
+        within `place_store_radius_m`).
+        """
+        places = self.search(
+            query, lat, lng, settings.place_store_radius_m,
+            limit=5, max_age_seconds=settings.place_store_max_age_seconds,
+        )
+        if len(places) < settings.place_store_min_results:
+            CACHE_REQUESTS.labels(keyspace="place_store", result="miss").inc()
+            return None
+        CACHE_REQUESTS.labels(keyspace="place_store", result="hit").inc()
+        return places
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.models.place_batch import PlaceBatch
+from app.models.response_models import Plan
+from app.services.cache import CacheService
+from app.services.matrix_provider import TravelMatrix
+from app.utils.config import settings
+from app.utils.lru import LRUCache
+from app.utils.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def plan_key(plan_id: str) -> str:
+    return f"plan:{plan_id}"
+
+
+def context_key(plan_id: str) -> str:
+    return f"plan_context:{plan_id}"
+
+
+class PlanBody(NamedTuple):
+    """A plan rendered for GET /plan/{plan_id}: the JSON bytes and their strong ETag."""
+
+    body: bytes
+    etag: str
+
+
+def render_plan(plan: Dict[str, Any]) -> PlanBody:
+    """
+    Compact JSON (what JSONResponse would send) with a SHA-256 ETag. Dict order
+    survives the Redis round trip, so every worker renders the same plan to the
+    same bytes and ETag.
+    """
+    body = json.dumps(plan, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return PlanBody(body, f'"{hashlib.sha256(body).hexdigest()}"')
+
+
+def build_context(user_text: str, lat: float, lng: float, tasks: List[Dict[str, Any]], candidates: PlaceBatch,
+                  route: PlaceBatch, travel: Optional[TravelMatrix]) -> Dict[str, Any]:
+    """
+    What an edit needs besides the plan itself: the request, its tasks, every
+    candidate the router chose from, the chosen stops as candidate indices in
+    visiting order, the candidate index of each stop id, and the travel matrix over
+    [start] + candidates (rounded to whole meters and seconds).
+    """
+    # Routed rows are copies of candidate rows with new stop ids, so match on name and position
+    positions = {key: i for i, key in enumerate(zip(candidates.name, map(tuple, candidates.coords.tolist())))}
+    chosen = [positions.get(key) for key in zip(route.name, map(tuple, route.coords.tolist()))]
+    return {
+        "user_text": user_text,
+        "lat": lat,
+        "lng": lng,
+        "tasks": tasks,
+        "candidates": candidates.to_dicts(),
+        "route": [i for i in chosen if i is not None],
+        "stops": {stop_id: i for stop_id, i in zip(route.id, chosen) if i is not None},
+        "travel": None if travel is None else {
+            "distances_m": np.rint(travel.distances_m).astype(int).tolist(),
+            "durations_s": np.rint(travel.durations_s).astype(int).tolist(),
+        },
+    }
+
+
+def context_travel(context: Dict[str, Any]) -> Optional[TravelMatrix]:
+    travel = context.get("travel")
+    if not travel:
+        return None
+    return TravelMatrix(np.asarray(travel["distances_m"], dtype=np.float64),
+                        np.asarray(travel["durations_s"], dtype=np.float64))
+
+
+class PlanCache:
+    """
+    Finished plans, kept so they can be fetched with GET /plan/{plan_id} and
+    edited with PATCH /plan/{plan_id}.
+
+    `plan:{plan_id}` holds the plan as returned to the client (the key
+    OrchestratorAgent writes too) and `plan_context:{plan_id}` what `build_context`
+    collects. Both are written and read together in one round trip and expire
+    after PLAN_TTL_SECONDS.
+
+    Recently saved or viewed plans are also kept rendered in a per-process LRU
+    (PLAN_HOT_CACHE_SIZE entries), so a repeat GET is a dict lookup without Redis
+    or re-serialization. `save` replaces the entry in this process; other workers
+    may serve their copy of an edited plan for up to PLAN_HOT_TTL_SECONDS.
+    """
+
+    def __init__(self, cache: CacheService, ttl_seconds: Optional[int] = None, hot_size: Optional[int] = None,
+                 hot_ttl_seconds: Optional[float] = None):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds or settings.plan_ttl_seconds
+        hot_ttl_seconds = hot_ttl_seconds if hot_ttl_seconds is not None else settings.plan_hot_ttl_seconds
+        self._hot = LRUCache(
+            maxsize=hot_size if hot_size is not None else settings.plan_hot_cache_size,
+            ttl_seconds=min(hot_ttl_seconds, self.ttl_seconds),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """False without a Redis connection; callers then skip building the context."""
+        return self.cache.redis_client is not None
+
+    async def save(self, plan: Plan, context: Optional[Dict[str, Any]] = None):
+        """Store a new or edited plan; without a context it can be fetched but not edited."""
+        data = plan.model_dump(mode="json")
+        if self._hot.maxsize > 0:
+            self._hot.set(plan.plan_id, render_plan(data))
+        if not self.enabled:
+            return
+        async with self.cache.pipeline() as pipe:
+            pipe.set(plan_key(plan.plan_id), data, expire=self.ttl_seconds)
+            if context is not None:
+                pipe.set(context_key(plan.plan_id), context, expire=self.ttl_seconds)
+        logger.debug("💾 Saved plan %s", plan.plan_id)
+
+    async def get_rendered(self, plan_id: str) -> Optional[PlanBody]:
+        """The plan as GET /plan/{plan_id} sends it, or None when it is unknown or expired."""
+        rendered: Optional[PlanBody] = self._hot.get(plan_id)
+        CACHE_REQUESTS.labels(keyspace="hot_plans", result="miss" if rendered is None else "hit").inc()
+        if rendered is not None:
+            return rendered
+        plan = await self.cache.get(plan_key(plan_id))
+        if not isinstance(plan, dict):
+            return None
+        rendered = render_plan(plan)
+        if self._hot.maxsize > 0:
+            self._hot.set(plan_id, rendered)
+        return rendered
+
+    async def load(self, plan_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """The plan and its context; either is None when missing, expired or unreadable."""
+        async with self.cache.pipeline() as pipe:
+            pipe.get(plan_key(plan_id)).get(context_key(plan_id))
+        # A failed GET in the pipeline comes back as its exception
+        errors = [result for result in pipe.results if isinstance(result, Exception)]
+        if errors:
+            logger.error("❌ Could not load plan %s: %s", plan_id, errors[0])
+        plan, context = (result if isinstance(result, dict) else None for result in pipe.results)
+        return plan, context
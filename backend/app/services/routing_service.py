@@ -1,45 +1,277 @@
 import logging
-from typing import List, Tuple
+import time
+from typing import List, Optional, Tuple
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 import numpy as np
-from geopy.distance import geodesic
+from app.services.matrix_provider import MatrixService, TravelMatrix
+from app.utils import geo
+from app.utils.config import settings
 
 logger = logging.getLogger(__name__)
 
 class RoutingService:
-    def __init__(self):
+    def __init__(self, matrix_service: Optional[MatrixService] = None):
+        self._matrix_service = matrix_service
         logger.info("🛠️ RoutingService initialized.")
 
+    @property
+    def matrix_service(self) -> MatrixService:
+        # Built on first use: solver worker processes construct a RoutingService but never fetch matrices
+        if self._matrix_service is None:
+            self._matrix_service = MatrixService()
+        return self._matrix_service
+
+    async def travel_matrix(self, locations: List[Tuple[float, float]]) -> TravelMatrix:
+        """Road (or geodesic) distances and durations between all `locations`, one provider call at most."""
+        logger.info("📐 Fetching travel matrix for %s locations.", len(locations))
+        return await self.matrix_service.matrix(locations)
+
+    async def extend_travel_matrix(self, locations, known: List[int], travel: TravelMatrix) -> TravelMatrix:
+        """Like `travel_matrix`, reusing `travel` for the locations at `known`; only the others are fetched."""
+        logger.info("📐 Extending travel matrix from %s to %s locations.", len(known), len(locations))
+        return await self.matrix_service.extend(locations, known, travel)
+
     def calculate_distance_matrix(self, locations: List[Tuple[float, float]]) -> np.ndarray:
         num_locations = len(locations)
-        logger.info(f"📐 Calculating distance matrix for {num_locations} locations.")
-        distance_matrix = np.zeros((num_locations, num_locations), dtype=int)
-        for i in range(num_locations):
-            for j in range(num_locations):
-                if i != j:
-                    dist = geodesic(locations[i], locations[j]).meters
-                    distance_matrix[i][j] = int(dist)
-        return distance_matrix
+        logger.info("📐 Calculating distance matrix for %s locations.", num_locations)
+        return geo.distance_matrix(locations).astype(int)
 
     def solve_tsp(self, locations: List[Tuple[float, float]], start_index: int = 0) -> List[int]:
         if not locations or len(locations) <= 1:
             return list(range(len(locations)))
             
-        logger.info(f"🔧 Solving TSP for {len(locations)} locations.")
+        logger.info("🔧 Solving TSP for %s locations.", len(locations))
         distance_matrix = self.calculate_distance_matrix(locations)
+        return self.solve_tsp_matrix(distance_matrix, start_index)
+
+    def solve_tsp_matrix(self, distance_matrix: np.ndarray, start_index: int = 0,
+                         initial_route: Optional[List[int]] = None) -> List[int]:
+        """
+        Order the nodes of `distance_matrix` as an open path starting at `start_index`.
+
+        Small instances are solved exactly with Held-Karp; larger ones fall back to OR-Tools,
+        warm-started from `initial_route` (a full path, start first) when given.
+        """
+        num_nodes = len(distance_matrix)
+        if num_nodes <= 1:
+            return list(range(num_nodes))
         
-        manager = pywrapcp.RoutingIndexManager(len(locations), 1, start_index)
-        routing = pywrapcp.RoutingModel(manager)
+        started = time.perf_counter()
+        solver = self.solver_for(num_nodes)
+        if solver == "held_karp":
+            route = self._solve_held_karp(distance_matrix, start_index)
+        else:
+            route = self._solve_ortools(distance_matrix, start_index, initial_route)
+        elapsed_ms = (time.perf_counter() - started) * 1000
         
-        def distance_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
+        logger.info("✅ TSP solved by %s for %s locations in %.1f ms: %s", solver, num_nodes, elapsed_ms, route)
+        return route
+
+    @staticmethod
+    def solver_for(num_nodes: int) -> str:
+        """Name of the algorithm `solve_tsp_matrix` uses for this many locations."""
+        return "held_karp" if num_nodes <= settings.tsp_exact_max_nodes else "ortools"
+
+    @staticmethod
+    def gtsp_solver_for(num_groups: int) -> str:
+        """Name of the algorithm `solve_gtsp_matrix` uses for this many groups (start excluded)."""
+        return "gtsp_dp" if num_groups + 1 <= settings.tsp_exact_max_nodes else "gtsp_ortools"
+
+    def solve_gtsp_matrix(self, cost_matrix: np.ndarray, groups: np.ndarray, start_index: int = 0,
+                          initial_route: Optional[List[int]] = None) -> List[int]:
+        """
+        Generalized TSP: an open path from `start_index` through exactly one node of
+        each group, minimizing `cost_matrix`. `groups[i]` is node i's group (0..G-1);
+        the start node's entry is ignored.
+
+        Dominated candidates are pruned first. Up to TSP_EXACT_MAX_NODES - 1 groups are
+        then solved exactly by DP over group subsets, larger instances by OR-Tools
+        with one disjunction per group, warm-started from `initial_route` when given.
+        Returns node indices, start first.
+        """
+        cost = np.asarray(cost_matrix, dtype=np.float64)
+        groups = np.asarray(groups, dtype=np.int64).copy()
+        groups[start_index] = -1
+        num_groups = int(groups.max()) + 1 if len(groups) > 1 else 0
+        if num_groups == 0:
+            return [start_index]
+
+        started = time.perf_counter()
+        kept = self._undominated(cost, groups, start_index, protected=initial_route or ())
+        sub_cost = cost[np.ix_(kept, kept)]
+        sub_groups = groups[kept]
+        sub_start = int(np.flatnonzero(kept == start_index)[0])
+
+        solver = self.gtsp_solver_for(num_groups)
+        if solver == "gtsp_dp":
+            route = self._solve_gtsp_dp(sub_cost, sub_groups, num_groups, sub_start)
+        else:
+            sub_initial = np.searchsorted(kept, initial_route).tolist() if initial_route else None
+            route = self._solve_gtsp_ortools(sub_cost, sub_groups, num_groups, sub_start, sub_initial)
+        route = kept[route].tolist()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        logger.info("✅ GTSP solved by %s for %s groups (%s of %s candidates after pruning) in %.1f ms: %s",
+                    solver, num_groups, len(kept) - 1, len(cost) - 1, elapsed_ms, route)
+        return route
+
+    @staticmethod
+    def _undominated(cost: np.ndarray, groups: np.ndarray, start_index: int, protected=()) -> np.ndarray:
+        """
+        Sorted node indices left after dropping dominated candidates.
+
+        Candidate a dominates b of the same group when reaching a from every node
+        outside the group costs no more than reaching b, and leaving a for every such
+        node (the start excepted: paths are open) costs no more than leaving b. Any
+        route through b is then at least as long as the same route through a. Of
+        exactly equal candidates the lower index is kept. `protected` nodes (a
+        warm-start route) are always kept.
+        """
+        keep = np.ones(len(cost), dtype=bool)
+        for group in np.unique(groups[groups >= 0]):
+            members = np.flatnonzero(groups == group)
+            if len(members) < 2:
+                continue
+            outside = np.flatnonzero(groups != group)
+            targets = outside[outside != start_index]
+            incoming = cost[np.ix_(outside, members)]  # (outside, k)
+            outgoing = cost[np.ix_(members, targets)]  # (k, targets)
+            # no_worse[a, b]: a is at least as good as b on every edge
+            no_worse = (incoming[:, :, None] <= incoming[:, None, :]).all(axis=0) & \
+                       (outgoing[:, None, :] <= outgoing[None, :, :]).all(axis=2)
+            strictly = no_worse & ~no_worse.T
+            tie_first = no_worse & no_worse.T & np.tri(len(members), k=-1, dtype=bool).T  # [a, b]: a < b
+            dominated = (strictly | tie_first).any(axis=0)
+            keep[members[dominated]] = False
+        keep[list(protected)] = True
+        return np.flatnonzero(keep)
+
+    def _solve_gtsp_dp(self, cost: np.ndarray, groups: np.ndarray, num_groups: int, start_index: int) -> List[int]:
+        """
+        Exact GTSP by dynamic programming over group subsets.
+
+        dp[mask, k] is the cheapest path from the start that visits one node of each
+        group in `mask` and ends at node k. Like Held-Karp, every subset of one size
+        is expanded in a single NumPy step.
+        """
+        num_nodes = len(cost)
+        num_masks = 1 << num_groups
+        node_bits = np.where(groups >= 0, np.int64(1) << np.maximum(groups, 0), 0)
+
+        dp = np.full((num_masks, num_nodes), np.inf)
+        parent = np.full((num_masks, num_nodes), -1, dtype=np.int16)
+        dp[0, start_index] = 0.0
+
+        masks = np.arange(num_masks, dtype=np.int64)
+        popcount = np.bitwise_count(masks)
+        for size in range(num_groups):
+            layer = masks[popcount == size]
+            cost_to = dp[layer][:, :, None] + cost[None, :, :]
+            best_prev = cost_to.argmin(axis=1)
+            best_cost = np.take_along_axis(cost_to, best_prev[:, None, :], axis=1)[:, 0, :]
+
+            open_group = (groups[None, :] >= 0) & ((layer[:, None] & node_bits[None, :]) == 0)
+            rows, cols = np.nonzero(open_group & np.isfinite(best_cost))
+            next_masks = layer[rows] | node_bits[cols]
+            # (next_mask, k) has exactly one predecessor mask: next_mask without k's group.
+            dp[next_masks, cols] = best_cost[rows, cols]
+            parent[next_masks, cols] = best_prev[rows, cols]
+
+        mask = num_masks - 1
+        node = int(dp[mask].argmin())
+        route = []
+        while mask:
+            route.append(node)
+            previous = int(parent[mask, node])
+            mask ^= int(node_bits[node])
+            node = previous
+        route.append(start_index)
+        return route[::-1]
+
+    def _solve_gtsp_ortools(self, cost: np.ndarray, groups: np.ndarray, num_groups: int,
+                            start_index: int, initial_route: Optional[List[int]] = None) -> List[int]:
+        num_nodes = len(cost)
+        manager = pywrapcp.RoutingIndexManager(num_nodes, 1, start_index)
+        routing = pywrapcp.RoutingModel(manager)
+
+        def cost_callback(from_index, to_index):
             to_node = manager.IndexToNode(to_index)
-            return distance_matrix[from_node][to_node]
-        
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+            if to_node == start_index:
+                return 0
+            return int(cost[manager.IndexToNode(from_index)][to_node])
+
+        transit_callback_index = routing.RegisterTransitCallback(cost_callback)
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+        # No penalty: exactly one node of each group must be visited
+        for group in range(num_groups):
+            routing.AddDisjunction([manager.NodeToIndex(int(node)) for node in np.flatnonzero(groups == group)])
+
+        solution = self._search(routing, manager, initial_route)
+        if solution:
+            route = []
+            index = routing.Start(0)
+            while not routing.IsEnd(index):
+                route.append(manager.IndexToNode(index))
+                index = solution.Value(routing.NextVar(index))
+            return route
+
+        logger.warning("⚠️ No GTSP solution found. Taking the first candidate of each group in order.")
+        firsts = [int(np.flatnonzero(groups == group)[0]) for group in range(num_groups)]
+        return [start_index] + firsts
+
+    def _solve_held_karp(self, distance_matrix: np.ndarray, start_index: int = 0) -> List[int]:
+        """
+        Proven-optimal open path by bitmask dynamic programming.
+
+        dp[mask, k] is the cheapest path that starts at `start_index`, visits exactly the
+        nodes in `mask` and ends at k. All subsets of one size are expanded in a single
+        NumPy step, so the Python loop runs only n times.
+        """
+        dist = np.asarray(distance_matrix, dtype=np.float64)
+        num_nodes = len(dist)
+        num_masks = 1 << num_nodes
+        nodes = np.arange(num_nodes)
+        
+        dp = np.full((num_masks, num_nodes), np.inf)
+        parent = np.full((num_masks, num_nodes), -1, dtype=np.int16)
+        dp[1 << start_index, start_index] = 0.0
+        
+        masks = np.arange(num_masks, dtype=np.int64)
+        popcount = np.bitwise_count(masks)
+        contains_start = ((masks >> start_index) & 1) == 1
+        
+        for size in range(1, num_nodes):
+            layer = masks[(popcount == size) & contains_start]
+            # cost[m, j, k]: extend the best path over layer[m] ending at j with the edge j -> k
+            cost = dp[layer][:, :, None] + dist[None, :, :]
+            best_prev = cost.argmin(axis=1)
+            best_cost = np.take_along_axis(cost, best_prev[:, None, :], axis=1)[:, 0, :]
+            
+            unvisited = ((layer[:, None] >> nodes[None, :]) & 1) == 0
+            rows, cols = np.nonzero(unvisited & np.isfinite(best_cost))
+            next_masks = layer[rows] | (np.int64(1) << cols)
+            # Each (next_mask, k) is reached from exactly one (mask, k) pair, so plain assignment is safe.
+            dp[next_masks, cols] = best_cost[rows, cols]
+            parent[next_masks, cols] = best_prev[rows, cols]
         
+        mask = num_masks - 1
+        node = int(dp[mask].argmin())
+        route = []
+        while node != -1:
+            route.append(node)
+            previous = int(parent[mask, node])
+            mask ^= 1 << node
+            node = previous
+        return route[::-1]
+
+    @staticmethod
+    def _search(routing, manager, initial_route: Optional[List[int]] = None):
+        """
+        Run guided local search. From scratch it gets TSP_TIME_LIMIT_SECONDS; warm-started
+        from `initial_route` (start first), which is already a good tour, it only
+        gets REPLAN_TIME_LIMIT_MS to improve it.
+        """
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
         search_parameters.first_solution_strategy = (
             routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
@@ -47,9 +279,67 @@ class RoutingService:
         search_parameters.local_search_metaheuristic = (
             routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
         )
-        search_parameters.time_limit.FromSeconds(2)
+        if not initial_route:
+            search_parameters.time_limit.FromSeconds(settings.tsp_time_limit_seconds)
+            return routing.SolveWithParameters(search_parameters)
+
+        search_parameters.time_limit.FromMilliseconds(settings.replan_time_limit_ms)
+        routing.CloseModelWithParameters(search_parameters)
+        initial = routing.ReadAssignmentFromRoutes([[manager.NodeToIndex(int(node)) for node in initial_route[1:]]], True)
+        if initial is None:
+            logger.warning("⚠️ Warm-start route rejected by OR-Tools; solving from scratch.")
+            return routing.SolveWithParameters(search_parameters)
+        return routing.SolveFromAssignmentWithParameters(initial, search_parameters)
+
+    @staticmethod
+    def cheapest_insertion(cost_matrix: np.ndarray, route: List[int], candidates: List[List[int]]) -> List[int]:
+        """
+        Extend an open path (start first) with one node from each candidate list,
+        repeatedly inserting the node and position that add the least cost.
+
+        Used to turn a previous route into a warm start after errands were added:
+        O(groups^2 x candidates x stops) instead of a fresh solve.
+        """
+        cost = np.asarray(cost_matrix, dtype=np.float64)
+        route = list(route)
+        pending = [np.asarray(nodes, dtype=np.intp) for nodes in candidates if len(nodes)]
+        while pending:
+            path = np.asarray(route)
+            # Inserting after the last stop adds no outgoing edge and replaces none
+            has_next = np.r_[np.ones(len(path) - 1, dtype=bool), False]
+            following = np.r_[path[1:], path[0]]
+            replaced = np.where(has_next, cost[path, following], 0.0)
+            best = None
+            for g, nodes in enumerate(pending):
+                # added[i, p]: extra cost of visiting nodes[i] right after route[p]
+                outgoing = np.where(has_next[None, :], cost[nodes[:, None], following[None, :]], 0.0)
+                added = cost[path[None, :], nodes[:, None]] + outgoing - replaced[None, :]
+                i, p = np.unravel_index(int(added.argmin()), added.shape)
+                if best is None or added[i, p] < best[0]:
+                    best = (added[i, p], g, int(nodes[i]), int(p))
+            _, g, node, position = best
+            route.insert(position + 1, node)
+            pending.pop(g)
+        return route
+
+    def _solve_ortools(self, distance_matrix: np.ndarray, start_index: int = 0,
+                       initial_route: Optional[List[int]] = None) -> List[int]:
+        num_nodes = len(distance_matrix)
+        manager = pywrapcp.RoutingIndexManager(num_nodes, 1, start_index)
+        routing = pywrapcp.RoutingModel(manager)
+        
+        def distance_callback(from_index, to_index):
+            from_node = manager.IndexToNode(from_index)
+            to_node = manager.IndexToNode(to_index)
+            # Returning to the start is free, so the tour is optimized as an open path.
+            if to_node == start_index:
+                return 0
+            return int(distance_matrix[from_node][to_node])
+        
+        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
         
-        solution = routing.SolveWithParameters(search_parameters)
+        solution = self._search(routing, manager, initial_route)
         
         if solution:
             route = []
@@ -57,8 +347,7 @@ class RoutingService:
             while not routing.IsEnd(index):
                 route.append(manager.IndexToNode(index))
                 index = solution.Value(routing.NextVar(index))
-            logger.info(f"✅ TSP solution found: {route}")
             return route
         
         logger.warning("⚠️ No TSP solution found. Returning original order.")
-        return list(range(len(locations)))
\ No newline at end of file
+        return list(range(num_nodes))
@@ -1,17 +1,36 @@
 import httpx
 import logging
+import time
 from typing import List, Dict, Any, Optional
 from app.utils.config import settings
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError, breakers
+from app.services.http_client import HTTPClientRegistry, http_clients
+from app.services.outbound_governor import ProviderGovernor, governors
+from app.services.place_cache import normalize_query
+from app.utils.singleflight import SingleFlight, coordinate_key
+from app.utils.metrics import PROVIDER_ERRORS, PROVIDER_REQUEST_DURATION, error_reason
 
 logger = logging.getLogger(__name__)
 
 class SerpAPIService:
-    def __init__(self):
+    def __init__(self, http_registry: Optional[HTTPClientRegistry] = None, governor: Optional[ProviderGovernor] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.http_clients = http_registry or http_clients
+        self.governor = governor or governors.get("serpapi")
+        self.breaker = breaker or breakers.get("serpapi")
         self.api_key = settings.serpapi_api_key
         self.base_url = "https://serpapi.com/search"
+        self._inflight = SingleFlight("serpapi") if settings.singleflight_enabled else None
         logger.info("🐍 SerpAPIService initialized.")
     
     async def search_local_places(self, query: str, lat: float, lng: float) -> List[Dict[str, Any]]:
+        if self._inflight is None:
+            return await self._search_local_places(query, lat, lng)
+        key = (normalize_query(query), coordinate_key(lat, lng))
+        results = await self._inflight.do(key, lambda: self._search_local_places(query, lat, lng))
+        return list(results)
+    
+    async def _search_local_places(self, query: str, lat: float, lng: float) -> List[Dict[str, Any]]:
         params = {
             "engine": "google_maps",
             "q": query,
@@ -21,20 +40,30 @@ class SerpAPIService:
             "hl": "en"
         }
         
+        started = time.perf_counter()
         try:
-            logger.info(f"🐍 SerpAPI search for: '{query}' near ({lat},{lng})")
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.base_url, params=params)
+            logger.info("🐍 SerpAPI search for: '%s' near (%s,%s)", query, lat, lng)
+            client = self.http_clients.get("serpapi")
+            async with self.breaker.guard():
+                response = await self.governor.request(lambda: client.get(self.base_url, params=params))
                 response.raise_for_status()
-                data = response.json()
-                results = data.get("local_results", [])
-                logger.info(f"✅ SerpAPI found {len(results)} places.")
-                return results
+            data = response.json()
+            results = data.get("local_results", [])
+            PROVIDER_REQUEST_DURATION.labels(provider="serpapi").observe(time.perf_counter() - started)
+            logger.info("✅ SerpAPI found %s places.", len(results))
+            return results
+        except CircuitOpenError as e:
+            logger.debug("⚡ Skipping SerpAPI search: %s", e)
+            return []
         except httpx.HTTPStatusError as e:
-            logger.error(f"❌ SerpAPI error: {e.response.status_code} - {e.response.text}")
+            PROVIDER_REQUEST_DURATION.labels(provider="serpapi").observe(time.perf_counter() - started)
+            PROVIDER_ERRORS.labels(provider="serpapi", reason=error_reason(e)).inc()
+            logger.error("❌ SerpAPI error: %s - %s", e.response.status_code, e.response.text)
             return []
         except Exception as e:
-            logger.error(f"❌ Unexpected error in SerpAPI search: {e}")
+            PROVIDER_REQUEST_DURATION.labels(provider="serpapi").observe(time.perf_counter() - started)
+            PROVIDER_ERRORS.labels(provider="serpapi", reason=error_reason(e)).inc()
+            logger.error("❌ Unexpected error in SerpAPI search: %s", e)
             return []
 
     async def generate_directions_map_url(
@@ -62,9 +91,9 @@ class SerpAPIService:
             else:
                 map_url = base_url + origin
             
-            logger.info(f"✅ Generated Google Maps URL: {map_url}")
+            logger.info("✅ Generated Google Maps URL: %s", map_url)
             return map_url
             
         except Exception as e:
-            logger.error(f"❌ Error generating directions map URL: {e}")
+            logger.error("❌ Error generating directions map URL: %s", e)
             return None
\ No newline at end of file
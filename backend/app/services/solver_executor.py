@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from app.services.routing_service import RoutingService
+from app.utils.config import settings
+from app.utils.metrics import SOLVER_DURATION, SOLVER_PENDING, SOLVER_STOPS
+
+logger = logging.getLogger(__name__)
+
+# Per-worker routing service, built once by the pool initializer
+_worker_routing_service: Optional[RoutingService] = None
+
+
+def _warm_worker():
+    """Pool initializer: import OR-Tools and build the routing service once per worker."""
+    global _worker_routing_service
+    from ortools.constraint_solver import pywrapcp  # noqa: F401
+    _worker_routing_service = RoutingService()
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _solve_tsp_in_worker(distance_matrix: np.ndarray, start_index: int,
+                         initial_route: Optional[List[int]] = None) -> List[int]:
+    service = _worker_routing_service or RoutingService()
+    return service.solve_tsp_matrix(distance_matrix, start_index, initial_route)
+
+
+def _solve_gtsp_in_worker(cost_matrix: np.ndarray, groups: np.ndarray, start_index: int,
+                          initial_route: Optional[List[int]] = None) -> List[int]:
+    service = _worker_routing_service or RoutingService()
+    return service.solve_gtsp_matrix(cost_matrix, groups, start_index, initial_route)
+
+
+class SolverQueueFullError(RuntimeError):
+    """Raised when more solve jobs are pending than `solver_max_queue` allows."""
+
+
+class SolverExecutor:
+    """
+    Runs CPU-bound route solving off the event loop.
+
+    SOLVER_EXECUTOR selects a spawn-context process pool ("process", the default),
+    a thread pool ("thread") or inline solving ("inline", only for debugging). The
+    process pool is the default because pywrapcp keeps the GIL while it searches,
+    so a thread pool only helps the NumPy Held-Karp path. Jobs
+    are bounded by SOLVER_MAX_QUEUE. Each one is awaited for at most
+    SOLVER_TIMEOUT_SECONDS. A job that times out or is cancelled while still queued
+    never starts. Jobs already running finish in their worker and are discarded.
+    """
+
+    def __init__(self):
+        self.mode = settings.solver_executor
+        self.max_workers = settings.solver_max_workers
+        self.max_queue = settings.solver_max_queue
+        self.timeout_seconds = settings.solver_timeout_seconds
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _create_executor(self) -> Optional[Executor]:
+        if self.mode == "inline":
+            return None
+        if self.mode == "thread":
+            return ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="route-solver",
+                initializer=_warm_worker,
+            )
+        # Spawn avoids forking a process that already runs the event loop and its threads.
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+
+    async def startup(self):
+        self._executor = self._create_executor()
+        if self._executor is None:
+            logger.info("🧮 Route solver running inline on the event loop")
+            return
+        # Submit one no-op per worker so every worker is spawned and warm before the first request.
+        loop = asyncio.get_running_loop()
+        warmups = [loop.run_in_executor(self._executor, _worker_ready) for _ in range(self.max_workers)]
+        try:
+            workers = set(await asyncio.gather(*warmups))
+            logger.info("🧮 Route solver pool ready: %s mode, %s warm worker(s)", self.mode, len(workers))
+        except Exception as e:
+            logger.error("❌ Failed to warm route solver workers: %s", e)
+
+    async def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("🧮 Route solver pool shut down")
+
+    async def solve_tsp_matrix(self, distance_matrix: np.ndarray, start_index: int = 0,
+                               initial_route: Optional[List[int]] = None) -> List[int]:
+        # Recorded here rather than in RoutingService, whose process-pool copies cannot reach this registry.
+        solver = RoutingService.solver_for(len(distance_matrix))
+        SOLVER_STOPS.labels(solver=solver).observe(max(len(distance_matrix) - 1, 0))
+        return await self._timed(solver, _solve_tsp_in_worker, distance_matrix, start_index, initial_route)
+
+    async def solve_gtsp_matrix(self, cost_matrix: np.ndarray, groups: np.ndarray, start_index: int = 0,
+                                initial_route: Optional[List[int]] = None) -> List[int]:
+        """Pick one node per group and order them; see RoutingService.solve_gtsp_matrix."""
+        num_groups = len(np.unique(np.delete(np.asarray(groups), start_index)))
+        solver = RoutingService.gtsp_solver_for(num_groups)
+        SOLVER_STOPS.labels(solver=solver).observe(num_groups)
+        return await self._timed(solver, _solve_gtsp_in_worker, cost_matrix, groups, start_index, initial_route)
+
+    async def _timed(self, solver: str, fn, *args) -> List[int]:
+        outcome = "error"
+        started = time.perf_counter()
+        try:
+            route = await self._solve(fn, *args)
+            outcome = "ok"
+            return route
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        except SolverQueueFullError:
+            outcome = "rejected"
+            raise
+        finally:
+            SOLVER_DURATION.labels(solver=solver, outcome=outcome).observe(time.perf_counter() - started)
+
+    async def _solve(self, fn, *args) -> List[int]:
+        if self.mode == "inline":
+            return fn(*args)
+        if self._executor is None:
+            # Not started (e.g. scripts): still keep the solve off the event loop.
+            return await asyncio.to_thread(fn, *args)
+
+        if self._pending >= self.max_queue:
+            raise SolverQueueFullError(f"{self._pending} route solves already pending")
+
+        loop = asyncio.get_running_loop()
+        try:
+            job = self._executor.submit(fn, *args)
+        except BrokenExecutor:
+            # A worker died (e.g. OOM-killed); replace the pool once instead of failing every later solve.
+            logger.warning("⚠️ Route solver pool is broken, restarting it")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+            job = self._executor.submit(fn, *args)
+        self._pending += 1
+        SOLVER_PENDING.set(self._pending)
+        # Release the slot only when the job has really left the pool, not when the caller gives up.
+        def on_job_done(_):
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                pass  # Event loop already closed during shutdown
+        job.add_done_callback(on_job_done)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.timeout_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            job.cancel()
+            raise
+
+    def _release(self):
+        self._pending -= 1
+        SOLVER_PENDING.set(self._pending)
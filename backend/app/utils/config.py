@@ -21,13 +21,132 @@ class Settings(BaseSettings):
     redis_port: int = 6379
     redis_username: Optional[str] = "default"
     redis_password: str = ""
+    redis_max_connections: int = 50
+    redis_socket_timeout_seconds: float = 2.0
+    cache_codec: str = "orjson"  # "json", "orjson" or "msgpack"
+    cache_compression: str = "zstd"  # "none", "zstd" or "lz4"
+    cache_compress_min_bytes: int = 1024  # smaller values are stored uncompressed
+    cache_zstd_level: int = 3
     
     # App settings
     groq_model: str = "llama-3.3-70b-versatile"
-    routing_provider: str = "ors"
+    routing_provider: str = "geodesic"  # travel matrix source: "geodesic", "osrm" or "ors"
     cache_ttl_seconds: int = 600
     log_level: str = "info"
     
+    # Logging settings
+    log_format: str = "kv"  # "kv" (key=value lines) or "plain"
+    log_payload_max_chars: int = 512
+    log_payload_sample_rate: float = 0.01  # fraction of payloads logged when LOG_LEVEL is above debug
+    
+    # Geo settings
+    geo_distance_mode: str = "vincenty"  # "haversine" or "vincenty"
+    
+    # Outbound HTTP settings
+    http2_enabled: bool = False
+    http_max_connections: int = 20
+    http_timeout_seconds: float = 10.0
+    http_connect_timeout_seconds: float = 5.0
+    http_keepalive_expiry_seconds: float = 30.0
+    foursquare_max_connections: int = 20
+    foursquare_timeout_seconds: float = 8.0
+    serpapi_max_connections: int = 20
+    serpapi_timeout_seconds: float = 10.0
+    groq_timeout_seconds: float = 20.0
+    
+    # Outbound governor settings (token bucket + max in flight per provider)
+    outbound_rate_per_second: float = 10.0  # defaults for providers without their own settings; 0 disables
+    outbound_burst: int = 10
+    outbound_max_in_flight: int = 10
+    outbound_max_queue_wait_seconds: float = 10.0
+    outbound_max_retries: int = 2
+    outbound_retry_backoff_seconds: float = 0.5  # used when a throttled response has no Retry-After
+    outbound_max_retry_after_seconds: float = 5.0
+    foursquare_rate_per_second: float = 10.0
+    foursquare_burst: int = 10
+    foursquare_max_in_flight: int = 8
+    serpapi_rate_per_second: float = 5.0
+    serpapi_burst: int = 5
+    serpapi_max_in_flight: int = 5
+    groq_rate_per_second: float = 0.5
+    groq_burst: int = 5
+    groq_max_in_flight: int = 4
+    
+    # Circuit breaker settings
+    circuit_breaker_enabled: bool = True
+    circuit_failure_rate_threshold: float = 0.5  # open when this share of calls in the window failed
+    circuit_window_seconds: float = 30.0
+    circuit_min_calls: int = 5
+    circuit_open_seconds: float = 15.0  # fail fast this long before probing again
+    circuit_half_open_probes: int = 1
+    
+    # Place search cache settings
+    place_cache_enabled: bool = True
+    place_cache_ttl_seconds: int = 600
+    place_cache_stale_seconds: int = 1800
+    place_cache_geohash_precision: int = 6
+    place_cache_max_results: int = 10
+    place_cache_max_refreshes: int = 20
+    
+    # Place store settings (local index of every place the providers returned)
+    place_store_enabled: bool = True
+    place_store_dir: str = "data/place_store"
+    place_store_cell_degrees: float = 0.01  # grid cell size, ~1.1 km of latitude
+    place_store_radius_m: float = 3000.0
+    place_store_min_results: int = 3  # fewer stored places than this within the radius asks the providers
+    place_store_max_age_seconds: int = 604800
+    
+    # Place validation settings
+    dedupe_radius_m: float = 75.0  # places this close with similar names are one store
+    dedupe_name_similarity: float = 0.6
+    
+    # Place search settings
+    search_hedging_enabled: bool = True  # return early when one provider is slow and the other found enough
+    search_soft_deadline_seconds: float = 1.2
+    search_min_candidates: int = 3
+    
+    # Task decomposition memo settings
+    decomposition_memo_enabled: bool = True
+    decomposition_memo_size: int = 1024
+    decomposition_memo_ttl_seconds: int = 86400
+    
+    # Single-flight settings
+    singleflight_enabled: bool = True  # coalesce identical concurrent provider and LLM calls
+    
+    # Batch planning settings
+    batch_max_items: int = 100
+    batch_max_concurrency: int = 8
+    
+    # Route solver settings
+    tsp_exact_max_nodes: int = 12  # Held-Karp up to this many locations, OR-Tools above
+    tsp_time_limit_seconds: int = 2
+    solver_executor: str = "process"  # "process", "thread" or "inline"
+    solver_max_workers: int = 2
+    solver_max_queue: int = 32
+    solver_timeout_seconds: float = 5.0
+    gtsp_enabled: bool = True  # let the solver choose among several candidates per task
+    gtsp_candidates_per_task: int = 5
+    gtsp_rating_penalty: float = 120.0  # route cost (seconds or meters, per ROUTING_METRIC) per rating star below the best
+    
+    # Plan storage settings (GET and PATCH /plan/{plan_id})
+    plan_ttl_seconds: int = 3600  # how long finished plans can be fetched and edited
+    replan_time_limit_ms: int = 300  # OR-Tools budget when warm-started from the previous route
+    plan_hot_cache_size: int = 1024  # rendered plans kept per process for repeat GETs (0 disables)
+    plan_hot_ttl_seconds: int = 60  # bounds how long another worker's edit can go unseen
+    plan_cache_control: str = "private, no-cache"  # clients revalidate with If-None-Match and get a 304
+    
+    # Routing matrix settings
+    routing_metric: str = "duration"  # what the solver minimizes: "duration" or "distance"
+    geodesic_speed_kmh: float = 25.0  # average door-to-door speed assumed for straight-line legs
+    osrm_base_url: str = "http://localhost:5000"
+    osrm_profile: str = "driving"
+    ors_base_url: str = "https://api.openrouteservice.org"
+    ors_api_key: str = ""
+    ors_profile: str = "driving-car"
+    matrix_cache_size: int = 1024  # cached road-network matrices (one per location set)
+    matrix_cache_ttl_seconds: int = 86400
+    matrix_cache_precision: int = 4  # coordinate decimals in cache keys; 4 is ~11 m
+    
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
@@ -53,12 +172,131 @@ class Settings(BaseSettings):
         self.redis_port = int(os.getenv("REDIS_PORT", str(self.redis_port)))
         self.redis_username = os.getenv("REDIS_USERNAME", self.redis_username)
         self.redis_password = os.getenv("REDIS_PASSWORD", self.redis_password)
+        self.redis_max_connections = int(os.getenv("REDIS_MAX_CONNECTIONS", str(self.redis_max_connections)))
+        self.redis_socket_timeout_seconds = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", str(self.redis_socket_timeout_seconds)))
+        self.cache_codec = os.getenv("CACHE_CODEC", self.cache_codec)
+        self.cache_compression = os.getenv("CACHE_COMPRESSION", self.cache_compression)
+        self.cache_compress_min_bytes = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", str(self.cache_compress_min_bytes)))
+        self.cache_zstd_level = int(os.getenv("CACHE_ZSTD_LEVEL", str(self.cache_zstd_level)))
         
         # App settings
         self.groq_model = os.getenv("GROQ_MODEL", self.groq_model)
         self.routing_provider = os.getenv("ROUTING_PROVIDER", self.routing_provider)
         self.cache_ttl_seconds = int(os.getenv("CACHE_TTL_SECONDS", str(self.cache_ttl_seconds)))
         self.log_level = os.getenv("LOG_LEVEL", self.log_level)
+        
+        # Logging settings
+        self.log_format = os.getenv("LOG_FORMAT", self.log_format)
+        self.log_payload_max_chars = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", str(self.log_payload_max_chars)))
+        self.log_payload_sample_rate = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", str(self.log_payload_sample_rate)))
+        
+        # Geo settings
+        self.geo_distance_mode = os.getenv("GEO_DISTANCE_MODE", self.geo_distance_mode)
+        
+        # Outbound HTTP settings
+        self.http2_enabled = os.getenv("HTTP2_ENABLED", str(self.http2_enabled)).lower() in ("1", "true", "yes")
+        self.http_max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", str(self.http_max_connections)))
+        self.http_timeout_seconds = float(os.getenv("HTTP_TIMEOUT_SECONDS", str(self.http_timeout_seconds)))
+        self.http_connect_timeout_seconds = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", str(self.http_connect_timeout_seconds)))
+        self.http_keepalive_expiry_seconds = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", str(self.http_keepalive_expiry_seconds)))
+        self.foursquare_max_connections = int(os.getenv("FOURSQUARE_MAX_CONNECTIONS", str(self.foursquare_max_connections)))
+        self.foursquare_timeout_seconds = float(os.getenv("FOURSQUARE_TIMEOUT_SECONDS", str(self.foursquare_timeout_seconds)))
+        self.serpapi_max_connections = int(os.getenv("SERPAPI_MAX_CONNECTIONS", str(self.serpapi_max_connections)))
+        self.serpapi_timeout_seconds = float(os.getenv("SERPAPI_TIMEOUT_SECONDS", str(self.serpapi_timeout_seconds)))
+        self.groq_timeout_seconds = float(os.getenv("GROQ_TIMEOUT_SECONDS", str(self.groq_timeout_seconds)))
+        
+        # Outbound governor settings
+        self.outbound_rate_per_second = float(os.getenv("OUTBOUND_RATE_PER_SECOND", str(self.outbound_rate_per_second)))
+        self.outbound_burst = int(os.getenv("OUTBOUND_BURST", str(self.outbound_burst)))
+        self.outbound_max_in_flight = int(os.getenv("OUTBOUND_MAX_IN_FLIGHT", str(self.outbound_max_in_flight)))
+        self.outbound_max_queue_wait_seconds = float(os.getenv("OUTBOUND_MAX_QUEUE_WAIT_SECONDS", str(self.outbound_max_queue_wait_seconds)))
+        self.outbound_max_retries = int(os.getenv("OUTBOUND_MAX_RETRIES", str(self.outbound_max_retries)))
+        self.outbound_retry_backoff_seconds = float(os.getenv("OUTBOUND_RETRY_BACKOFF_SECONDS", str(self.outbound_retry_backoff_seconds)))
+        self.outbound_max_retry_after_seconds = float(os.getenv("OUTBOUND_MAX_RETRY_AFTER_SECONDS", str(self.outbound_max_retry_after_seconds)))
+        self.foursquare_rate_per_second = float(os.getenv("FOURSQUARE_RATE_PER_SECOND", str(self.foursquare_rate_per_second)))
+        self.foursquare_burst = int(os.getenv("FOURSQUARE_BURST", str(self.foursquare_burst)))
+        self.foursquare_max_in_flight = int(os.getenv("FOURSQUARE_MAX_IN_FLIGHT", str(self.foursquare_max_in_flight)))
+        self.serpapi_rate_per_second = float(os.getenv("SERPAPI_RATE_PER_SECOND", str(self.serpapi_rate_per_second)))
+        self.serpapi_burst = int(os.getenv("SERPAPI_BURST", str(self.serpapi_burst)))
+        self.serpapi_max_in_flight = int(os.getenv("SERPAPI_MAX_IN_FLIGHT", str(self.serpapi_max_in_flight)))
+        self.groq_rate_per_second = float(os.getenv("GROQ_RATE_PER_SECOND", str(self.groq_rate_per_second)))
+        self.groq_burst = int(os.getenv("GROQ_BURST", str(self.groq_burst)))
+        self.groq_max_in_flight = int(os.getenv("GROQ_MAX_IN_FLIGHT", str(self.groq_max_in_flight)))
+        
+        # Circuit breaker settings
+        self.circuit_breaker_enabled = os.getenv("CIRCUIT_BREAKER_ENABLED", str(self.circuit_breaker_enabled)).lower() in ("1", "true", "yes")
+        self.circuit_failure_rate_threshold = float(os.getenv("CIRCUIT_FAILURE_RATE_THRESHOLD", str(self.circuit_failure_rate_threshold)))
+        self.circuit_window_seconds = float(os.getenv("CIRCUIT_WINDOW_SECONDS", str(self.circuit_window_seconds)))
+        self.circuit_min_calls = int(os.getenv("CIRCUIT_MIN_CALLS", str(self.circuit_min_calls)))
+        self.circuit_open_seconds = float(os.getenv("CIRCUIT_OPEN_SECONDS", str(self.circuit_open_seconds)))
+        self.circuit_half_open_probes = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", str(self.circuit_half_open_probes)))
+        
+        # Place search cache settings
+        self.place_cache_enabled = os.getenv("PLACE_CACHE_ENABLED", str(self.place_cache_enabled)).lower() in ("1", "true", "yes")
+        self.place_cache_ttl_seconds = int(os.getenv("PLACE_CACHE_TTL_SECONDS", str(self.place_cache_ttl_seconds)))
+        self.place_cache_stale_seconds = int(os.getenv("PLACE_CACHE_STALE_SECONDS", str(self.place_cache_stale_seconds)))
+        self.place_cache_geohash_precision = int(os.getenv("PLACE_CACHE_GEOHASH_PRECISION", str(self.place_cache_geohash_precision)))
+        self.place_cache_max_results = int(os.getenv("PLACE_CACHE_MAX_RESULTS", str(self.place_cache_max_results)))
+        self.place_cache_max_refreshes = int(os.getenv("PLACE_CACHE_MAX_REFRESHES", str(self.place_cache_max_refreshes)))
+        
+        # Place store settings
+        self.place_store_enabled = os.getenv("PLACE_STORE_ENABLED", str(self.place_store_enabled)).lower() in ("1", "true", "yes")
+        self.place_store_dir = os.getenv("PLACE_STORE_DIR", self.place_store_dir)
+        self.place_store_cell_degrees = float(os.getenv("PLACE_STORE_CELL_DEGREES", str(self.place_store_cell_degrees)))
+        self.place_store_radius_m = float(os.getenv("PLACE_STORE_RADIUS_M", str(self.place_store_radius_m)))
+        self.place_store_min_results = int(os.getenv("PLACE_STORE_MIN_RESULTS", str(self.place_store_min_results)))
+        self.place_store_max_age_seconds = int(os.getenv("PLACE_STORE_MAX_AGE_SECONDS", str(self.place_store_max_age_seconds)))
+        
+        # Place validation settings
+        self.dedupe_radius_m = float(os.getenv("DEDUPE_RADIUS_M", str(self.dedupe_radius_m)))
+        self.dedupe_name_similarity = float(os.getenv("DEDUPE_NAME_SIMILARITY", str(self.dedupe_name_similarity)))
+        
+        # Place search settings
+        self.search_hedging_enabled = os.getenv("SEARCH_HEDGING_ENABLED", str(self.search_hedging_enabled)).lower() in ("1", "true", "yes")
+        self.search_soft_deadline_seconds = float(os.getenv("SEARCH_SOFT_DEADLINE_SECONDS", str(self.search_soft_deadline_seconds)))
+        self.search_min_candidates = int(os.getenv("SEARCH_MIN_CANDIDATES", str(self.search_min_candidates)))
+        
+        # Task decomposition memo settings
+        self.decomposition_memo_enabled = os.getenv("DECOMPOSITION_MEMO_ENABLED", str(self.decomposition_memo_enabled)).lower() in ("1", "true", "yes")
+        self.decomposition_memo_size = int(os.getenv("DECOMPOSITION_MEMO_SIZE", str(self.decomposition_memo_size)))
+        self.decomposition_memo_ttl_seconds = int(os.getenv("DECOMPOSITION_MEMO_TTL_SECONDS", str(self.decomposition_memo_ttl_seconds)))
+        
+        # Single-flight settings
+        self.singleflight_enabled = os.getenv("SINGLEFLIGHT_ENABLED", str(self.singleflight_enabled)).lower() in ("1", "true", "yes")
+        
+        # Batch planning settings
+        self.batch_max_items = int(os.getenv("BATCH_MAX_ITEMS", str(self.batch_max_items)))
+        self.batch_max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", str(self.batch_max_concurrency)))
+        
+        # Route solver settings
+        self.tsp_exact_max_nodes = int(os.getenv("TSP_EXACT_MAX_NODES", str(self.tsp_exact_max_nodes)))
+        self.tsp_time_limit_seconds = int(os.getenv("TSP_TIME_LIMIT_SECONDS", str(self.tsp_time_limit_seconds)))
+        self.solver_executor = os.getenv("SOLVER_EXECUTOR", self.solver_executor)
+        self.solver_max_workers = int(os.getenv("SOLVER_MAX_WORKERS", str(self.solver_max_workers)))
+        self.solver_max_queue = int(os.getenv("SOLVER_MAX_QUEUE", str(self.solver_max_queue)))
+        self.solver_timeout_seconds = float(os.getenv("SOLVER_TIMEOUT_SECONDS", str(self.solver_timeout_seconds)))
+        self.gtsp_enabled = os.getenv("GTSP_ENABLED", str(self.gtsp_enabled)).lower() in ("1", "true", "yes")
+        self.gtsp_candidates_per_task = int(os.getenv("GTSP_CANDIDATES_PER_TASK", str(self.gtsp_candidates_per_task)))
+        self.gtsp_rating_penalty = float(os.getenv("GTSP_RATING_PENALTY", str(self.gtsp_rating_penalty)))
+        
+        # Plan storage settings
+        self.plan_ttl_seconds = int(os.getenv("PLAN_TTL_SECONDS", str(self.plan_ttl_seconds)))
+        self.replan_time_limit_ms = int(os.getenv("REPLAN_TIME_LIMIT_MS", str(self.replan_time_limit_ms)))
+        self.plan_hot_cache_size = int(os.getenv("PLAN_HOT_CACHE_SIZE", str(self.plan_hot_cache_size)))
+        self.plan_hot_ttl_seconds = int(os.getenv("PLAN_HOT_TTL_SECONDS", str(self.plan_hot_ttl_seconds)))
+        self.plan_cache_control = os.getenv("PLAN_CACHE_CONTROL", self.plan_cache_control)
+        
+        # Routing matrix settings
+        self.routing_metric = os.getenv("ROUTING_METRIC", self.routing_metric)
+        self.geodesic_speed_kmh = float(os.getenv("GEODESIC_SPEED_KMH", str(self.geodesic_speed_kmh)))
+        self.osrm_base_url = os.getenv("OSRM_BASE_URL", self.osrm_base_url)
+        self.osrm_profile = os.getenv("OSRM_PROFILE", self.osrm_profile)
+        self.ors_base_url = os.getenv("ORS_BASE_URL", self.ors_base_url)
+        self.ors_api_key = os.getenv("ORS_API_KEY", self.ors_api_key)
+        self.ors_profile = os.getenv("ORS_PROFILE", self.ors_profile)
+        self.matrix_cache_size = int(os.getenv("MATRIX_CACHE_SIZE", str(self.matrix_cache_size)))
+        self.matrix_cache_ttl_seconds = int(os.getenv("MATRIX_CACHE_TTL_SECONDS", str(self.matrix_cache_ttl_seconds)))
+        self.matrix_cache_precision = int(os.getenv("MATRIX_CACHE_PRECISION", str(self.matrix_cache_precision)))
 
 # Create global settings instance with error handling
 try:
@@ -0,0 +1,103 @@
+import math
+import re
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+METERS_PER_DEGREE = 111_320.0
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_ALNUM = re.compile(r"[^\w]+")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Casefold, drop apostrophes ("Walgreen's" == "Walgreens") and turn other punctuation into spaces."""
+    name = _APOSTROPHES.sub("", (name or "").casefold())
+    return " ".join(_NON_ALNUM.sub(" ", name).split())
+
+
+def _bigrams(text: str) -> FrozenSet[str]:
+    text = text.replace(" ", "")
+    return frozenset(text[i:i + 2] for i in range(len(text) - 1)) or frozenset([text])
+
+
+# Character bigrams only judge names of similar length; containment is left to the tokens
+_MIN_LENGTH_RATIO = 0.8
+
+
+class _Name:
+    __slots__ = ("text", "tokens", "bigrams", "length")
+
+    def __init__(self, name: Optional[str]):
+        self.text = normalize_name(name)
+        self.tokens = frozenset(self.text.split())
+        self.bigrams = _bigrams(self.text)
+        self.length = len(self.text.replace(" ", ""))
+
+
+def name_similarity(a: _Name, b: _Name) -> float:
+    """
+    1.0 for equal names, else the better of token Jaccard (|A∩B| / |A∪B|) and, for
+    names of similar length, the Dice coefficient of character bigrams (catches
+    spelling and spacing differences such as "Wal-Mart" and "Walmart").
+
+    Neither rewards containment: "Bank of America" and "Bank of the West" score
+    about 0.4, and a bare "Pharmacy" does not match every pharmacy around it.
+    """
+    if a.text == b.text:
+        return 1.0
+    if not a.text or not b.text:
+        return 0.0
+    jaccard = len(a.tokens & b.tokens) / len(a.tokens | b.tokens)
+    if min(a.length, b.length) < _MIN_LENGTH_RATIO * max(a.length, b.length):
+        return jaccard
+    dice = 2 * len(a.bigrams & b.bigrams) / (len(a.bigrams) + len(b.bigrams))
+    return max(jaccard, dice)
+
+
+def fuzzy_unique(coords: np.ndarray, names: Sequence[Optional[str]], radius_m: float,
+                 min_similarity: float, groups: Optional[Sequence[Hashable]] = None) -> np.ndarray:
+    """
+    Indices of the places to keep after merging near-duplicates, in input order.
+
+    A place is a duplicate of an earlier kept place in the same group (e.g. task
+    type; everything is one group without `groups`) when they are within `radius_m`
+    and their names are at least `min_similarity` alike. Points are projected onto
+    a local plane and hashed into `radius_m` grid cells, so each place is compared
+    only with the kept places in its own and the 8 neighboring cells: near O(n)
+    instead of a pairwise scan. Coordinates must be finite.
+    """
+    count = len(coords)
+    if count == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # Equirectangular projection around the batch's mean latitude; exact enough at dedupe radii
+    lat0 = math.radians(float(np.mean(coords[:, 0])))
+    y = coords[:, 0] * METERS_PER_DEGREE
+    x = coords[:, 1] * METERS_PER_DEGREE * math.cos(lat0)
+    cell_size = max(radius_m, 1e-6)
+    cells = np.floor(np.column_stack([y, x]) / cell_size).astype(np.int64).tolist()
+    y, x = y.tolist(), x.tolist()
+    radius_sq = radius_m * radius_m
+
+    grid: Dict[Tuple[Any, int, int], List[int]] = {}
+    kept_names: Dict[int, _Name] = {}
+
+    def is_duplicate(i: int, name: _Name, group: Any, cell_y: int, cell_x: int) -> bool:
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                for j in grid.get((group, cell_y + dy, cell_x + dx), ()):
+                    if (y[i] - y[j]) ** 2 + (x[i] - x[j]) ** 2 <= radius_sq and \
+                            name_similarity(name, kept_names[j]) >= min_similarity:
+                        return True
+        return False
+
+    kept: List[int] = []
+    for i, (cell_y, cell_x) in enumerate(cells):
+        name = _Name(names[i])
+        group = groups[i] if groups is not None else None
+        if not is_duplicate(i, name, group, cell_y, cell_x):
+            kept.append(i)
+            kept_names[i] = name
+            grid.setdefault((group, cell_y, cell_x), []).append(i)
+    return np.asarray(kept, dtype=np.intp)
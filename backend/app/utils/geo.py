@@ -0,0 +1,129 @@
+import logging
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# WGS-84 ellipsoid
+EARTH_RADIUS_M = 6371008.8
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+
+DISTANCE_MODES = ("haversine", "vincenty")
+
+Coordinates = Sequence[Tuple[float, float]]
+
+
+def _as_coords(points) -> np.ndarray:
+    """Return an (n, 2) float64 array of (lat, lng) in degrees."""
+    coords = np.asarray(points, dtype=np.float64)
+    if coords.size == 0:
+        return coords.reshape(0, 2)
+    return coords.reshape(-1, 2)
+
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    mode = (mode or settings.geo_distance_mode).lower()
+    if mode not in DISTANCE_MODES:
+        logger.warning(f"⚠️ Unknown geo distance mode '{mode}', falling back to haversine.")
+        return "haversine"
+    return mode
+
+
+def _haversine(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in meters on a spherical earth. Inputs are radians and broadcast."""
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    h = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def _vincenty_approx(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """
+    Ellipsoidal distance in meters using Lambert's formula on WGS-84.
+
+    This is a closed-form approximation of the Vincenty / geodesic distance, without
+    Vincenty's iteration. Against geopy's geodesic on random pairs the error is about
+    1.4 m per 1000 km (under 15 m) up to 10,000 km, grows to ~55 m by 15,000 km, and
+    reaches ~1.7 km for near-antipodal pairs. Inputs are radians and broadcast.
+    """
+    beta1 = np.arctan((1 - WGS84_F) * np.tan(lat1))
+    beta2 = np.arctan((1 - WGS84_F) * np.tan(lat2))
+
+    # Central angle between the reduced latitudes
+    sigma = _haversine(beta1, lng1, beta2, lng2) / EARTH_RADIUS_M
+
+    p = (beta1 + beta2) / 2
+    q = (beta2 - beta1) / 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (sigma - np.sin(sigma)) * (np.sin(p) * np.cos(q)) ** 2 / np.cos(sigma / 2) ** 2
+        y = (sigma + np.sin(sigma)) * (np.cos(p) * np.sin(q)) ** 2 / np.sin(sigma / 2) ** 2
+        distance = WGS84_A * (sigma - WGS84_F / 2 * (x + y))
+
+    # Coincident points divide by zero above; their distance is exactly 0.
+    return np.where(sigma > 0, np.nan_to_num(distance), 0.0)
+
+
+def _kernel(mode: Optional[str]):
+    return _vincenty_approx if _resolve_mode(mode) == "vincenty" else _haversine
+
+
+def distance_matrix(points: Coordinates, mode: Optional[str] = None) -> np.ndarray:
+    """Return the (n, n) matrix of distances in meters between every pair of points."""
+    coords = np.radians(_as_coords(points))
+    lat, lng = coords[:, 0], coords[:, 1]
+    matrix = _kernel(mode)(lat[:, None], lng[:, None], lat[None, :], lng[None, :])
+    np.fill_diagonal(matrix, 0.0)
+    return matrix
+
+
+def distances_from(origin: Tuple[float, float], points: Coordinates, mode: Optional[str] = None) -> np.ndarray:
+    """Return the distance in meters from `origin` to each point."""
+    lat0, lng0 = np.radians(np.asarray(origin, dtype=np.float64))
+    coords = np.radians(_as_coords(points))
+    return _kernel(mode)(lat0, lng0, coords[:, 0], coords[:, 1])
+
+
+def leg_distances(origin: Tuple[float, float], points: Coordinates, mode: Optional[str] = None) -> np.ndarray:
+    """Return the length in meters of each leg of the path origin -> points[0] -> points[1] -> ..."""
+    coords = _as_coords(points)
+    path = np.radians(np.vstack([np.asarray(origin, dtype=np.float64).reshape(1, 2), coords]))
+    return _kernel(mode)(path[:-1, 0], path[:-1, 1], path[1:, 0], path[1:, 1])
+
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lng: float, precision: int = 6) -> str:
+    """
+    Encode a coordinate as a geohash cell id.
+
+    Nearby points share a prefix; precision 6 is a cell of roughly 1.2 km x 0.6 km,
+    precision 5 roughly 4.9 km x 4.9 km.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
@@ -0,0 +1,159 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Any, Optional
+
+from app.utils.config import settings
+
+# Attributes every LogRecord has; anything else on a record came in through `extra=`.
+# uvicorn adds "color_message", an ANSI-colored copy of msg.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "taskName", "color_message",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _kv_value(value: Any) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, default=str, ensure_ascii=False)
+    if text == "" or any(ch in text for ch in ' ="\n'):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+def _extra_fields(record: logging.LogRecord) -> dict[str, Any]:
+    return {
+        key: value for key, value in record.__dict__.items()
+        if key not in _RECORD_ATTRS and not key.startswith("_")
+    }
+
+
+class KeyValueFormatter(logging.Formatter):
+    """
+    One `key=value` line per record: ts, level, logger, msg, then any `extra=` fields.
+
+        logger.info("🔍 Searching places", extra={"query": query, "results": 3})
+        ts=2025-01-01T12:00:00 level=INFO logger=app.agents.place_search msg="🔍 Searching places" query=pharmacy results=3
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields.update(_extra_fields(record))
+        line = " ".join(f"{key}={_kv_value(value)}" for key, value in fields.items())
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+
+class PlainFormatter(logging.Formatter):
+    """
+    The classic `asctime - name - level - message` line, with any `extra=` fields
+    appended as `key=value` so LOG_FORMAT=plain still shows payloads and counts.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        extras = _extra_fields(record)
+        if not extras:
+            return line
+        return line + " " + " ".join(f"{key}={_kv_value(value)}" for key, value in extras.items())
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps `extra=` fields and the traceback on the record.
+
+    The stdlib version flattens the record into its message. Here only the message
+    is interpolated (so mutable args are captured now), and the traceback is
+    rendered to text so the record stays picklable. Formatting the line and
+    writing it happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level: Optional[str] = None) -> logging.handlers.QueueListener:
+    """
+    Route every log record through a queue to a single background writer thread.
+
+    The event loop only enqueues records; formatting and stream I/O happen on the
+    QueueListener thread. Safe to call more than once: later calls only change the level.
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel((level or settings.log_level).upper())
+    if _listener is not None:
+        return _listener
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "plain":
+        stream_handler.setFormatter(PlainFormatter())
+    else:
+        stream_handler.setFormatter(KeyValueFormatter())
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root.handlers = [_QueueHandler(log_queue)]
+    # uvicorn installs its own synchronous stream handlers; send its records through the queue too.
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        server_logger.handlers = []
+        server_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _truncate(payload: Any, max_chars: int) -> str:
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str, ensure_ascii=False)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}… (+{len(text) - max_chars} chars)"
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any, level: int = logging.INFO, **fields: Any):
+    """
+    Log a provider or response payload, capped at LOG_PAYLOAD_MAX_CHARS.
+
+    Only a LOG_PAYLOAD_SAMPLE_RATE fraction of calls is logged, and the payload is
+    serialized only for those, so large dicts cost nothing on most requests. With
+    LOG_LEVEL=debug every payload is logged (still capped).
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if not logger.isEnabledFor(logging.DEBUG) and random.random() >= settings.log_payload_sample_rate:
+        return
+    if isinstance(payload, list):
+        fields.setdefault("count", len(payload))
+    fields["payload"] = _truncate(payload, settings.log_payload_max_chars)
+    logger.log(level, message, extra=fields)
@@ -0,0 +1,364 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache round trips up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_INF_BUCKET = 'le="+Inf"'
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels: str):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels()")
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, labelvalues) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count. Names should end in `_total`."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def render(self, name, labelnames, labelvalues) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def track_inprogress(self):
+        return self._default().track_inprogress()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, name, labelnames, labelvalues) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, _INF_BUCKET)} {self.count}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, labelvalues)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, labelvalues)} {self.count}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations, rendered cumulatively as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != float("inf")))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class MetricsRegistry:
+    """
+    Process-local metric registry rendered in the Prometheus text exposition format.
+
+    Deliberately small: counters, gauges and histograms with fixed label names, no
+    external dependency. Each worker process keeps its own values, so scrape every
+    worker (or run one per container) as usual for multi-process servers.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different shape")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- Metric catalogue ---
+
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "routeright_http_requests_in_flight", "HTTP requests currently being served", ["method"]
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "routeright_http_request_duration_seconds", "HTTP request latency, including streamed bodies",
+    ["method", "route", "status"]
+)
+NODE_DURATION = registry.histogram(
+    "routeright_node_duration_seconds", "LangGraph node latency", ["node", "outcome"]
+)
+NODES_IN_PROGRESS = registry.gauge(
+    "routeright_node_in_progress", "LangGraph nodes currently executing", ["node"]
+)
+PROVIDER_REQUEST_DURATION = registry.histogram(
+    "routeright_provider_request_duration_seconds", "Outbound provider call latency (Foursquare, SerpAPI, Groq)",
+    ["provider"]
+)
+PROVIDER_QUEUE_WAIT = registry.histogram(
+    "routeright_provider_queue_wait_seconds", "Time outbound calls waited for a rate-limit/concurrency slot",
+    ["provider"]
+)
+PROVIDER_IN_FLIGHT = registry.gauge(
+    "routeright_provider_in_flight", "Outbound provider calls currently running", ["provider"]
+)
+PROVIDER_QUEUE_DEPTH = registry.gauge(
+    "routeright_provider_queue_depth", "Outbound provider calls waiting for a slot", ["provider"]
+)
+PROVIDER_THROTTLED = registry.counter(
+    "routeright_provider_throttled_total", "Throttling responses (429/503) received from providers", ["provider"]
+)
+PROVIDER_ERRORS = registry.counter(
+    "routeright_provider_errors_total", "Failed outbound provider calls", ["provider", "reason"]
+)
+CIRCUIT_STATE = registry.gauge(
+    "routeright_circuit_state", "Provider circuit breaker state (0 closed, 1 half-open, 2 open)", ["provider"]
+)
+CIRCUIT_REJECTED = registry.counter(
+    "routeright_circuit_rejected_total", "Provider calls failed fast because the circuit was open", ["provider"]
+)
+CACHE_REQUESTS = registry.counter(
+    "routeright_cache_requests_total", "Shared cache lookups by key prefix and result", ["keyspace", "result"]
+)
+CACHE_VALUE_BYTES = registry.histogram(
+    "routeright_cache_value_bytes", "Encoded size of values written to the shared cache", ["keyspace"],
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+)
+SOLVER_DURATION = registry.histogram(
+    "routeright_solver_duration_seconds", "Route solve latency including queueing in the solver pool",
+    ["solver", "outcome"]
+)
+SOLVER_STOPS = registry.histogram(
+    "routeright_solver_stops", "Stops per solved route", ["solver"],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 30, 50)
+)
+SOLVER_PENDING = registry.gauge(
+    "routeright_solver_pending_jobs", "Route solves submitted to the solver pool and not yet finished"
+)
+BATCH_DEDUPLICATED = registry.counter(
+    "routeright_batch_deduplicated_total", "Lookups answered by another item of the same /plan/batch", ["kind"]
+)
+SEARCH_EARLY_RETURNS = registry.counter(
+    "routeright_search_early_returns_total", "Place searches answered before a provider that missed the soft deadline",
+    ["slow_provider"]
+)
+SINGLEFLIGHT_SHARED = registry.counter(
+    "routeright_singleflight_shared_total", "Calls that joined an identical in-flight call instead of running", ["name"]
+)
+
+
+def error_reason(exc: BaseException) -> str:
+    """Low-cardinality label for a failed outbound call."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return f"http_{status}"
+    name = type(exc).__name__
+    return "timeout" if "Timeout" in name else name
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording in-flight requests and latency per route.
+
+    Implemented at the ASGI level so streamed responses (e.g. /plan/stream) are
+    timed until their last chunk, not just until the headers are sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method=method)
+        started = time.perf_counter()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            # Label by route template so path parameters and 404 probes cannot blow up cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(method=method, route=route, status=str(status)).observe(
+                time.perf_counter() - started
+            )
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.utils.metrics import SINGLEFLIGHT_SHARED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller starts the work as a task; callers arriving while it runs await
+    that same task and get its result or its exception. Nothing is kept after the
+    task finishes, so this only merges calls that overlap in time (it is not a cache).
+
+    Each caller awaits the task through `asyncio.shield`, so cancelling one caller
+    never cancels the work for the others. When the last caller is cancelled, the
+    work is cancelled too and the key is released at once.
+
+    Not thread-safe; it is meant to be used from the event loop only.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            SINGLEFLIGHT_SHARED.labels(name=self.name).inc()
+            logger.debug("🔗 Joined in-flight %s call for %s", self.name, key)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller gave up: stop the work and let the next caller start fresh.
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+def coordinate_key(lat: float, lng: float, precision: int = 4) -> Any:
+    """Round coordinates for use in a call key; 4 decimals is roughly 11 m."""
+    return round(float(lat), precision), round(float(lng), precision)
@@ -0,0 +1,48 @@
+"""
+Diff two benchmark reports produced by `python -m benchmarks.run --output`.
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+
+def flatten(report: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in report.items():
+        if key == "meta":
+            continue
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, list):
+            # Scaling rows are keyed by their stop count
+            for row in value:
+                if isinstance(row, dict) and "stops" in row:
+                    yield from flatten({k: v for k, v in row.items() if k != "stops"}, f"{path}[{row['stops']}]")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Flag changes larger than this percent")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = dict(flatten(json.load(f)))
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = dict(flatten(json.load(f)))
+
+    print(f"{'metric':<50} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for path in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[path], candidate[path]
+        change = (new - old) / old * 100 if old else 0.0
+        flag = "  <--" if abs(change) >= args.threshold and path.endswith("_ms") else ""
+        print(f"{path:<50} {old:>12.3f} {new:>12.3f} {change:>8.1f}%{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Offline stand-ins for Groq and the place providers, driven by recorded fixtures."""
+import asyncio
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+from langchain_core.messages import AIMessage
+
+from app.services.decomposition_cache import canonicalize_request
+from app.services.place_cache import normalize_query
+from app.utils import geo
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_scenarios() -> Dict[str, Any]:
+    with open(FIXTURES_DIR / "decompositions.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeChatModel:
+    """
+    Replaces ChatGroq on the TaskDecomposerAgent and answers with canned decompositions.
+
+    Requests are matched on their canonical errand list. Unknown requests return
+    invalid JSON, so the agent's keyword fallback runs exactly as in production.
+    """
+
+    _USER_TEXT = re.compile(r'User request: "(.*)"', re.DOTALL)
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self._answers = {
+            canonicalize_request(item["user_text"]): json.dumps(item["tasks"])
+            for item in load_scenarios()["requests"]
+        }
+
+    async def ainvoke(self, messages, *args, **kwargs) -> AIMessage:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        match = self._USER_TEXT.search(messages[-1].content)
+        user_text = match.group(1) if match else ""
+        return AIMessage(content=self._answers.get(canonicalize_request(user_text), "not json"))
+
+
+class FixtureTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that serves recorded Foursquare and SerpAPI responses.
+
+    Responses are looked up by the normalized query ("grocery store" ->
+    fixtures/<provider>/grocery_store.json). Unknown queries get an empty result list.
+    OSRM `table` requests are answered with geodesic distances at TABLE_SPEED_KMH.
+    """
+
+    TABLE_SPEED_KMH = 30.0
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.requests: Dict[str, int] = {"foursquare": 0, "serpapi": 0, "osrm": 0}
+        self._cache: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def _fixture(self, provider: str, query: str) -> Optional[Dict[str, Any]]:
+        path = FIXTURES_DIR / provider / f"{normalize_query(query).replace(' ', '_')}.json"
+        key = str(path)
+        if key not in self._cache:
+            self._cache[key] = json.loads(path.read_text(encoding="utf-8")) if path.exists() else None
+        return self._cache[key]
+
+    def _table(self, path: str, params: httpx.QueryParams) -> Dict[str, Any]:
+        coordinates = path.rsplit("/", 1)[-1].split(";")
+        locations = [tuple(map(float, pair.split(",")))[::-1] for pair in coordinates]
+        distances = geo.distance_matrix(np.asarray(locations))
+        everything = list(range(len(locations)))
+        sources, destinations = (
+            [int(i) for i in params[name].split(";")] if name in params else everything
+            for name in ("sources", "destinations")
+        )
+        distances = distances[np.ix_(sources, destinations)]
+        return {
+            "code": "Ok",
+            "distances": distances.tolist(),
+            "durations": (distances / (self.TABLE_SPEED_KMH / 3.6)).tolist(),
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        if "foursquare" in request.url.host:
+            self.requests["foursquare"] += 1
+            body = self._fixture("foursquare", request.url.params.get("query", "")) or {"results": []}
+        elif "serpapi" in request.url.host:
+            self.requests["serpapi"] += 1
+            body = self._fixture("serpapi", request.url.params.get("q", "")) or {"local_results": []}
+        elif request.url.path.startswith("/table/v1/"):
+            self.requests["osrm"] += 1
+            body = self._table(request.url.path, request.url.params)
+        else:
+            return httpx.Response(404, json={"error": f"no fixture for {request.url.host}"}, request=request)
+
+        return httpx.Response(200, json=body, request=request)
+
+
+def scenario_texts() -> List[str]:
+    return [item["user_text"] for item in load_scenarios()["requests"]]
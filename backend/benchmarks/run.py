@@ -0,0 +1,321 @@
+"""
+Offline end-to-end benchmarks for the planning pipeline.
+
+Drives the compiled `create_workflow()` graph and the `/plan` endpoint with a fake
+LLM and recorded provider fixtures, so no network or API keys are needed.
+
+    cd backend
+    python -m benchmarks.run --iterations 50 --output bench.json
+    python -m benchmarks.compare baseline.json bench.json
+
+`--warm-caches` backs the shared Redis tiers with an in-memory fakeredis when that
+package is installed (`pip install fakeredis`); without it only the in-process
+tiers are warmed.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import platform
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+
+from app.utils.config import settings
+
+logger = logging.getLogger("benchmarks")
+
+SCALING_SIZES = [2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 30, 40, 50]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    values = np.asarray(samples, dtype=np.float64)
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "min_ms": round(float(values.min()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def in_memory_redis():
+    """A fakeredis client standing in for Redis, or None when fakeredis is not installed."""
+    if importlib.util.find_spec("fakeredis") is None:
+        logger.warning("⚠️ fakeredis is not installed; --warm-caches only warms the in-process caches")
+        return None
+    import fakeredis.aioredis
+    return fakeredis.aioredis.FakeRedis()
+
+
+async def build_app(args):
+    """Build the ServiceContainer and workflow wired to the offline fakes."""
+    # Caches would turn every iteration after the first into a hit; measure the cold pipeline by default.
+    settings.place_cache_enabled = args.warm_caches
+    settings.decomposition_memo_enabled = args.warm_caches
+    settings.place_store_enabled = args.warm_caches
+    # A throwaway store so runs never read or write the configured one; main() removes it.
+    settings.place_store_dir = tempfile.mkdtemp(prefix="routeright-bench-places-")
+    if not args.warm_caches:
+        settings.matrix_cache_size = 0
+    settings.solver_executor = args.solver_executor
+    settings.routing_provider = args.routing_provider
+    if args.tsp_time_limit is not None:
+        settings.tsp_time_limit_seconds = args.tsp_time_limit
+    if not args.rate_limits:
+        # Fixtures answer instantly; production provider quotas would only measure the token buckets.
+        for provider in ("foursquare", "serpapi", "groq"):
+            setattr(settings, f"{provider}_rate_per_second", 0)
+            setattr(settings, f"{provider}_max_in_flight", 1000)
+        # Matrix providers (OSRM) use the outbound defaults
+        settings.outbound_rate_per_second = 0
+        settings.outbound_max_in_flight = 1000
+    # ChatGroq refuses to construct without a key; the fake model replaces it before any call.
+    settings.groq_api_key = settings.groq_api_key or "offline-benchmark"
+
+    from benchmarks.fakes import FakeChatModel, FixtureTransport
+    from app.graph.container import ServiceContainer
+    from app.graph.workflow import create_workflow
+    from app.services.http_client import HTTPClientRegistry
+
+    transport = FixtureTransport(latency_ms=args.provider_latency_ms)
+    registry = HTTPClientRegistry()
+    registry.use_transport(transport)
+
+    container = ServiceContainer(http_registry=registry)
+    container.task_decomposer.llm = FakeChatModel(latency_ms=args.llm_latency_ms)
+    # Offline: never talk to a real Redis, even if one is configured. Warm runs get an in-memory one.
+    await container.cache.close()
+    if args.warm_caches:
+        container.cache.redis_client = in_memory_redis()
+    await container.http_clients.startup()
+    await container.solver.startup()
+    if container.place_store is not None:
+        container.place_store.open()
+
+    return container, create_workflow(container), transport
+
+
+async def timed_run(workflow, state: Dict[str, Any]):
+    """Run the graph once, returning total wall time and per-node wall time (ms)."""
+    node_ms: Dict[str, float] = {}
+    started = last = time.perf_counter()
+    async for update in workflow.astream(state, stream_mode="updates"):
+        now = time.perf_counter()
+        # Nodes run sequentially, so the gap between updates is the node's wall time.
+        for node in update:
+            node_ms[node] = (now - last) * 1000
+        last = now
+    return (last - started) * 1000, node_ms
+
+
+async def bench_workflow(workflow, requests: List[Dict[str, Any]], iterations: int, concurrency: int):
+    totals: List[float] = []
+    per_node: Dict[str, List[float]] = {}
+
+    async def one(i: int):
+        request = requests[i % len(requests)]
+        state = {"user_input": request["user_text"], "lat": request["lat"], "lng": request["lng"], "preferences": {}}
+        total, node_ms = await timed_run(workflow, state)
+        totals.append(total)
+        for node, ms in node_ms.items():
+            per_node.setdefault(node, []).append(ms)
+
+    for batch_start in range(0, iterations, concurrency):
+        await asyncio.gather(*(one(i) for i in range(batch_start, min(batch_start + concurrency, iterations))))
+
+    return {
+        "end_to_end": summarize(totals),
+        "nodes": {node: summarize(samples) for node, samples in per_node.items()},
+    }
+
+
+async def bench_allocations(workflow, requests: List[Dict[str, Any]], iterations: int):
+    peaks: List[int] = []
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for i in range(iterations):
+            request = requests[i % len(requests)]
+            state = {"user_input": request["user_text"], "lat": request["lat"], "lng": request["lng"], "preferences": {}}
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            await workflow.ainvoke(state)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "iterations": iterations,
+        "peak_kib_mean": round(statistics.mean(peaks) / 1024, 1),
+        "peak_kib_max": round(max(peaks) / 1024, 1),
+        "retained_kib_total": round((retained - baseline) / 1024, 1),
+    }
+
+
+async def bench_endpoint(container, workflow, requests: List[Dict[str, Any]], iterations: int):
+    import app.main as main
+
+    main.container, main.cache, main.workflow = container, container.cache, workflow
+    samples: List[float] = []
+    errors = 0
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for i in range(iterations):
+            request = requests[i % len(requests)]
+            started = time.perf_counter()
+            response = await client.post("/plan", json=request)
+            samples.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                errors += 1
+    return {"latency": summarize(samples), "errors": errors}
+
+
+def bench_scaling(container, repeats: int, max_stops: int):
+    routing = container.routing_service
+    rng = np.random.default_rng(42)
+    rows = []
+    for stops in [n for n in SCALING_SIZES if n <= max_stops]:
+        # One start location plus `stops` places inside a ~10 km box
+        points = [tuple(p) for p in rng.uniform([20.85, 85.17], [20.94, 85.27], (stops + 1, 2))]
+
+        matrix_ms = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            routing.calculate_distance_matrix(points)
+            matrix_ms.append((time.perf_counter() - started) * 1000)
+
+        exact = len(points) <= settings.tsp_exact_max_nodes
+        solve_ms = []
+        # OR-Tools always runs to its time limit, so one sample is enough there.
+        for _ in range(repeats if exact else 1):
+            started = time.perf_counter()
+            routing.solve_tsp(points)
+            solve_ms.append((time.perf_counter() - started) * 1000)
+
+        rows.append({
+            "stops": stops,
+            "solver": "held_karp" if exact else "ortools",
+            "distance_matrix_ms": round(statistics.median(matrix_ms), 4),
+            "solve_tsp_ms": round(statistics.median(solve_ms), 3),
+        })
+        logger.info(f"📈 {stops:>3} stops: matrix {rows[-1]['distance_matrix_ms']} ms, "
+                    f"solve {rows[-1]['solve_tsp_ms']} ms ({rows[-1]['solver']})")
+    return rows
+
+
+def print_report(report: Dict[str, Any]):
+    workflow = report.get("workflow", {})
+    if workflow:
+        e2e = workflow["end_to_end"]
+        print(f"\nWorkflow end-to-end: p50 {e2e['p50_ms']} ms | p95 {e2e['p95_ms']} ms | p99 {e2e['p99_ms']} ms")
+        for node, stats in workflow["nodes"].items():
+            print(f"  {node:<10} p50 {stats['p50_ms']:>9} ms | p95 {stats['p95_ms']:>9} ms")
+    if "allocations" in report:
+        alloc = report["allocations"]
+        print(f"Allocations: peak {alloc['peak_kib_mean']} KiB/request (max {alloc['peak_kib_max']} KiB)")
+    if "endpoint" in report:
+        latency = report["endpoint"]["latency"]
+        print(f"/plan endpoint: p50 {latency['p50_ms']} ms | p95 {latency['p95_ms']} ms | p99 {latency['p99_ms']} ms"
+              f" | errors {report['endpoint']['errors']}")
+    for row in report.get("scaling", []):
+        print(f"  {row['stops']:>3} stops  matrix {row['distance_matrix_ms']:>9} ms  "
+              f"solve {row['solve_tsp_ms']:>10} ms  ({row['solver']})")
+
+
+async def main(args) -> Dict[str, Any]:
+    from benchmarks.fakes import load_scenarios
+
+    scenarios = load_scenarios()
+    location = scenarios["location"]
+    requests = [{"user_text": item["user_text"], **location} for item in scenarios["requests"]]
+
+    container, workflow, transport = await build_app(args)
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": vars(args),
+        }
+    }
+    try:
+        sections = set(args.sections)
+        if "workflow" in sections:
+            # One untimed pass so imports and lazy initialization do not skew the first sample
+            await bench_workflow(workflow, requests, len(requests), 1)
+            report["workflow"] = await bench_workflow(workflow, requests, args.iterations, args.concurrency)
+        if "allocations" in sections:
+            report["allocations"] = await bench_allocations(workflow, requests, min(args.iterations, 20))
+        if "endpoint" in sections:
+            report["endpoint"] = await bench_endpoint(container, workflow, requests, args.iterations)
+        if "scaling" in sections:
+            report["scaling"] = bench_scaling(container, args.repeats, args.max_stops)
+        report["meta"]["provider_requests"] = dict(transport.requests)
+    finally:
+        await container.http_clients.shutdown()
+        await container.solver.shutdown()
+        if container.place_store is not None:
+            container.place_store.close()
+        shutil.rmtree(settings.place_store_dir, ignore_errors=True)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline RouteRight AI pipeline benchmarks")
+    parser.add_argument("--iterations", type=int, default=30, help="Requests per workflow/endpoint section")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent workflow runs")
+    parser.add_argument("--repeats", type=int, default=5, help="Samples per size in the scaling section")
+    parser.add_argument("--max-stops", type=int, default=50, help="Largest stop count in the scaling section")
+    parser.add_argument("--sections", nargs="+", default=["workflow", "allocations", "endpoint", "scaling"],
+                        choices=["workflow", "allocations", "endpoint", "scaling"])
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated Groq latency")
+    parser.add_argument("--provider-latency-ms", type=float, default=0.0, help="Simulated provider latency")
+    parser.add_argument("--solver-executor", default="thread", choices=["process", "thread", "inline"])
+    parser.add_argument("--routing-provider", default="geodesic", choices=["geodesic", "osrm"],
+                        help="Travel matrix source; osrm is served by the fixture transport")
+    parser.add_argument("--tsp-time-limit", type=int, default=None, help="Override TSP_TIME_LIMIT_SECONDS")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the configured per-provider rate limits")
+    parser.add_argument("--warm-caches", action="store_true",
+                        help="Keep the place cache, place store, matrix cache and decomposition memo on; "
+                             "Redis-backed tiers need fakeredis")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Importing the app sets up logging at settings.log_level, so set it first
+    settings.log_level = args.log_level
+    import app.main  # noqa: F401
+    logging.getLogger("benchmarks").setLevel(logging.INFO)
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
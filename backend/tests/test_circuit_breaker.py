@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.services.outbound_governor import GovernorTimeoutError
+
+
+class ProviderDown(Exception):
+    pass
+
+
+def _breaker(**overrides) -> CircuitBreaker:
+    options = dict(failure_rate_threshold=0.5, window_seconds=60, min_calls=2, open_seconds=0,
+                   half_open_probes=1)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+async def _call(breaker: CircuitBreaker, exc: BaseException = None):
+    try:
+        async with breaker.guard():
+            if exc is not None:
+                raise exc
+    except BaseException:
+        pass
+
+
+def test_queue_timeouts_are_not_successes_in_the_window():
+    async def run():
+        breaker = _breaker(open_seconds=60)
+        for _ in range(3):
+            await _call(breaker, GovernorTimeoutError("queue full"))
+        await _call(breaker, ProviderDown())
+        assert breaker.state == CLOSED  # one real outcome, below min_calls
+        await _call(breaker, ProviderDown())
+        assert breaker.state == OPEN
+    asyncio.run(run())
+
+
+def test_queue_timeout_does_not_close_a_half_open_circuit():
+    async def run():
+        breaker = _breaker()
+        await _call(breaker, ProviderDown())
+        await _call(breaker, ProviderDown())
+        assert breaker.state == HALF_OPEN
+        await _call(breaker, GovernorTimeoutError("queue full"))
+        assert breaker.state == HALF_OPEN
+        await _call(breaker)
+        assert breaker.state == CLOSED
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("exc", [GovernorTimeoutError("queue full"), asyncio.CancelledError()])
+def test_no_outcome_releases_the_probe_slot(exc):
+    async def run():
+        breaker = _breaker()
+        await _call(breaker, ProviderDown())
+        await _call(breaker, ProviderDown())
+        await _call(breaker, exc)
+        assert breaker._probes_in_flight == 0
+    asyncio.run(run())
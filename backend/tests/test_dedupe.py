@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from app.utils.dedupe import _Name, fuzzy_unique, name_similarity
+
+THRESHOLD = 0.6
+RADIUS_M = 75.0
+
+
+def _similarity(a: str, b: str) -> float:
+    return name_similarity(_Name(a), _Name(b))
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Walgreens", "Walgreen's"),
+    ("Wal-Mart", "Walmart"),
+    ("Trader Joes", "Trader Joe's"),
+    ("Whole Foods Market", "Whole Foods"),
+])
+def test_spelling_variants_match(a, b):
+    assert _similarity(a, b) >= THRESHOLD
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Bank of America", "Bank of the West"),
+    ("Pharmacy", "CVS Pharmacy"),
+    ("Pharmacy", "Walgreens Pharmacy"),
+    ("Subway", "Subway Station"),
+])
+def test_different_businesses_do_not_match(a, b):
+    assert _similarity(a, b) < THRESHOLD
+
+
+def test_merges_near_duplicates_only():
+    coords = np.array([[37.7749, -122.4194], [37.7750, -122.4195], [37.7751, -122.4193], [37.7849, -122.4194]])
+    names = ["Walgreens", "Walgreen's", "Bank of America", "Walgreens"]
+    # The second is a duplicate; the fourth is ~1 km away
+    assert fuzzy_unique(coords, names, RADIUS_M, THRESHOLD).tolist() == [0, 2, 3]
+
+
+def test_generic_name_does_not_swallow_neighbors():
+    coords = np.array([[37.7749, -122.4194], [37.7750, -122.4194], [37.7750, -122.4195]])
+    names = ["Pharmacy", "CVS Pharmacy", "Walgreens Pharmacy"]
+    assert fuzzy_unique(coords, names, RADIUS_M, THRESHOLD).tolist() == [0, 1, 2]
+
+
+def test_only_merges_within_a_group():
+    coords = np.array([[37.7749, -122.4194], [37.7750, -122.4195], [37.7750, -122.4194]])
+    names = ["Target", "Target", "Target"]
+    groups = ["groceries", "pharmacy", "groceries"]
+    assert fuzzy_unique(coords, names, RADIUS_M, THRESHOLD, groups=groups).tolist() == [0, 1]
+    assert fuzzy_unique(coords, names, RADIUS_M, THRESHOLD).tolist() == [0]
@@ -0,0 +1,29 @@
+import logging
+
+from app.utils.config import settings
+from app.utils.logging_config import PlainFormatter, log_payload
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_plain_format_shows_the_logged_payload(monkeypatch):
+    monkeypatch.setattr(settings, "log_payload_sample_rate", 1.0)
+    handler = _Capture()
+    handler.setFormatter(PlainFormatter())
+    logger = logging.getLogger("tests.logging_config")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        log_payload(logger, "📋 Decomposed tasks", [{"task_type": "pharmacy"}], query="pharmacy")
+    finally:
+        logger.removeHandler(handler)
+
+    [line] = handler.lines
+    assert line.endswith(' - 📋 Decomposed tasks query=pharmacy count=1 payload="[{\\"task_type\\": \\"pharmacy\\"}]"')
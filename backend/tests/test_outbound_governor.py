@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+import httpx
+
+from app.services.outbound_governor import ProviderGovernor
+
+
+def test_throttled_response_pauses_queued_calls(monkeypatch):
+    from app.utils.config import settings
+    monkeypatch.setattr(settings, "outbound_max_retries", 0)
+
+    async def run():
+        governor = ProviderGovernor("test", rate_per_second=0, burst=1, max_in_flight=1, max_queue_wait_seconds=5)
+        sent_at = []
+
+        async def throttled():
+            sent_at.append(time.monotonic())
+            return httpx.Response(429, headers={"Retry-After": "0.2"})
+
+        async def ok():
+            sent_at.append(time.monotonic())
+            return httpx.Response(200)
+
+        first = asyncio.create_task(governor.request(throttled))
+        await asyncio.sleep(0)  # Let the first call take the only slot
+        second = asyncio.create_task(governor.request(ok))
+        assert (await first).status_code == 429
+        assert (await second).status_code == 200
+        # The queued call waited out Retry-After instead of going out as the slot was released
+        assert sent_at[1] - sent_at[0] >= 0.19
+
+    asyncio.run(run())
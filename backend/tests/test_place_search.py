@@ -0,0 +1,61 @@
+import asyncio
+
+from app.agents.place_search import PlaceSearchAgent, search_query
+from app.services.place_store import PlaceStore
+from app.utils.config import settings
+
+
+class SlowProvider:
+    """Answers after `delay` seconds and records whether the call was cancelled."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.cancelled = 0
+
+    async def _answer(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return []
+
+    async def search_places(self, query, lat, lng, limit=3):
+        return await self._answer()
+
+    async def search_local_places(self, query, lat, lng):
+        return await self._answer()
+
+
+def test_cancelling_a_hedged_search_cancels_provider_calls(monkeypatch):
+    monkeypatch.setattr(settings, "search_hedging_enabled", True)
+    monkeypatch.setattr(settings, "search_soft_deadline_seconds", 0.01)
+
+    async def run():
+        foursquare, serpapi = SlowProvider(10), SlowProvider(10)
+        agent = PlaceSearchAgent(foursquare=foursquare, serpapi=serpapi)
+        search = asyncio.create_task(agent._search_providers({"search_query": "pharmacy"}, 37.77, -122.42))
+        await asyncio.sleep(0.05)  # Past the soft deadline, waiting for the first provider
+        search.cancel()
+        try:
+            await search
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0)
+        assert (foursquare.cancelled, serpapi.cancelled) == (1, 1)
+
+    asyncio.run(run())
+
+
+def test_places_are_stored_under_the_key_searches_look_up(tmp_path):
+    store = PlaceStore(str(tmp_path))
+    store.open()
+    agent = PlaceSearchAgent(foursquare=SlowProvider(0), serpapi=SlowProvider(0), place_store=store)
+    task = {"task_type": "Bakery"}  # No search_query: the task type is searched for
+    places = [
+        {"source": "foursquare", "id": str(i), "name": f"Bakery {i}", "lat": 37.77 + i * 1e-3, "lng": -122.42}
+        for i in range(3)
+    ]
+    agent._remember(task, places)
+    assert len(store.lookup(search_query(task), 37.77, -122.42)) == 3
+    store.close()
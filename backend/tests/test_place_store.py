@@ -0,0 +1,57 @@
+import json
+import os
+
+from app.services import place_store as place_store_module
+from app.services.place_store import PlaceStore
+
+
+def _place(i: int, lat: float = 37.77, lng: float = -122.42):
+    return {"source": "foursquare", "id": f"p{i}", "name": f"Pharmacy {i}", "lat": lat + i * 1e-4, "lng": lng,
+            "task_type": "pharmacy"}
+
+
+def _log_lines(directory) -> int:
+    with open(os.path.join(directory, "places.jsonl"), encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def test_upserts_persist_and_reopen(tmp_path):
+    store = PlaceStore(str(tmp_path))
+    store.open()
+    assert store.upsert([_place(i) for i in range(3)], tags=["drugstore"]) == 3
+    assert len(store.search("pharmacy", 37.77, -122.42, 1000)) == 3
+    store.close()
+
+    reopened = PlaceStore(str(tmp_path))
+    reopened.open()
+    assert len(reopened) == 3
+    assert {place["id"] for place in reopened.search("drugstore", 37.77, -122.42, 1000)} == {"p0", "p1", "p2"}
+    reopened.close()
+
+
+def test_log_is_compacted_while_running(tmp_path, monkeypatch):
+    monkeypatch.setattr(place_store_module, "_INITIAL_CAPACITY", 4)
+    store = PlaceStore(str(tmp_path))
+    store.open()
+    for _ in range(20):
+        store.upsert([_place(0), _place(1)])
+    store.close()
+
+    # 40 lines for 2 places would have stayed on disk until the next open
+    assert _log_lines(tmp_path) <= 2 * 2 + 4
+    with open(os.path.join(tmp_path, "places.jsonl"), encoding="utf-8") as f:
+        rows = [json.loads(line)["row"] for line in f]
+    assert set(rows) == {0, 1}
+
+
+def test_mapped_file_grows_past_initial_capacity(tmp_path, monkeypatch):
+    monkeypatch.setattr(place_store_module, "_INITIAL_CAPACITY", 4)
+    store = PlaceStore(str(tmp_path))
+    store.open()
+    store.upsert([_place(i) for i in range(10)])
+    store.close()
+
+    reopened = PlaceStore(str(tmp_path))
+    reopened.open()
+    assert len(reopened.search("pharmacy", 37.77, -122.42, 5000, limit=20)) == 10
+    reopened.close()
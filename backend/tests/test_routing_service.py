@@ -0,0 +1,64 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from app.services.routing_service import RoutingService
+
+
+def _path_cost(cost, route):
+    return sum(cost[a, b] for a, b in zip(route, route[1:]))
+
+
+def _brute_force_gtsp(cost, groups, start):
+    members = {}
+    for node, group in enumerate(groups):
+        if node != start:
+            members.setdefault(group, []).append(node)
+    best = np.inf
+    for order in itertools.permutations(members):
+        for choice in itertools.product(*(members[group] for group in order)):
+            best = min(best, _path_cost(cost, [start, *choice]))
+    return best
+
+
+def _random_instance(rng):
+    num_groups = int(rng.integers(1, 5))
+    sizes = rng.integers(1, 4, num_groups)
+    groups = np.r_[0, np.repeat(np.arange(num_groups), sizes)]
+    num_nodes = len(groups)
+    # Small integer costs give ties and dominated candidates; asymmetric like road durations
+    cost = rng.integers(1, 20, (num_nodes, num_nodes)).astype(np.float64)
+    np.fill_diagonal(cost, 0)
+    order = rng.permutation(num_nodes)
+    start = int(np.flatnonzero(order == 0)[0])
+    return cost[np.ix_(order, order)], groups[order], start
+
+
+def test_gtsp_matches_brute_force():
+    service = RoutingService()
+    for seed in range(300):
+        rng = np.random.default_rng(seed)
+        cost, groups, start = _random_instance(rng)
+
+        route = service.solve_gtsp_matrix(cost, groups, start_index=start)
+
+        assert route[0] == start, f"seed {seed}"
+        visited = [groups[node] for node in route[1:]]
+        assert sorted(visited) == sorted(set(groups[np.arange(len(groups)) != start])), f"seed {seed}"
+        assert _path_cost(cost, route) == pytest.approx(_brute_force_gtsp(cost, groups, start)), f"seed {seed}"
+
+
+def test_pruning_keeps_an_optimal_route():
+    for seed in range(100):
+        rng = np.random.default_rng(seed)
+        cost, groups, start = _random_instance(rng)
+        pruned_groups = groups.copy()
+        pruned_groups[start] = -1
+
+        kept = RoutingService._undominated(cost, pruned_groups, start)
+        assert start in kept, f"seed {seed}"
+        assert set(pruned_groups[kept]) == set(pruned_groups), f"seed {seed}"
+        sub_start = int(np.flatnonzero(kept == start)[0])
+        assert _brute_force_gtsp(cost[np.ix_(kept, kept)], groups[kept], sub_start) == \
+            pytest.approx(_brute_force_gtsp(cost, groups, start)), f"seed {seed}"
@@ -0,0 +1,67 @@
+import asyncio
+import math
+
+import numpy as np
+
+from app.agents.validator import ValidationAgent
+from app.models.place_batch import PlaceBatch
+
+TASK_TYPES = ["grocery", "pharmacy", "bank", "coffee", "gas", "post office", "hardware", "gym", None, ""]
+RATINGS = [None, 0.0, 3.5, 4.0, 4.0, 4.5, 5.0]
+
+
+def _reference_top_per_task(places, mask, per_task, max_tasks):
+    """The dict-based selection PlaceBatch replaced, generalized to `per_task` places per task."""
+    by_task = {}
+    for i, place in enumerate(places.to_dicts()):
+        if mask[i] and place["task_type"]:
+            by_task.setdefault(place["task_type"], []).append((i, place.get("rating") or 0))
+    selected = []
+    for rows in list(by_task.values())[:max_tasks]:
+        # Stable sort: ties keep the earlier place, like the old strict ">" comparison
+        selected += [i for i, _ in sorted(rows, key=lambda row: -row[1])[:per_task]]
+    return selected
+
+
+def _random_batch(rng, size):
+    return PlaceBatch.from_dicts([
+        {
+            "source": "foursquare", "id": str(i), "name": f"Place {i}", "address": "Somewhere",
+            "lat": 37.77 + rng.uniform(-0.05, 0.05), "lng": -122.42 + rng.uniform(-0.05, 0.05),
+            "rating": RATINGS[rng.integers(len(RATINGS))],
+            "task_type": TASK_TYPES[rng.integers(len(TASK_TYPES))],
+        }
+        for i in range(size)
+    ])
+
+
+def test_top_per_task_matches_reference():
+    agent = ValidationAgent()
+    for seed in range(500):
+        rng = np.random.default_rng(seed)
+        places = _random_batch(rng, int(rng.integers(0, 40)))
+        mask = rng.random(len(places)) < 0.8
+        per_task = int(rng.integers(1, 6))
+        max_tasks = int(rng.integers(1, 8))
+
+        selected = agent._top_per_task(places, mask, per_task, max_tasks)
+        expected = _reference_top_per_task(places, mask, per_task, max_tasks)
+        assert selected.tolist() == expected, f"seed {seed}"
+
+
+def test_validate_places_keeps_best_rated_per_task():
+    agent = ValidationAgent()
+    agent.candidates_per_task = 2
+    places = [
+        {"source": "serpapi", "id": "a", "name": "Safeway", "address": "1 Main St", "lat": 37.770, "lng": -122.420,
+         "rating": 4.0, "task_type": "grocery"},
+        {"source": "serpapi", "id": "b", "name": "Trader Joe's", "address": "2 Main St", "lat": 37.780,
+         "lng": -122.410, "rating": 4.6, "task_type": "grocery"},
+        {"source": "serpapi", "id": "c", "name": "Corner Market", "address": "3 Main St", "lat": 37.790,
+         "lng": -122.400, "rating": 2.5, "task_type": "grocery"},
+        {"source": "serpapi", "id": "d", "name": "Walgreens", "address": "4 Main St", "lat": 37.760,
+         "lng": -122.430, "rating": None, "task_type": "pharmacy"},
+    ]
+    validated = asyncio.run(agent.validate_places(places, 37.77, -122.42))
+    assert validated.id.tolist() == ["b", "a", "d"]
+    assert math.isnan(validated.rating[2])